@@ -0,0 +1,50 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import json
+from typing import Optional
+
+from cosmotech.orchestrator.api.analyze import analyze_template
+from cosmotech.orchestrator.api.analyze import display_analysis
+from cosmotech.orchestrator.utils.click import click
+from cosmotech.orchestrator.utils.decorators import web_help
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+
+@click.command()
+@click.argument("template", type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True), nargs=1)
+@click.option(
+    "--max-parallel",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of steps able to run at the same time for the makespan estimation, unlimited if not set",
+)
+@click.option(
+    "--stats-db",
+    "stats_db",
+    envvar="CSM_ORC_STATS_DB",
+    show_envvar=True,
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="SQLite database filled by `csm-orc run --stats-db`, used for the step durations",
+)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the analysis as JSON")
+@web_help("commands/analyze")
+def analyze_command(template: str, max_parallel: Optional[int], stats_db: Optional[str], as_json: bool):
+    """Analyze the step DAG of the given `TEMPLATE` file without running it
+
+    Reports the number of steps of each level, the critical path, the links serializing the DAG
+    and the theoretical makespan."""
+    try:
+        analysis = analyze_template(template, max_parallel, stats_db)
+    except ValueError as e:
+        LOGGER.error(e)
+        raise click.Abort()
+    if as_json:
+        click.echo(json.dumps(analysis, indent=2))
+    else:
+        display_analysis(analysis, stats_db)
@@ -0,0 +1,73 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import json
+from typing import Optional
+
+from cosmotech.orchestrator.api.artifacts import collect_artifacts
+from cosmotech.orchestrator.utils.click import click
+from cosmotech.orchestrator.utils.decorators import web_help
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+
+@click.group()
+@web_help("commands/artifacts")
+def artifacts_command():
+    """Manage the artifact store filled by `csm-orc run --artifact-store`"""
+    pass
+
+
+@artifacts_command.command("gc")
+@click.option(
+    "--store",
+    "store_path",
+    envvar="CSM_ORC_ARTIFACT_STORE",
+    show_envvar=True,
+    required=True,
+    type=click.Path(file_okay=False),
+    help="Directory of the artifact store",
+)
+@click.option(
+    "--max-age",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Evict the objects not stored nor restored for more than this number of days",
+)
+@click.option(
+    "--max-size",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Then evict the least recently used objects until the store holds at most this number of MiB",
+)
+@click.option("--dry-run", is_flag=True, default=False, help="Only report what would be evicted")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the result as JSON")
+@web_help("commands/artifacts")
+def gc_command(store_path: str, max_age: Optional[float], max_size: Optional[float], dry_run: bool, as_json: bool):
+    """Evict the objects of the artifact store by age and by total size"""
+    try:
+        result = collect_artifacts(
+            store_path,
+            max_age=None if max_age is None else max_age * 86400,
+            max_size=None if max_size is None else int(max_size * (1 << 20)),
+            dry_run=dry_run,
+        )
+    except ValueError as e:
+        LOGGER.error(e)
+        raise click.Abort()
+    if as_json:
+        click.echo(json.dumps(result, indent=2))
+    else:
+        message = "csm-orc.cli.artifacts.would_evict" if dry_run else "csm-orc.cli.artifacts.evicted"
+        LOGGER.info(
+            T(message).format(
+                count=result["evicted"],
+                size=result["evictedSize"],
+                remaining=result["remaining"],
+                remaining_size=result["remainingSize"],
+            )
+        )
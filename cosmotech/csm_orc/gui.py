@@ -5,6 +5,7 @@
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
 
+import os
 import subprocess
 import signal
 import sys
@@ -42,13 +43,36 @@ from cosmotech.orchestrator.utils.logger import LOGGER
     default=None,
     help="Force dev mode (start Vite dev server alongside the API). Auto-detected if not specified.",
 )
+@click.option(
+    "--max-runs",
+    envvar="CSM_ORC_GUI_MAX_RUNS",
+    show_envvar=True,
+    default=2,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Maximum number of project runs executed at the same time, other runs wait in a queue.",
+)
+@click.option(
+    "--stats-db",
+    envvar="CSM_ORC_STATS_DB",
+    show_envvar=True,
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Record the steps of the project runs in this SQLite database and serve their statistics on /stats.",
+)
 @web_help("commands/gui")
-def gui_command(host: str, port: int, dev_mode: bool):
+def gui_command(host: str, port: int, dev_mode: bool, max_runs: int, stats_db: str):
     """Start the Visual Orchestrator GUI.
 
     In release mode (built static files available), serves the web app from the packaged static files.
     In dev mode (editable install with sources), starts the Vite dev server alongside the API backend."""
 
+    # The API server may run in a reloaded process, it reads its settings from the environment
+    os.environ["CSM_ORC_GUI_MAX_RUNS"] = str(max_runs)
+    if stats_db:
+        # Also read by the `csm-orc run` processes started for the project runs
+        os.environ["CSM_ORC_STATS_DB"] = os.path.abspath(stats_db)
+
     # Auto-detect dev mode if not explicitly set
     if dev_mode is None:
         dev_mode = is_dev_mode()
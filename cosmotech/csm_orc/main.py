@@ -8,10 +8,13 @@
 import click_log
 
 from cosmotech.orchestrator import VERSION
+from cosmotech.csm_orc.analyze import analyze_command
+from cosmotech.csm_orc.artifacts import artifacts_command
 from cosmotech.csm_orc.entrypoint import entrypoint_command
 from cosmotech.csm_orc.gui import gui_command
 from cosmotech.csm_orc.run import run_command
 from cosmotech.csm_orc.list_templates import list_templates_command
+from cosmotech.csm_orc.stats import stats_command
 from cosmotech.orchestrator.utils.click import click
 from cosmotech.orchestrator.utils.decorators import web_help
 from cosmotech.orchestrator.utils.logger import LOGGER
@@ -46,6 +49,9 @@ main.add_command(entrypoint_command, "entrypoint")
 main.add_command(gui_command, "gui")
 main.add_command(run_command, "run")
 main.add_command(list_templates_command, "list-templates")
+main.add_command(stats_command, "stats")
+main.add_command(analyze_command, "analyze")
+main.add_command(artifacts_command, "artifacts")
 
 if __name__ == "__main__":
     main()
@@ -9,6 +9,10 @@ from typing import Optional
 
 from cosmotech.orchestrator import VERSION
 from cosmotech.orchestrator.api.run import run_template, validate_template, display_environment, generate_env_file
+from cosmotech.orchestrator.api.analyze import display_prediction, predict_template
+from cosmotech.orchestrator.api.run import DEFAULT_EXIT_HANDLERS_PARALLEL
+from cosmotech.orchestrator.core.run_control import DEFAULT_DRAIN_TIMEOUT
+from cosmotech.orchestrator.core.run_control import DEFAULT_GRACE_PERIOD
 from cosmotech.orchestrator.utils.click import click
 from cosmotech.orchestrator.utils.decorators import web_help
 from cosmotech.orchestrator.utils.logger import LOGGER
@@ -54,6 +58,48 @@ from cosmotech.orchestrator.utils.translate import T
     metavar="STEP_ID",
     help="Define a list of steps to be skipped during this run",
 )
+@click.option(
+    "--only",
+    "only_steps",
+    envvar="CSM_ONLY_STEPS",
+    show_envvar=True,
+    default=[],
+    type=str,
+    multiple=True,
+    metavar="STEP_ID",
+    help="Run only the given steps, all others are skipped",
+)
+@click.option(
+    "--from",
+    "from_steps",
+    envvar="CSM_FROM_STEPS",
+    show_envvar=True,
+    default=[],
+    type=str,
+    multiple=True,
+    metavar="STEP_ID",
+    help="Run only the given steps and the steps depending on them",
+)
+@click.option(
+    "--until",
+    "until_steps",
+    envvar="CSM_UNTIL_STEPS",
+    show_envvar=True,
+    default=[],
+    type=str,
+    multiple=True,
+    metavar="STEP_ID",
+    help="Run only the given steps and the steps they depend on (combined with --from: the steps in between)",
+)
+@click.option(
+    "--outputs-from",
+    "outputs_from",
+    envvar="CSM_ORC_OUTPUTS_FROM",
+    show_envvar=True,
+    default=None,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Event file of a previous run (see --event-file) giving the outputs of the steps not run",
+)
 @click.option(
     "--validate-only/--no-validate-only",
     "validate_only",
@@ -63,6 +109,26 @@ from cosmotech.orchestrator.utils.translate import T
     show_default=True,
     help="Run only a sematic validation of the orchestrator file",
 )
+@click.option(
+    "--predict/--no-predict",
+    "predict",
+    envvar="CSM_ORC_PREDICT",
+    show_envvar=True,
+    default=False,
+    show_default=True,
+    help="Run nothing, print the start and finish of each step predicted on simulated time from their durations "
+    "(expectedDuration, else --stats-db history) with --max-parallel, the makespan and the slot utilization",
+)
+@click.option(
+    "--simulate",
+    "simulation",
+    envvar="CSM_ORC_SIMULATE",
+    show_envvar=True,
+    default=None,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Start no process, simulate the commands from this JSON spec (durations, failures, outputs, resources) "
+    "on a virtual clock",
+)
 @click.option(
     "--exit-handlers/--no-exit-handlers",
     "exit_handlers",
@@ -72,6 +138,106 @@ from cosmotech.orchestrator.utils.translate import T
     show_default=True,
     help="Run exit handlers at the end of the execution",
 )
+@click.option(
+    "--exit-handlers-parallel",
+    "exit_handlers_parallel",
+    envvar="CSM_ORC_EXIT_HANDLERS_PARALLEL",
+    show_envvar=True,
+    default=DEFAULT_EXIT_HANDLERS_PARALLEL,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Maximum number of exit handlers running at once",
+)
+@click.option(
+    "--exit-handler-timeout",
+    "exit_handler_timeout",
+    envvar="CSM_ORC_EXIT_HANDLER_TIMEOUT",
+    show_envvar=True,
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Seconds after which a running exit handler is killed",
+)
+@click.option(
+    "--exit-handlers-timeout",
+    "exit_handlers_timeout",
+    envvar="CSM_ORC_EXIT_HANDLERS_TIMEOUT",
+    show_envvar=True,
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Seconds given to all the exit handlers: the running ones are then killed and the others do not run",
+)
+@click.option(
+    "--fail-fast/--no-fail-fast",
+    "fail_fast",
+    envvar="CSM_ORC_FAIL_FAST",
+    show_envvar=True,
+    default=False,
+    show_default=True,
+    help="On the first step failure, stop the running steps, start no other step and run the exit handlers",
+)
+@click.option(
+    "--max-parallel",
+    "max_parallel",
+    envvar="CSM_ORC_MAX_PARALLEL",
+    show_envvar=True,
+    default=None,
+    type=click.IntRange(min=1),
+    help="Maximum number of steps running at once, instances of expanded steps included (default from Python threads)",
+)
+@click.option(
+    "--drain-timeout",
+    envvar="CSM_ORC_DRAIN_TIMEOUT",
+    show_envvar=True,
+    default=DEFAULT_DRAIN_TIMEOUT,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds given to the running steps to stop after a SIGTERM or SIGINT before they get killed",
+)
+@click.option(
+    "--grace-period",
+    envvar="CSM_ORC_GRACE_PERIOD",
+    show_envvar=True,
+    default=DEFAULT_GRACE_PERIOD,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds given to the whole run, exit handlers included, after a SIGTERM or SIGINT",
+)
+@click.option(
+    "--event-file",
+    "event_file",
+    envvar="CSM_ORC_EVENT_FILE",
+    show_envvar=True,
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the run events (steps queued, started, outputs, finished) as JSON lines to this file or pipe",
+)
+@click.option(
+    "--stats-db",
+    "stats_db",
+    envvar="CSM_ORC_STATS_DB",
+    show_envvar=True,
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Record the duration, status and resource usage of each step in this SQLite database (see `csm-orc stats`)",
+)
+@click.option(
+    "--up-to-date-state",
+    "up_to_date_state",
+    envvar="CSM_ORC_UP_TO_DATE_STATE",
+    show_envvar=True,
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Skip the steps whose `fileOutputs` are up to date, recording what they ran in this JSON state file",
+)
+@click.option(
+    "--artifact-store",
+    "artifact_store",
+    envvar="CSM_ORC_ARTIFACT_STORE",
+    show_envvar=True,
+    default=None,
+    type=click.Path(file_okay=False, writable=True),
+    help="Store the `fileOutputs` of the steps once per content in this directory (see `csm-orc artifacts gc`)",
+)
 @web_help("commands/orchestrator")
 def run_command(
     template: str,
@@ -79,8 +245,25 @@ def run_command(
     display_env: bool,
     gen_env_target: Optional[str],
     skipped_steps: list[str],
+    only_steps: list[str],
+    from_steps: list[str],
+    until_steps: list[str],
+    outputs_from: Optional[str],
     validate_only: bool,
+    predict: bool,
+    simulation: Optional[str],
     exit_handlers: bool,
+    exit_handlers_parallel: int,
+    exit_handler_timeout: Optional[float],
+    exit_handlers_timeout: Optional[float],
+    fail_fast: bool,
+    max_parallel: Optional[int],
+    drain_timeout: float,
+    grace_period: float,
+    event_file: Optional[str],
+    stats_db: Optional[str],
+    up_to_date_state: Optional[str],
+    artifact_store: Optional[str],
 ):
     """Runs the given `TEMPLATE` file
     Commands are run as subprocess using `bash -c "<command> <arguments>"`.
@@ -104,6 +287,24 @@ def run_command(
             LOGGER.error(str(e))
             raise click.Abort()
 
+    # Handle predict mode
+    if predict:
+        try:
+            prediction = predict_template(
+                template,
+                max_parallel=max_parallel,
+                stats_db=stats_db,
+                skipped_steps=skipped_steps,
+                only_steps=only_steps,
+                from_steps=from_steps,
+                until_steps=until_steps,
+            )
+        except ValueError as e:
+            LOGGER.error(str(e))
+            raise click.Abort()
+        display_prediction(prediction)
+        return
+
     # Run the template
     success, _ = run_template(
         template_path=template,
@@ -111,6 +312,22 @@ def run_command(
         display_env=display_env,
         skipped_steps=skipped_steps,
         exit_handlers=exit_handlers,
+        event_file=event_file,
+        stats_db=stats_db,
+        only_steps=only_steps,
+        from_steps=from_steps,
+        until_steps=until_steps,
+        outputs_from=outputs_from,
+        fail_fast=fail_fast,
+        max_parallel=max_parallel,
+        drain_timeout=drain_timeout,
+        grace_period=grace_period,
+        up_to_date_state=up_to_date_state,
+        artifact_store=artifact_store,
+        exit_handlers_parallel=exit_handlers_parallel,
+        exit_handler_timeout=exit_handler_timeout,
+        exit_handlers_timeout=exit_handlers_timeout,
+        simulation=simulation,
     )
 
     if not success:
@@ -0,0 +1,61 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import json
+
+from cosmotech.orchestrator.api.stats import display_step_stats
+from cosmotech.orchestrator.api.stats import get_step_stats
+from cosmotech.orchestrator.utils.click import click
+from cosmotech.orchestrator.utils.decorators import web_help
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+
+@click.command()
+@click.option(
+    "--stats-db",
+    "stats_db",
+    envvar="CSM_ORC_STATS_DB",
+    show_envvar=True,
+    required=True,
+    type=click.Path(dir_okay=False),
+    help="SQLite database filled by `csm-orc run --stats-db`",
+)
+@click.option(
+    "--by",
+    "group_by",
+    type=click.Choice(["step", "template"]),
+    default="step",
+    show_default=True,
+    help="Group durations per step of each orchestration file or per command template",
+)
+@click.option(
+    "--recent",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Number of latest executions compared to the older ones (the baseline)",
+)
+@click.option(
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=0.2,
+    show_default=True,
+    help="Flag a regression when the recent median duration exceeds the baseline median by this ratio",
+)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the statistics as JSON")
+@web_help("commands/stats")
+def stats_command(stats_db: str, group_by: str, recent: int, threshold: float, as_json: bool):
+    """Show p50/p95/p99 durations of the steps recorded by previous runs and flag regressions"""
+    try:
+        stats = get_step_stats(stats_db, group_by, recent, threshold)
+    except ValueError as e:
+        LOGGER.error(e)
+        raise click.Abort()
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+    else:
+        display_step_stats(stats)
@@ -1,8 +1,11 @@
 import pathlib
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
+from cosmotech.csm_orc_api.project_store import ProjectStore, ProjectVersionConflict
+from cosmotech.csm_orc_api.run_manager import RunManager
 from cosmotech.orchestrator.utils.logger import LOGGER
 from cosmotech.orchestrator import __version__ as orchestrator_version
 
@@ -22,6 +25,8 @@ async def lifespan(app: FastAPI):
     yield
 
     LOGGER.info("Stopping Visual Orchestrator API...")
+    await RunManager().shutdown()
+    ProjectStore().flush()
 
 
 # Code found on FastAPI discussion : https://github.com/fastapi/fastapi/discussions/6695#discussioncomment-8247988
@@ -62,10 +67,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-from .router.project import project_router
+from .router.project import project_router, VERSION_HEADER
+from .router.runs import run_router
+from .router.stats import stats_router
 from .router.templates import template_router
 
+
+@app.exception_handler(ProjectVersionConflict)
+async def project_version_conflict_handler(request: Request, exc: ProjectVersionConflict):
+    return JSONResponse(status_code=409, content={"detail": str(exc)}, headers={VERSION_HEADER: str(exc.version)})
+
+
 app.include_router(project_router)
+app.include_router(run_router)
+app.include_router(stats_router)
 app.include_router(template_router)
 
 # Serve built static files in release mode
@@ -0,0 +1,156 @@
+"""Minimal RFC 6902 (JSON Patch) implementation, operating in place on parsed JSON documents"""
+
+import copy
+from typing import Any
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    """Split an RFC 6901 JSON pointer into its unescaped tokens"""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Invalid JSON pointer '{pointer}'")
+    if not pointer:
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _list_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JsonPatchError(f"Invalid list index '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"List index {index} out of range")
+    return index
+
+
+def _resolve_parent(document: Any, tokens: list[str]) -> Any:
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, dict):
+            if token not in target:
+                raise JsonPatchError(f"Path member '{token}' not found")
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_list_index(target, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Cannot reach '{token}' inside a scalar value")
+    return target
+
+
+def _get(document: Any, pointer: str) -> Any:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return document
+    parent = _resolve_parent(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"Path '{pointer}' not found")
+        return parent[token]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, token, allow_end=False)]
+    raise JsonPatchError(f"Path '{pointer}' not found")
+
+
+def _add(document: Any, pointer: str, value: Any) -> Any:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        return value
+    parent = _resolve_parent(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add '{pointer}' inside a scalar value")
+    return document
+
+
+def _remove(document: Any, pointer: str) -> Any:
+    tokens = _parse_pointer(pointer)
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent = _resolve_parent(document, tokens)
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise JsonPatchError(f"Path '{pointer}' not found")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token, allow_end=False))
+    raise JsonPatchError(f"Path '{pointer}' not found")
+
+
+def _json_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return "null"
+
+
+def _json_equal(first: Any, second: Any) -> bool:
+    """Equality of RFC 6902 `test`: values must have the same JSON type, `true` is not equal to `1`"""
+    if _json_type(first) != _json_type(second):
+        return False
+    if isinstance(first, list):
+        return len(first) == len(second) and all(_json_equal(a, b) for a, b in zip(first, second))
+    if isinstance(first, dict):
+        return first.keys() == second.keys() and all(_json_equal(v, second[k]) for k, v in first.items())
+    return first == second
+
+
+def apply_patch(document: Any, operations: list[dict]) -> Any:
+    """Apply a list of JSON Patch operations to `document` and return the result.
+
+    The document is modified in place (except when an operation replaces its root), callers wanting an
+    all-or-nothing application should patch a copy. Raises a JsonPatchError on the first invalid operation.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON Patch must be a list of operations")
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise JsonPatchError(f"Operation {index} requires an 'op' and a 'path'")
+        op, path = operation["op"], operation["path"]
+        try:
+            if op in ("add", "replace", "test") and "value" not in operation:
+                raise JsonPatchError(f"'{op}' requires a 'value'")
+            if op in ("move", "copy") and "from" not in operation:
+                raise JsonPatchError(f"'{op}' requires a 'from'")
+            if op == "add":
+                document = _add(document, path, copy.deepcopy(operation["value"]))
+            elif op == "remove":
+                _remove(document, path)
+            elif op == "replace":
+                _get(document, path)
+                if _parse_pointer(path):
+                    _remove(document, path)
+                document = _add(document, path, copy.deepcopy(operation["value"]))
+            elif op == "move":
+                source = operation["from"]
+                if path != source and path.startswith(source + "/"):
+                    raise JsonPatchError("Cannot move a value inside itself")
+                value = _get(document, source) if not _parse_pointer(source) else _remove(document, source)
+                document = _add(document, path, value)
+            elif op == "copy":
+                document = _add(document, path, copy.deepcopy(_get(document, operation["from"])))
+            elif op == "test":
+                if not _json_equal(_get(document, path), operation["value"]):
+                    raise JsonPatchError(f"Test failed on '{path}'")
+            else:
+                raise JsonPatchError(f"Unknown operation '{op}'")
+        except JsonPatchError as e:
+            raise JsonPatchError(f"Operation {index} ({op} {path}): {e}") from None
+    return document
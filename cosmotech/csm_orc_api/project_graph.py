@@ -0,0 +1,239 @@
+from collections import deque
+from typing import Iterable
+
+
+class GraphCycleError(ValueError):
+    pass
+
+
+class ProjectGraph:
+    """Dependency graph of the steps of a project, kept up to date edit by edit.
+
+    Holds the forward (successors) and reverse (predecessors) adjacency of the steps and a topological order.
+    Adding a link only looks at the steps placed between its two ends in the current order
+    (Pearce-Kelly dynamic topological sort), which both detects cycles and repairs the order,
+    so editing a link or renaming a step costs a time proportional to the affected part of the graph.
+
+    Precedents referencing a step that does not exist are kept aside as `dangling` references
+    and get linked if a step with that id is created later.
+    """
+
+    def __init__(self, steps: Iterable[dict]):
+        self.steps: dict[str, dict] = dict()
+        self.successors: dict[str, dict[str, None]] = dict()
+        self.predecessors: dict[str, dict[str, None]] = dict()
+        self.dangling: dict[str, dict[str, None]] = dict()
+        self.order: dict[str, int] = dict()
+        self.acyclic = True
+        self._next_order = 0
+
+        for step in steps:
+            self.steps[step["id"]] = step
+            self.successors[step["id"]] = dict()
+            self.predecessors[step["id"]] = dict()
+        for step_id, step in self.steps.items():
+            for precedent in step.get("precedents", []):
+                if precedent in self.steps:
+                    self.successors[precedent][step_id] = None
+                    self.predecessors[step_id][precedent] = None
+                else:
+                    self.dangling.setdefault(precedent, dict())[step_id] = None
+
+        in_degree = {step_id: len(precedents) for step_id, precedents in self.predecessors.items()}
+        ready = deque(step_id for step_id, degree in in_degree.items() if not degree)
+        while ready:
+            step_id = ready.popleft()
+            self._place(step_id)
+            for successor in self.successors[step_id]:
+                in_degree[successor] -= 1
+                if not in_degree[successor]:
+                    ready.append(successor)
+        if len(self.order) < len(self.steps):
+            # The file already contains a cycle, keep a best effort order and fall back to full graph searches
+            self.acyclic = False
+            for step_id in self.steps:
+                if step_id not in self.order:
+                    self._place(step_id)
+
+    def _place(self, step_id: str):
+        self.order[step_id] = self._next_order
+        self._next_order += 1
+
+    def topological_order(self) -> list[str]:
+        return sorted(self.order, key=self.order.__getitem__)
+
+    def _reaches(self, start: str, goal: str) -> bool:
+        stack = [start]
+        visited = {start}
+        while stack:
+            current = stack.pop()
+            if current == goal:
+                return True
+            for successor in self.successors[current]:
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append(successor)
+        return False
+
+    def _forward(self, start: str, upper_bound: int) -> list[str]:
+        stack = [start]
+        visited = {start}
+        while stack:
+            current = stack.pop()
+            for successor in self.successors[current]:
+                position = self.order[successor]
+                if position == upper_bound:
+                    raise GraphCycleError(successor)
+                if successor not in visited and position < upper_bound:
+                    visited.add(successor)
+                    stack.append(successor)
+        return list(visited)
+
+    def _backward(self, start: str, lower_bound: int) -> list[str]:
+        stack = [start]
+        visited = {start}
+        while stack:
+            current = stack.pop()
+            for predecessor in self.predecessors[current]:
+                if predecessor not in visited and self.order[predecessor] > lower_bound:
+                    visited.add(predecessor)
+                    stack.append(predecessor)
+        return list(visited)
+
+    def _add_edge(self, source: str, target: str) -> bool:
+        if target in self.successors[source]:
+            return False
+        if source == target:
+            raise GraphCycleError(source)
+        if self.acyclic:
+            lower_bound, upper_bound = self.order[target], self.order[source]
+            if lower_bound < upper_bound:
+                forward = self._forward(target, upper_bound)
+                backward = self._backward(source, lower_bound)
+                backward.sort(key=self.order.__getitem__)
+                forward.sort(key=self.order.__getitem__)
+                moved = backward + forward
+                for step_id, position in zip(moved, sorted(self.order[s] for s in moved)):
+                    self.order[step_id] = position
+        elif self._reaches(target, source):
+            raise GraphCycleError(source)
+        self.successors[source][target] = None
+        self.predecessors[target][source] = None
+        return True
+
+    def _remove_edge(self, source: str, target: str):
+        self.successors[source].pop(target, None)
+        self.predecessors[target].pop(source, None)
+
+    def _add_edges(self, edges: list[tuple[str, str]]):
+        added = list()
+        try:
+            for source, target in edges:
+                if self._add_edge(source, target):
+                    added.append((source, target))
+        except GraphCycleError:
+            for source, target in added:
+                self._remove_edge(source, target)
+            raise
+
+    def add_link(self, source: str, target: str):
+        """Make `source` a precedent of `target`, raises a GraphCycleError if it would create a cycle"""
+        self._add_edge(source, target)
+
+    def remove_link(self, source: str, target: str):
+        if source in self.steps:
+            self._remove_edge(source, target)
+        else:
+            self._set_dangling(target, [source], present=False)
+
+    def add_step(self, step: dict):
+        """Register a new step, raises a GraphCycleError (leaving the graph untouched) if it would create a cycle"""
+        step_id = step["id"]
+        self.steps[step_id] = step
+        self.successors[step_id] = dict()
+        self.predecessors[step_id] = dict()
+        self._place(step_id)
+        waiting = self.dangling.pop(step_id, dict())
+        try:
+            self._add_edges(
+                [(precedent, step_id) for precedent in step.get("precedents", []) if precedent in self.steps]
+                + [(step_id, successor) for successor in waiting]
+            )
+        except GraphCycleError:
+            if waiting:
+                self.dangling[step_id] = waiting
+            self.remove_step(step_id)
+            raise
+        self._set_dangling(step_id, step.get("precedents", []), present=True)
+
+    def remove_step(self, step_id: str) -> list[str]:
+        """Unregister a step, returns the ids of the steps that used it as a precedent"""
+        step = self.steps.pop(step_id)
+        for precedent in self.predecessors.pop(step_id):
+            self.successors[precedent].pop(step_id, None)
+        successors = list(self.successors.pop(step_id))
+        for successor in successors:
+            self.predecessors[successor].pop(step_id, None)
+        for precedent in step.get("precedents", []):
+            if precedent in self.dangling:
+                self.dangling[precedent].pop(step_id, None)
+                if not self.dangling[precedent]:
+                    del self.dangling[precedent]
+        del self.order[step_id]
+        return successors
+
+    def _relabel(self, old_id: str, new_id: str):
+        self.steps[new_id] = self.steps.pop(old_id)
+        self.order[new_id] = self.order.pop(old_id)
+        self.successors[new_id] = self.successors.pop(old_id)
+        self.predecessors[new_id] = self.predecessors.pop(old_id)
+        for successor in self.successors[new_id]:
+            _predecessors = self.predecessors[successor]
+            self.predecessors[successor] = {new_id if p == old_id else p: None for p in _predecessors}
+        for predecessor in self.predecessors[new_id]:
+            _successors = self.successors[predecessor]
+            self.successors[predecessor] = {new_id if s == old_id else s: None for s in _successors}
+
+    def _set_dangling(self, step_id: str, precedents: Iterable[str], present: bool):
+        for precedent in precedents:
+            if precedent in self.steps:
+                continue
+            if present:
+                self.dangling.setdefault(precedent, dict())[step_id] = None
+            elif precedent in self.dangling:
+                self.dangling[precedent].pop(step_id, None)
+                if not self.dangling[precedent]:
+                    del self.dangling[precedent]
+
+    def update_step(self, step_id: str, step_data: dict) -> list[str]:
+        """Apply a new definition (id and precedents) to an existing step.
+
+        The caller must have checked that the new id is not used by another step.
+        Raises a GraphCycleError, leaving the graph untouched, if the new precedents would create a cycle.
+        Returns the ids of the steps using the step as a precedent.
+        """
+        new_id = step_data["id"]
+        old_precedents = list(self.steps[step_id].get("precedents", []))
+        new_precedents = list(step_data.get("precedents", []))
+        self._set_dangling(step_id, old_precedents, present=False)
+        if new_id != step_id:
+            self._relabel(step_id, new_id)
+        waiting = self.dangling.pop(new_id, dict()) if new_id != step_id else dict()
+        removed = [p for p in self.predecessors[new_id] if p not in new_precedents]
+        for precedent in removed:
+            self._remove_edge(precedent, new_id)
+        try:
+            self._add_edges(
+                [(precedent, new_id) for precedent in new_precedents if precedent in self.steps]
+                + [(new_id, successor) for successor in waiting]
+            )
+        except GraphCycleError:
+            self._add_edges([(precedent, new_id) for precedent in removed])
+            if waiting:
+                self.dangling[new_id] = waiting
+            if new_id != step_id:
+                self._relabel(new_id, step_id)
+            self._set_dangling(step_id, old_precedents, present=True)
+            raise
+        self._set_dangling(new_id, new_precedents, present=True)
+        return list(self.successors[new_id])
@@ -0,0 +1,94 @@
+import functools
+from collections import deque
+
+from cosmotech.csm_orc_api.project_graph import ProjectGraph
+
+NODE_WIDTH = 172
+NODE_HEIGHT = 36
+NODE_SEPARATION = 50
+LAYER_SEPARATION = 80
+ORDERING_SWEEPS = 4
+
+GraphStructure = tuple[tuple[str, tuple[str, ...]], ...]
+
+
+def graph_structure(graph: ProjectGraph) -> GraphStructure:
+    """The part of a project graph the layout depends on: step ids (in file order) and their precedents"""
+    return tuple((step_id, tuple(graph.predecessors[step_id])) for step_id in graph.steps)
+
+
+def _layers(structure: GraphStructure) -> dict[str, int]:
+    """Longest path layering: each step sits one layer below its lowest precedent"""
+    successors = {step_id: list() for step_id, _ in structure}
+    in_degree = dict()
+    for step_id, precedents in structure:
+        in_degree[step_id] = len(precedents)
+        for precedent in precedents:
+            successors[precedent].append(step_id)
+    layers = {step_id: 0 for step_id, degree in in_degree.items() if not degree}
+    ready = deque(layers)
+    while ready:
+        step_id = ready.popleft()
+        for successor in successors[step_id]:
+            layers[successor] = max(layers.get(successor, 0), layers[step_id] + 1)
+            in_degree[successor] -= 1
+            if not in_degree[successor]:
+                ready.append(successor)
+    # Steps in a cycle never get ready, put them below their placed precedents
+    for step_id, precedents in structure:
+        if step_id not in layers:
+            layers[step_id] = 1 + max((layers[p] for p in precedents if p in layers), default=-1)
+    return layers
+
+
+def _barycenter_sweep(rows: list[list[str]], neighbours: dict[str, list[str]], descending: bool):
+    positions = {step_id: index for row in rows for index, step_id in enumerate(row)}
+    for row in rows if descending else reversed(rows):
+
+        def barycenter(step_id: str) -> float:
+            placed = [positions[n] for n in neighbours[step_id]]
+            return sum(placed) / len(placed) if placed else positions[step_id]
+
+        row.sort(key=barycenter)
+        for index, step_id in enumerate(row):
+            positions[step_id] = index
+
+
+@functools.lru_cache(maxsize=64)
+def layered_layout(structure: GraphStructure) -> dict:
+    """Compute a top-down layered layout of a project graph.
+
+    Steps are assigned to layers by longest path, then the order of the steps inside each layer is improved by
+    alternating downward and upward barycenter sweeps to reduce edge crossings.
+    Results are cached by graph structure, edits that do not touch step ids or links reuse the previous layout.
+
+    Returns the layer and top-left position of every step, and the size of the whole drawing.
+    """
+    layers = _layers(structure)
+    rows: list[list[str]] = [list() for _ in range(1 + max(layers.values(), default=-1))]
+    for step_id, _ in structure:
+        rows[layers[step_id]].append(step_id)
+
+    predecessors = {step_id: list(precedents) for step_id, precedents in structure}
+    successors = {step_id: list() for step_id, _ in structure}
+    for step_id, precedents in structure:
+        for precedent in precedents:
+            successors[precedent].append(step_id)
+    for sweep in range(ORDERING_SWEEPS):
+        if sweep % 2:
+            _barycenter_sweep(rows, successors, descending=False)
+        else:
+            _barycenter_sweep(rows, predecessors, descending=True)
+
+    width = max((len(row) * (NODE_WIDTH + NODE_SEPARATION) - NODE_SEPARATION for row in rows), default=0)
+    nodes = dict()
+    for layer, row in enumerate(rows):
+        offset = (width - (len(row) * (NODE_WIDTH + NODE_SEPARATION) - NODE_SEPARATION)) / 2
+        for index, step_id in enumerate(row):
+            nodes[step_id] = {
+                "layer": layer,
+                "x": offset + index * (NODE_WIDTH + NODE_SEPARATION),
+                "y": layer * (NODE_HEIGHT + LAYER_SEPARATION),
+            }
+    height = len(rows) * (NODE_HEIGHT + LAYER_SEPARATION) - LAYER_SEPARATION if rows else 0
+    return {"nodes": nodes, "width": width, "height": height}
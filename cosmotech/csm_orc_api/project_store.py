@@ -0,0 +1,293 @@
+import atexit
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from cosmotech.csm_orc_api.project_graph import ProjectGraph
+from cosmotech.orchestrator.utils.singleton import Singleton
+
+PROJECT_FILE_NAME = "run.json"
+
+
+def _sub_path_prefix(directory: str) -> str:
+    return "" if directory == os.curdir else directory + os.sep
+
+
+def _file_key(project_path: pathlib.Path) -> tuple[int, int]:
+    stat = os.stat(project_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_atomically(project_path: pathlib.Path, content: dict):
+    """Write a project file through a temporary file renamed over the target, so readers never see a partial file"""
+    _tmp = tempfile.NamedTemporaryFile(
+        "w", dir=project_path.parent, prefix=f".{project_path.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with _tmp:
+            json.dump(content, _tmp, indent=4)
+            _tmp.flush()
+            os.fsync(_tmp.fileno())
+        if project_path.exists():
+            shutil.copymode(project_path, _tmp.name)
+        os.replace(_tmp.name, project_path)
+    except BaseException:
+        pathlib.Path(_tmp.name).unlink(missing_ok=True)
+        raise
+
+
+class ProjectVersionConflict(Exception):
+    def __init__(self, project_path: pathlib.Path, expected_version: int, version: int):
+        super().__init__(f"Project '{project_path.parent.name}' is at version {version}, not {expected_version}")
+        self.expected_version = expected_version
+        self.version = version
+
+
+class ProjectDocument:
+    """In-memory content of a project file, the reference for every read and edit made through the API.
+
+    Edits are made under a per-document lock and increase the document `version`, which clients can send back
+    to detect concurrent modifications. Edits are not written one by one: the first edit schedules a write
+    `write_delay` seconds later, and every edit made in the meantime is saved by that same write.
+    """
+
+    def __init__(self, project_path: pathlib.Path, write_delay: float = 0.2):
+        self.path = project_path
+        self.write_delay = write_delay
+        self.lock = threading.RLock()
+        # Versions restart from 0 when a project file gets loaded in a new document, the id tells them apart
+        self.id = uuid.uuid4().hex
+        self.version = 0
+        self.content: dict = dict()
+        self._graph: Optional[ProjectGraph] = None
+        self._file_key: Optional[tuple[int, int]] = None
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.reload()
+
+    def reload(self):
+        """Read the project file again, used when it got modified outside the API"""
+        with self.lock:
+            self._file_key = _file_key(self.path)
+            with open(self.path) as f:
+                self.content = json.load(f)
+            self._graph = None
+            self.version += 1
+
+    @property
+    def graph(self) -> ProjectGraph:
+        """Dependency graph of the steps, edits of steps and links have to keep it in sync with the content"""
+        with self.lock:
+            if self._graph is None:
+                self._graph = ProjectGraph(self.content.get("steps", []))
+            return self._graph
+
+    def is_stale(self) -> bool:
+        """Check if the project file changed on disk since it was last read or written, ignoring pending edits"""
+        with self.lock:
+            if self._dirty:
+                return False
+            try:
+                return _file_key(self.path) != self._file_key
+            except OSError:
+                return False
+
+    @contextmanager
+    def edit(self, expected_version: Optional[int] = None):
+        """Lock the document and give access to its content for modification.
+
+        Exceptions raised inside the block leave the version untouched and schedule no write,
+        so callers should validate their request before mutating the content.
+        """
+        with self.lock:
+            if expected_version is not None and expected_version != self.version:
+                raise ProjectVersionConflict(self.path, expected_version, self.version)
+            yield self.content
+            self.version += 1
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def replace(self, content: dict, graph: ProjectGraph, expected_version: Optional[int] = None):
+        """Swap the whole content (and its already built graph) in a single edit"""
+        with self.edit(expected_version) as _content:
+            _content.clear()
+            _content.update(content)
+            self._graph = graph
+
+    def flush(self):
+        """Write pending edits to the project file"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            write_atomically(self.path, self.content)
+            self._file_key = _file_key(self.path)
+            self._dirty = False
+
+    def discard(self):
+        """Drop pending edits, used when the project gets deleted"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+
+
+class ProjectStore(metaclass=Singleton):
+    """In-memory index of the projects (`run.json` files) found below the working directory.
+
+    The tree is walked once, recording the modification time of every directory met on the way.
+    Adding or removing an entry changes the mtime of its parent directory, so keeping the index fresh only
+    requires a `stat` of the known directories (throttled to one check every `refresh_interval` seconds),
+    and only the directories that changed are listed again.
+
+    Each project file is parsed once into a `ProjectDocument`, parsed again only when the file changes on disk.
+    """
+
+    def __init__(self, root: str = ".", refresh_interval: float = 2.0, write_delay: float = 0.2):
+        self.root = os.path.normpath(root)
+        self.refresh_interval = refresh_interval
+        self.write_delay = write_delay
+        self._lock = threading.RLock()
+        self._directories: dict[str, int] = dict()
+        self._project_dirs: set[str] = set()
+        self._project_files: list[pathlib.Path] = list()
+        self._by_name: dict[str, pathlib.Path] = dict()
+        self._documents: dict[pathlib.Path, ProjectDocument] = dict()
+        self._checked_at: Optional[float] = None
+        # Pending writes run on daemon timers, make sure they are not lost if the process exits first
+        atexit.register(self.flush)
+
+    def _scan(self, directory: str):
+        for dirpath, _, filenames in os.walk(directory):
+            dirpath = os.path.normpath(dirpath)
+            try:
+                self._directories[dirpath] = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                continue
+            if PROJECT_FILE_NAME in filenames and os.path.isfile(os.path.join(dirpath, PROJECT_FILE_NAME)):
+                self._project_dirs.add(dirpath)
+
+    def _drop(self, directory: str):
+        prefix = _sub_path_prefix(directory)
+        for _dir in [d for d in self._directories if d == directory or d.startswith(prefix)]:
+            del self._directories[_dir]
+            self._project_dirs.discard(_dir)
+
+    def _rescan(self, directory: str):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._drop(directory)
+            return
+        self._directories[directory] = mtime
+        self._project_dirs.discard(directory)
+        prefix = _sub_path_prefix(directory)
+        known_children = {
+            d for d in self._directories if d != directory and d.startswith(prefix) and os.sep not in d[len(prefix) :]
+        }
+        for entry in entries:
+            if entry.name == PROJECT_FILE_NAME and entry.is_file():
+                self._project_dirs.add(directory)
+            elif entry.is_dir(follow_symlinks=False):
+                _child = os.path.normpath(os.path.join(directory, entry.name))
+                if _child in known_children:
+                    known_children.discard(_child)
+                else:
+                    self._scan(_child)
+        for _child in known_children:
+            self._drop(_child)
+
+    def _rebuild_index(self):
+        self._project_files = sorted(pathlib.Path(d) / PROJECT_FILE_NAME for d in self._project_dirs)
+        self._by_name = dict()
+        for _path in self._project_files:
+            self._by_name.setdefault(_path.parent.name, _path)
+        known = set(self._project_files)
+        for _path in [p for p in self._documents if p not in known]:
+            self._documents.pop(_path).discard()
+
+    def refresh(self, force: bool = False):
+        """Bring the project index up to date with the file system"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None:
+                self._scan(self.root)
+            elif force or now - self._checked_at >= self.refresh_interval:
+                changed = list()
+                for _dir, _mtime in self._directories.items():
+                    try:
+                        if os.stat(_dir).st_mtime_ns != _mtime:
+                            changed.append(_dir)
+                    except OSError:
+                        changed.append(_dir)
+                if not changed:
+                    self._checked_at = now
+                    return
+                for _dir in changed:
+                    if _dir in self._directories:
+                        self._rescan(_dir)
+            else:
+                return
+            self._checked_at = now
+            self._rebuild_index()
+
+    def project_files(self) -> list[pathlib.Path]:
+        """Sorted list of the known `run.json` files"""
+        self.refresh()
+        return self._project_files
+
+    def find(self, project_name: str) -> Optional[pathlib.Path]:
+        """Get the `run.json` of a project from its name (name of the folder containing the file)"""
+        self.refresh()
+        return self._by_name.get(project_name)
+
+    def add_project(self, project_path: pathlib.Path, content: dict):
+        """Create a new project file and register it without waiting for the next refresh"""
+        with self._lock:
+            write_atomically(project_path, content)
+            self._project_dirs.add(os.path.normpath(project_path.parent))
+            self._rebuild_index()
+
+    def remove_project(self, project_path: pathlib.Path):
+        """Forget a project removed by the API without waiting for the next refresh"""
+        with self._lock:
+            self._drop(os.path.normpath(project_path.parent))
+            self._rebuild_index()
+
+    def open(self, project_path: pathlib.Path) -> ProjectDocument:
+        """Get the in-memory document of a project file, loading it on first access or if it changed on disk"""
+        with self._lock:
+            document = self._documents.get(project_path)
+            if document is None:
+                document = self._documents[project_path] = ProjectDocument(project_path, self.write_delay)
+            elif document.is_stale():
+                document.reload()
+            return document
+
+    def load(self, project_path: pathlib.Path) -> dict:
+        """Get the content of a project file"""
+        return self.open(project_path).content
+
+    def flush(self, project_path: Optional[pathlib.Path] = None):
+        """Write pending edits of a project, or of every project if none is given"""
+        with self._lock:
+            if project_path is None:
+                documents = list(self._documents.values())
+            else:
+                documents = [self._documents[project_path]] if project_path in self._documents else []
+        for document in documents:
+            document.flush()
@@ -1,15 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Response
 from fastapi.responses import StreamingResponse
+import copy
+import functools
 import pathlib
 import json
-from typing import Annotated
+from typing import Annotated, Optional
 import subprocess
 import asyncio
 import os
 
+import jsonschema
 
-def find_projects():
-    yield sorted(pathlib.Path(".").glob("**/run.json"))
+from cosmotech.csm_orc_api.json_patch import JsonPatchError, apply_patch
+from cosmotech.csm_orc_api.project_graph import GraphCycleError, ProjectGraph
+from cosmotech.csm_orc_api.project_layout import graph_structure, layered_layout
+from cosmotech.csm_orc_api.project_store import ProjectDocument, ProjectStore, ProjectVersionConflict
+from cosmotech.csm_orc_api.router.runs import runManagerDependency, stream_run_events
+from cosmotech.csm_orc_api.router.templates import libraryDependency
+
+VERSION_HEADER = "X-Project-Version"
+
+
+def get_project_store():
+    yield ProjectStore()
+
+
+projectStoreDependency = Annotated[ProjectStore, Depends(get_project_store)]
+
+
+def find_projects(store: projectStoreDependency):
+    yield store.project_files()
 
 
 projectListDependency = Annotated[list, Depends(find_projects)]
@@ -17,8 +37,8 @@ projectListDependency = Annotated[list, Depends(find_projects)]
 project_router = APIRouter(prefix="/project", tags=["Project"])
 
 
-def find_project_path(project_name: str, project_files: projectListDependency):
-    project_path = next((p for p in project_files if p.parent.name == project_name), None)
+def find_project_path(project_name: str, store: projectStoreDependency):
+    project_path = store.find(project_name)
     if project_path is None:
         raise HTTPException(status_code=404, detail=f"Project '{project_name}' not found")
     return project_path
@@ -27,6 +47,22 @@ def find_project_path(project_name: str, project_files: projectListDependency):
 projectPathDependency = Annotated[pathlib.Path, Depends(find_project_path)]
 
 
+def get_project_document(project_path: projectPathDependency, store: projectStoreDependency, response: Response):
+    document = store.open(project_path)
+    response.headers[VERSION_HEADER] = str(document.version)
+    return document
+
+
+projectDocumentDependency = Annotated[ProjectDocument, Depends(get_project_document)]
+expectedVersionHeader = Annotated[
+    Optional[int],
+    Header(
+        alias=VERSION_HEADER,
+        description="Version of the project the edit is based on, the edit is refused if the project changed since",
+    ),
+]
+
+
 @project_router.get("/list")
 async def list_projects(project_files: projectListDependency):
     project_names = [p.parent.name for p in project_files]
@@ -34,7 +70,9 @@ async def list_projects(project_files: projectListDependency):
 
 
 @project_router.post("/create")
-async def create_project(project_data: dict = Body(...), project_files: projectListDependency = None):
+async def create_project(
+    store: projectStoreDependency, project_data: dict = Body(...), project_files: projectListDependency = None
+):
     name = project_data.get("name", "").strip()
     if not name:
         raise HTTPException(status_code=400, detail="Project name is required")
@@ -53,93 +91,155 @@ async def create_project(project_data: dict = Body(...), project_files: projectL
     project_dir = pathlib.Path("code/run_templates/") / name
     project_dir.mkdir(parents=True, exist_ok=False)
     run_json = project_dir / "run.json"
-    with open(run_json, "w") as f:
-        json.dump({"steps": []}, f, indent=4)
+    store.add_project(run_json, {"steps": []})
     return {"name": name}
 
 
+RUN_TEMPLATE_SCHEMA_PATH = (
+    pathlib.Path(__file__).parent.parent.parent / "orchestrator/schema/run_template_json_schema.json"
+)
+
+
+@functools.cache
+def get_run_template_schema() -> dict:
+    with RUN_TEMPLATE_SCHEMA_PATH.open() as f:
+        return json.load(f)
+
+
+@project_router.patch("/{project_name}")
+async def patch_project(
+    document: projectDocumentDependency,
+    response: Response,
+    expected_version: expectedVersionHeader = None,
+    operations: list[dict] = Body(..., description="RFC 6902 JSON Patch operations applied to the run.json content"),
+):
+    """Apply a batch of edits at once: the whole patch is validated (run template schema, unique step ids,
+    existing precedents, no cycle) and applied as a single edit, or refused without any change."""
+    with document.lock:
+        if expected_version is not None and expected_version != document.version:
+            raise ProjectVersionConflict(document.path, expected_version, document.version)
+        try:
+            content = apply_patch(copy.deepcopy(document.content), operations)
+        except JsonPatchError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            jsonschema.validate(content, get_run_template_schema())
+        except jsonschema.ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid project: {e.message}")
+        steps = content.get("steps", [])
+        step_ids = [step["id"] for step in steps]
+        duplicates = sorted({step_id for step_id in step_ids if step_ids.count(step_id) > 1})
+        if duplicates:
+            raise HTTPException(status_code=400, detail=f"Duplicated step ids: {', '.join(duplicates)}")
+        graph = ProjectGraph(steps)
+        if graph.dangling:
+            raise HTTPException(status_code=400, detail=f"Unknown precedents: {', '.join(sorted(graph.dangling))}")
+        if not graph.acyclic:
+            raise HTTPException(status_code=400, detail="This patch would create a cycle in the graph")
+        document.replace(content, graph)
+    response.headers[VERSION_HEADER] = str(document.version)
+    return document.content
+
+
 @project_router.get("/{project_name}/step/{step_id}")
-async def get_step(step_id, project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
-    step = next((s for s in project_content["steps"] if s["id"] == step_id), None)
+async def get_step(step_id, document: projectDocumentDependency):
+    step = document.graph.steps.get(step_id)
     if step is None:
         raise HTTPException(status_code=404, detail=f"Step '{step_id}' not found")
     return step
 
 
 @project_router.put("/{project_name}/step/{step_id}")
-async def update_step(step_id, project_path: projectPathDependency, step_data: dict = Body(...)):
-    with open(project_path) as f:
-        project_content = json.load(f)
-    step_index = next((i for i, s in enumerate(project_content["steps"]) if s["id"] == step_id), None)
-    if step_index is None:
-        raise HTTPException(status_code=404, detail=f"Step '{step_id}' not found")
-    if step_data["id"] != step_id:
-        for i, step in enumerate(project_content["steps"]):
-            if "precedents" in step:
-                project_content["steps"][i]["precedents"] = [
-                    precedent if precedent != step_id else step_data["id"] for precedent in step["precedents"]
+async def update_step(
+    step_id,
+    document: projectDocumentDependency,
+    response: Response,
+    expected_version: expectedVersionHeader = None,
+    step_data: dict = Body(...),
+):
+    if not step_data.get("id"):
+        raise HTTPException(status_code=400, detail="Step 'id' is required")
+    with document.edit(expected_version):
+        graph = document.graph
+        step = graph.steps.get(step_id)
+        if step is None:
+            raise HTTPException(status_code=404, detail=f"Step '{step_id}' not found")
+        new_id = step_data["id"]
+        if new_id != step_id and new_id in graph.steps:
+            raise HTTPException(status_code=409, detail=f"Step '{new_id}' already exists")
+        try:
+            successors = graph.update_step(step_id, step_data)
+        except GraphCycleError:
+            raise HTTPException(status_code=400, detail="These precedents would create a cycle in the graph")
+        if new_id != step_id:
+            for successor_id in successors:
+                successor = graph.steps[successor_id]
+                successor["precedents"] = [
+                    precedent if precedent != step_id else new_id for precedent in successor["precedents"]
                 ]
-    project_content["steps"][step_index] = step_data
-    with open(project_path, "w") as f:
-        json.dump(project_content, f, indent=4)
+        # Update in place to keep the step position in the file
+        step.clear()
+        step.update(step_data)
+    response.headers[VERSION_HEADER] = str(document.version)
     return step_data
 
 
 @project_router.post("/{project_name}/step")
-async def create_step(project_path: projectPathDependency, step_data: dict = Body(...)):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def create_step(
+    document: projectDocumentDependency,
+    response: Response,
+    expected_version: expectedVersionHeader = None,
+    step_data: dict = Body(...),
+):
     if not step_data.get("id"):
         raise HTTPException(status_code=400, detail="Step 'id' is required")
-    existing = next((s for s in project_content["steps"] if s["id"] == step_data["id"]), None)
-    if existing is not None:
-        raise HTTPException(status_code=409, detail=f"Step '{step_data['id']}' already exists")
-    project_content["steps"].append(step_data)
-    with open(project_path, "w") as f:
-        json.dump(project_content, f, indent=4)
+    with document.edit(expected_version) as project_content:
+        graph = document.graph
+        if step_data["id"] in graph.steps:
+            raise HTTPException(status_code=409, detail=f"Step '{step_data['id']}' already exists")
+        try:
+            graph.add_step(step_data)
+        except GraphCycleError:
+            raise HTTPException(status_code=400, detail="This step would create a cycle in the graph")
+        project_content["steps"].append(step_data)
+    response.headers[VERSION_HEADER] = str(document.version)
     return step_data
 
 
 @project_router.delete("/{project_name}/step/{step_id}")
-async def remove_step(step_id, project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
-    step_index = next((i for i, s in enumerate(project_content["steps"]) if s["id"] == step_id), None)
-    if step_index is None:
-        raise HTTPException(status_code=404, detail=f"Step '{step_id}' not found")
-    for i, step in enumerate(project_content["steps"]):
-        if "precedents" in step:
-            project_content["steps"][i]["precedents"] = [
-                precedent for precedent in step["precedents"] if precedent != step_id
-            ]
-    project_content["steps"].pop(step_index)
-    with open(project_path, "w") as f:
-        json.dump(project_content, f, indent=4)
+async def remove_step(
+    step_id, document: projectDocumentDependency, response: Response, expected_version: expectedVersionHeader = None
+):
+    with document.edit(expected_version) as project_content:
+        graph = document.graph
+        step = graph.steps.get(step_id)
+        if step is None:
+            raise HTTPException(status_code=404, detail=f"Step '{step_id}' not found")
+        for successor_id in graph.remove_step(step_id):
+            successor = graph.steps[successor_id]
+            successor["precedents"] = [precedent for precedent in successor["precedents"] if precedent != step_id]
+        project_content["steps"].remove(step)
+    response.headers[VERSION_HEADER] = str(document.version)
     return project_content
 
 
 @project_router.get("/{project_name}/steps")
-async def get_steps(project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def get_steps(document: projectDocumentDependency):
+    project_content = document.content
     steps = [s["id"] for s in project_content["steps"]]
     return steps
 
 
 @project_router.get("/{project_name}/precedents")
-async def get_steps_with_precedents(project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def get_steps_with_precedents(document: projectDocumentDependency):
+    project_content = document.content
     precedents = {s["id"]: s.get("precedents", []) for s in project_content["steps"]}
     return precedents
 
 
 @project_router.get("/{project_name}/outputs")
-async def get_step_outputs(project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def get_step_outputs(document: projectDocumentDependency):
+    project_content = document.content
     result = {}
     for step in project_content["steps"]:
         outputs = step.get("outputs", {})
@@ -149,93 +249,82 @@ async def get_step_outputs(project_path: projectPathDependency):
 
 
 @project_router.post("/{project_name}/link")
-async def add_link(project_path: projectPathDependency, link_data: dict = Body(...)):
+async def add_link(
+    document: projectDocumentDependency,
+    response: Response,
+    expected_version: expectedVersionHeader = None,
+    link_data: dict = Body(...),
+):
     source = link_data.get("source")
     target = link_data.get("target")
     if not source or not target:
         raise HTTPException(status_code=400, detail="Both 'source' and 'target' are required")
     if source == target:
         raise HTTPException(status_code=400, detail="Cannot link a step to itself")
-    with open(project_path) as f:
-        project_content = json.load(f)
-    step_ids = [s["id"] for s in project_content["steps"]]
-    if source not in step_ids:
-        raise HTTPException(status_code=404, detail=f"Source step '{source}' not found")
-    if target not in step_ids:
-        raise HTTPException(status_code=404, detail=f"Target step '{target}' not found")
-    target_step = next(s for s in project_content["steps"] if s["id"] == target)
-    precedents = target_step.get("precedents", [])
-    if source in precedents:
-        raise HTTPException(status_code=409, detail=f"Link already exists")
-    # Cycle detection: check if target can reach source through existing edges
-    adjacency = {}
-    for s in project_content["steps"]:
-        adjacency[s["id"]] = s.get("precedents", [])
-    # Add the proposed link temporarily
-    temp_precedents = adjacency.get(target, []) + [source]
-    adjacency[target] = temp_precedents
-    # BFS from source following reverse edges (precedents) to see if we reach target
-    visited = set()
-    queue = [source]
-    while queue:
-        current = queue.pop(0)
-        if current == target:
+    with document.edit(expected_version):
+        graph = document.graph
+        if source not in graph.steps:
+            raise HTTPException(status_code=404, detail=f"Source step '{source}' not found")
+        target_step = graph.steps.get(target)
+        if target_step is None:
+            raise HTTPException(status_code=404, detail=f"Target step '{target}' not found")
+        precedents = target_step.get("precedents", [])
+        if source in precedents:
+            raise HTTPException(status_code=409, detail=f"Link already exists")
+        try:
+            graph.add_link(source, target)
+        except GraphCycleError:
             raise HTTPException(status_code=400, detail="This link would create a cycle in the graph")
-        if current in visited:
-            continue
-        visited.add(current)
-        for p in adjacency.get(current, []):
-            queue.append(p)
-    precedents.append(source)
-    target_step["precedents"] = precedents
-    with open(project_path, "w") as f:
-        json.dump(project_content, f, indent=4)
+        precedents.append(source)
+        target_step["precedents"] = precedents
+    response.headers[VERSION_HEADER] = str(document.version)
     return {"source": source, "target": target}
 
 
 @project_router.delete("/{project_name}/link")
-async def remove_link(project_path: projectPathDependency, link_data: dict = Body(...)):
+async def remove_link(
+    document: projectDocumentDependency,
+    response: Response,
+    expected_version: expectedVersionHeader = None,
+    link_data: dict = Body(...),
+):
     source = link_data.get("source")
     target = link_data.get("target")
     remove_inputs = link_data.get("removeInputs", False)
     if not source or not target:
         raise HTTPException(status_code=400, detail="Both 'source' and 'target' are required")
-    with open(project_path) as f:
-        project_content = json.load(f)
-    target_step = next((s for s in project_content["steps"] if s["id"] == target), None)
-    if target_step is None:
-        raise HTTPException(status_code=404, detail=f"Target step '{target}' not found")
-    precedents = target_step.get("precedents", [])
-    if source not in precedents:
-        raise HTTPException(status_code=404, detail=f"Link not found")
-    precedents.remove(source)
-    target_step["precedents"] = precedents
-    removed_inputs = []
-    if remove_inputs and "inputs" in target_step:
-        inputs_to_remove = [name for name, defn in target_step["inputs"].items() if defn.get("stepId") == source]
-        for name in inputs_to_remove:
+    with document.edit(expected_version):
+        graph = document.graph
+        target_step = graph.steps.get(target)
+        if target_step is None:
+            raise HTTPException(status_code=404, detail=f"Target step '{target}' not found")
+        precedents = target_step.get("precedents", [])
+        if source not in precedents:
+            raise HTTPException(status_code=404, detail=f"Link not found")
+        removed_inputs = []
+        if remove_inputs and "inputs" in target_step:
+            removed_inputs = [name for name, defn in target_step["inputs"].items() if defn.get("stepId") == source]
+        precedents.remove(source)
+        target_step["precedents"] = precedents
+        if source not in precedents:
+            graph.remove_link(source, target)
+        for name in removed_inputs:
             del target_step["inputs"][name]
-            removed_inputs.append(name)
-        if not target_step["inputs"]:
+        if removed_inputs and not target_step["inputs"]:
             del target_step["inputs"]
-    with open(project_path, "w") as f:
-        json.dump(project_content, f, indent=4)
+    response.headers[VERSION_HEADER] = str(document.version)
     return {"source": source, "target": target, "removedInputs": removed_inputs}
 
 
 @project_router.get("/{project_name}/links")
-async def get_step_links(project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def get_step_links(document: projectDocumentDependency):
+    project_content = document.content
     links = [(precedent, step["id"]) for step in project_content["steps"] for precedent in step.get("precedents", [])]
     return links
 
 
-@project_router.get("/{project_name}/environment")
-async def get_project_environment(project_path: projectPathDependency):
+def collect_project_environment(project_content: dict) -> dict:
     """Collect all environment variables from steps and their templates."""
-    with open(project_path) as f:
-        project_content = json.load(f)
 
     # Try to load templates
     from cosmotech.orchestrator.templates.library import Library
@@ -304,8 +393,70 @@ async def get_project_environment(project_path: projectPathDependency):
     return env_vars
 
 
+@project_router.get("/{project_name}/environment")
+async def get_project_environment(document: projectDocumentDependency):
+    """Collect all environment variables from steps and their templates."""
+    return collect_project_environment(document.content)
+
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@project_router.get("/{project_name}/graph")
+async def get_project_graph(
+    document: projectDocumentDependency,
+    library: libraryDependency,
+    if_none_match: Annotated[Optional[str], Header(alias="If-None-Match")] = None,
+):
+    """Everything needed to draw a project in one payload: steps positioned by a layered layout, links,
+    outputs and environment. The ETag identifies the project version and the template library it was built
+    from (checked for changed template files first), send it back in If-None-Match to get a 304 (without building
+    the payload) while both are unchanged."""
+    with document.lock:
+        version = document.version
+        etag = f'"{document.id}-{version}-{library.generation}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", VERSION_HEADER: str(version)}
+        if _etag_matches(etag, if_none_match):
+            return Response(status_code=304, headers=headers)
+        project_content = document.content
+        layout = layered_layout(graph_structure(document.graph))
+        payload = {
+            "nodes": [
+                {
+                    "id": step["id"],
+                    "layer": layout["nodes"][step["id"]]["layer"],
+                    "position": {"x": layout["nodes"][step["id"]]["x"], "y": layout["nodes"][step["id"]]["y"]},
+                }
+                for step in project_content["steps"]
+            ],
+            "edges": [
+                {"source": precedent, "target": step["id"]}
+                for step in project_content["steps"]
+                for precedent in step.get("precedents", [])
+            ],
+            "outputs": {
+                step["id"]: list(step["outputs"].keys()) for step in project_content["steps"] if step.get("outputs")
+            },
+            "environment": collect_project_environment(project_content),
+            "size": {"width": layout["width"], "height": layout["height"]},
+        }
+    return Response(content=json.dumps(payload).encode("utf-8"), media_type="application/json", headers=headers)
+
+
 @project_router.post("/{project_name}/run")
-async def run_project(project_path: projectPathDependency, run_data: dict = Body(default={})):
+async def run_project(
+    project_path: projectPathDependency,
+    store: projectStoreDependency,
+    manager: runManagerDependency,
+    run_data: dict = Body(default={}),
+):
+    # The run reads the project file, make sure pending edits are written first
+    store.flush(project_path)
+
     # Build environment for the subprocess
     env = os.environ.copy()
     user_env = run_data.get("environment", {})
@@ -313,48 +464,25 @@ async def run_project(project_path: projectPathDependency, run_data: dict = Body
         if v is not None and v != "":
             env[k] = str(v)
 
-    # Build skip-step arguments
-    skipped_steps = run_data.get("skippedSteps", [])
-    skip_args = []
-    for step_id in skipped_steps:
-        skip_args.extend(["--skip-step", step_id])
-
-    async def event_stream():
-        proc = await asyncio.create_subprocess_exec(
-            "csm-orc",
-            "run",
-            *skip_args,
-            str(project_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT,
-            env=env,
-        )
-        try:
-            async for line in proc.stdout:
-                text = line.decode("utf-8", errors="replace").rstrip("\n")
-                yield f"data: {json.dumps({'type': 'log', 'text': text})}\n\n"
-            await proc.wait()
-            yield f"data: {json.dumps({'type': 'exit', 'code': proc.returncode})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'text': str(e)})}\n\n"
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    # The run goes on in the background, the response follows its events and can be resumed with its id
+    run = manager.start(project_path, env, run_data.get("skippedSteps", []))
+    return stream_run_events(run)
 
 
 @project_router.get("/{project_name}")
-async def get_content(project_path: projectPathDependency):
-    with open(project_path) as f:
-        project_content = json.load(f)
+async def get_content(document: projectDocumentDependency):
+    project_content = document.content
     return project_content
 
 
 @project_router.delete("/{project_name}")
-async def delete_project(project_path: projectPathDependency):
+async def delete_project(project_path: projectPathDependency, store: projectStoreDependency):
     try:
         # Remove the entire project directory
         import shutil
 
         shutil.rmtree(project_path.parent)
+        store.remove_project(project_path)
         return {"detail": f"Project '{project_path.parent.name}' deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting project: {str(e)}")
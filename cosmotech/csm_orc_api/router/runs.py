@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, Header, Path, Query
+from fastapi.responses import StreamingResponse
+import json
+from typing import Annotated, Optional
+from fastapi import Depends
+
+from cosmotech.csm_orc_api.run_manager import ProjectRun, RunManager
+
+RUN_ID_HEADER = "X-Run-Id"
+
+
+def get_run_manager():
+    yield RunManager()
+
+
+runManagerDependency = Annotated[RunManager, Depends(get_run_manager)]
+
+
+def get_run(run_id: Annotated[str, Path(description="Id of the run")], manager: runManagerDependency):
+    run = manager.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run '{run_id}' not found")
+    return run
+
+
+runDependency = Annotated[ProjectRun, Depends(get_run)]
+
+run_router = APIRouter(prefix="/run", tags=["Run"])
+
+
+def stream_run_events(run: ProjectRun, offset: int = 0) -> StreamingResponse:
+    """Server-sent events of a run starting at `offset`.
+
+    Events are sent in batches, one `{"type": "batch", "events": [...]}` frame per batch,
+    with the offset of the last event of the batch as SSE id.
+    """
+
+    async def event_stream():
+        async for batch_offset, events in run.follow(offset):
+            frame = json.dumps({"type": "batch", "events": events})
+            yield f"id: {batch_offset + len(events) - 1}\ndata: {frame}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={RUN_ID_HEADER: run.id})
+
+
+@run_router.get("/list")
+async def list_runs(manager: runManagerDependency):
+    return [run.summary() for run in manager.list_runs()]
+
+
+@run_router.get("/{run_id}")
+async def get_run_summary(run: runDependency):
+    return run.summary()
+
+
+@run_router.get("/{run_id}/events")
+async def get_run_events(
+    run: runDependency,
+    offset: Annotated[int, Query(ge=0, description="Offset of the first event to send")] = 0,
+    last_event_id: Annotated[
+        Optional[int], Header(alias="Last-Event-ID", description="Id of the last event received, to resume a stream")
+    ] = None,
+):
+    if last_event_id is not None:
+        offset = max(offset, last_event_id + 1)
+    return stream_run_events(run, offset)
+
+
+@run_router.post("/{run_id}/cancel")
+async def cancel_run(run: runDependency, manager: runManagerDependency):
+    await manager.cancel(run)
+    return run.summary()
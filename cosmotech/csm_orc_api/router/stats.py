@@ -0,0 +1,21 @@
+import os
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, HTTPException, Query
+
+from cosmotech.orchestrator.api.stats import get_step_stats
+
+stats_router = APIRouter(prefix="/stats", tags=["Statistics"])
+
+
+@stats_router.get("")
+async def step_stats(
+    by: Annotated[Literal["step", "template"], Query(description="Group durations per step or per template")] = "step",
+    recent: Annotated[int, Query(ge=1, description="Number of latest executions compared to the baseline")] = 5,
+    threshold: Annotated[float, Query(ge=0, description="Ratio above the baseline median flagging a regression")] = 0.2,
+):
+    """Duration percentiles (p50/p95/p99) of the steps recorded by previous runs, with regression flags"""
+    stats_db = os.environ.get("CSM_ORC_STATS_DB")
+    if not stats_db or not os.path.isfile(stats_db):
+        raise HTTPException(status_code=404, detail="No statistics database, start the GUI with --stats-db")
+    return {"by": by, "stats": get_step_stats(stats_db, by, recent, threshold)}
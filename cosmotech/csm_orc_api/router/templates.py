@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Path
-from typing import Annotated
+from fastapi import APIRouter, HTTPException, Path, Query
+import base64
+import binascii
+import json
+from typing import Annotated, Optional
 from fastapi import Depends
+from cosmotech.orchestrator.api.templates import template_to_dict
+from cosmotech.orchestrator.templates.index import sort_key
 from cosmotech.orchestrator.templates.library import Library
 
 from cosmotech.orchestrator.core.command_template import CommandTemplate
 
 
+# Template files are checked for changes at most once every LIBRARY_REFRESH_INTERVAL seconds
+LIBRARY_REFRESH_INTERVAL = 2.0
+
+
 def get_library():
-    yield Library()
+    library = Library()
+    library.refresh(min_interval=LIBRARY_REFRESH_INTERVAL)
+    yield library
 
 
 libraryDependency = Annotated[Library, Depends(get_library)]
@@ -30,6 +41,37 @@ async def list_templates(library: libraryDependency):
     return [t.id for t in library.templates]
 
 
+def encode_cursor(key: tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        plugin, template_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(plugin), str(template_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@template_router.get("/search")
+async def search_templates(
+    library: libraryDependency,
+    q: Annotated[
+        Optional[str], Query(description="Words to look for in template ids, descriptions and env vars")
+    ] = None,
+    sourcePlugin: Annotated[Optional[str], Query(description="Only return templates from this plugin")] = None,
+    cursor: Annotated[Optional[str], Query(description="`nextCursor` of the previous page")] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+):
+    """Page of template summaries sorted by plugin and id, `nextCursor` is null on the last page"""
+    after = decode_cursor(cursor) if cursor else None
+    page, more = library.index.search(q, sourcePlugin, after, limit)
+    return {
+        "items": [template_to_dict(t) for t in page],
+        "nextCursor": encode_cursor(sort_key(page[-1])) if more else None,
+    }
+
+
 @template_router.get("/{template_id}")
 async def get_template(template: templateDependency):
     return template.serialize()
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import pathlib
+import signal
+import time
+import uuid
+from enum import Enum
+from typing import Optional
+
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.singleton import Singleton
+
+
+class RunStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCESS = "SUCCESS"
+    ERROR = "ERROR"
+    CANCELLED = "CANCELLED"
+
+
+class ProjectRun:
+    """A `csm-orc run` of a project, with every event it produced stored in an append-only buffer.
+
+    Events are addressed by their offset in the buffer, so any number of clients can follow the run
+    and a client losing its connection can resume from the last offset it received.
+    """
+
+    def __init__(self, project_path: pathlib.Path, environment: dict[str, str], skipped_steps: list[str]):
+        self.id = uuid.uuid4().hex
+        self.project_path = project_path
+        self.environment = environment
+        self.skipped_steps = skipped_steps
+        self.status = RunStatus.QUEUED
+        self.return_code: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: list[dict] = list()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.task: Optional[asyncio.Task] = None
+        # The run stays RUNNING until its process exits, then ends CANCELLED whatever its exit code
+        self.cancel_requested = False
+        self.closed = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (RunStatus.SUCCESS, RunStatus.ERROR, RunStatus.CANCELLED)
+
+    async def append(self, event: dict):
+        self.events.append(event)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def close(self):
+        """Mark the end of the event buffer"""
+        self.closed = True
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def follow(self, offset: int = 0, batch_size: int = 500, batch_window: float = 0.05):
+        """Yield `(offset, events)` batches of the events from `offset`, waiting for new ones until the run is over.
+
+        A batch holds every event available (up to `batch_size`), and once caught up the next batch waits
+        `batch_window` seconds for more events. Events are only read when the consumer asks for the next batch,
+        so a slow client gets bigger batches instead of a growing queue of frames.
+        """
+        while True:
+            if offset < len(self.events):
+                batch = self.events[offset : offset + batch_size]
+                yield offset, batch
+                offset += len(batch)
+                continue
+            if self.closed:
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: offset < len(self.events) or self.closed)
+            if not self.closed:
+                await asyncio.sleep(batch_window)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "project": self.project_path.parent.name,
+            "status": self.status.value,
+            "returnCode": self.return_code,
+            "cancelRequested": self.cancel_requested,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "eventCount": len(self.events),
+        }
+
+
+class RunManager(metaclass=Singleton):
+    """Start project runs in the background, at most `max_parallel_runs` at a time, the others wait in a queue.
+
+    Only the `history_size` most recent finished runs are kept in memory.
+    `max_parallel_runs` defaults to the `CSM_ORC_GUI_MAX_RUNS` environment variable (set by `csm-orc gui --max-runs`).
+    """
+
+    def __init__(
+        self,
+        max_parallel_runs: Optional[int] = None,
+        history_size: int = 50,
+        cancel_grace_period: float = 10.0,
+    ):
+        if max_parallel_runs is None:
+            max_parallel_runs = int(os.environ.get("CSM_ORC_GUI_MAX_RUNS", 2))
+        self.max_parallel_runs = max_parallel_runs
+        self.history_size = history_size
+        self.cancel_grace_period = cancel_grace_period
+        self.runs: dict[str, ProjectRun] = dict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def get(self, run_id: str) -> Optional[ProjectRun]:
+        return self.runs.get(run_id)
+
+    def list_runs(self) -> list[ProjectRun]:
+        return list(self.runs.values())
+
+    def start(
+        self, project_path: pathlib.Path, environment: dict[str, str], skipped_steps: list[str] = ()
+    ) -> ProjectRun:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_parallel_runs)
+        run = ProjectRun(project_path, environment, list(skipped_steps))
+        self.runs[run.id] = run
+        self._forget_old_runs()
+        run.task = asyncio.create_task(self._execute(run))
+        return run
+
+    def _forget_old_runs(self):
+        finished = [run_id for run_id, run in self.runs.items() if run.finished]
+        for run_id in finished[: max(0, len(finished) - self.history_size)]:
+            del self.runs[run_id]
+
+    @staticmethod
+    def _parse_event(line: str) -> dict:
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            return {"type": "log", "text": line}
+
+    @staticmethod
+    async def _relay_lines(run: ProjectRun, stream: asyncio.StreamReader, to_event):
+        async for line in stream:
+            await run.append(to_event(line.decode("utf-8", errors="replace").rstrip("\n")))
+
+    async def _execute(self, run: ProjectRun):
+        skip_args = list()
+        for step_id in run.skipped_steps:
+            skip_args.extend(["--skip-step", step_id])
+        try:
+            await run.append({"type": "status", "status": run.status.value})
+            async with self._slots:
+                # The step events of the run are written as JSON lines to a pipe inherited by the process
+                event_read, event_write = os.pipe()
+                try:
+                    run.process = await asyncio.create_subprocess_exec(
+                        "csm-orc",
+                        "run",
+                        *skip_args,
+                        # Cancelling stops the steps and runs the exit handlers before the SIGKILL of cancel()
+                        "--drain-timeout",
+                        str(self.cancel_grace_period / 2),
+                        "--grace-period",
+                        str(self.cancel_grace_period * 0.9),
+                        "--event-file",
+                        f"/dev/fd/{event_write}",
+                        str(run.project_path),
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.STDOUT,
+                        env=run.environment,
+                        start_new_session=True,
+                        pass_fds=(event_write,),
+                    )
+                except BaseException:
+                    os.close(event_read)
+                    raise
+                finally:
+                    os.close(event_write)
+                events = asyncio.StreamReader()
+                await asyncio.get_running_loop().connect_read_pipe(
+                    lambda: asyncio.StreamReaderProtocol(events), os.fdopen(event_read, "rb")
+                )
+                run.started_at = time.time()
+                run.status = RunStatus.RUNNING
+                await run.append({"type": "status", "status": run.status.value})
+                await asyncio.gather(
+                    self._relay_lines(run, run.process.stdout, lambda text: {"type": "log", "text": text}),
+                    self._relay_lines(run, events, self._parse_event),
+                )
+                run.return_code = await run.process.wait()
+                await run.append({"type": "exit", "code": run.return_code})
+                if run.cancel_requested:
+                    run.status = RunStatus.CANCELLED
+                else:
+                    run.status = RunStatus.SUCCESS if run.return_code == 0 else RunStatus.ERROR
+        except asyncio.CancelledError:
+            # Cancelled while waiting in the queue
+            run.status = RunStatus.CANCELLED
+        except Exception as e:
+            LOGGER.error(f"Run {run.id} of {run.project_path} failed: {e}")
+            await run.append({"type": "error", "text": str(e)})
+            run.status = RunStatus.ERROR
+        finally:
+            run.finished_at = time.time()
+            await run.append({"type": "status", "status": run.status.value})
+            await run.close()
+
+    async def cancel(self, run: ProjectRun):
+        """Cancel a queued run, or stop a running one (SIGTERM to its process group, SIGKILL after a grace period).
+
+        A running run keeps its slot and its RUNNING status until its process has exited.
+        """
+        if run.finished:
+            return
+        process = run.process
+        if process is None:
+            run.task.cancel()
+            return
+        run.cancel_requested = True
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=self.cancel_grace_period)
+            except asyncio.TimeoutError:
+                os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    async def shutdown(self):
+        for run in self.list_runs():
+            await self.cancel(run)
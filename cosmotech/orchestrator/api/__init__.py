@@ -14,6 +14,9 @@ csm-orc CLI commands, allowing them to be used directly without the CLI context.
 
 from cosmotech.orchestrator.api.run import run_template, validate_template, generate_env_file, display_environment
 from cosmotech.orchestrator.api.templates import list_templates, get_template_details, load_template_from_file
+from cosmotech.orchestrator.api.stats import get_step_stats
+from cosmotech.orchestrator.api.analyze import analyze_template, predict_template
+from cosmotech.orchestrator.api.artifacts import collect_artifacts
 from cosmotech.orchestrator.api.entrypoint import run_entrypoint, get_entrypoint_env, run_direct_simulator
 
 __all__ = [
@@ -24,6 +27,10 @@ __all__ = [
     "list_templates",
     "get_template_details",
     "load_template_from_file",
+    "get_step_stats",
+    "analyze_template",
+    "predict_template",
+    "collect_artifacts",
     "run_entrypoint",
     "get_entrypoint_env",
     "run_direct_simulator",
@@ -0,0 +1,292 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+API functions for the static analysis of orchestration files and the prediction of their runs.
+
+This module provides functions that implement the core functionality of the
+csm-orc analyze and csm-orc run --predict commands, allowing them to be used directly without the CLI context.
+"""
+
+import logging
+import pathlib
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from cosmotech.orchestrator.core.analysis import analyze
+from cosmotech.orchestrator.core.analysis import step_data_predecessors
+from cosmotech.orchestrator.core.analysis import step_predecessors
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.executors import SimulatedExecutor
+from cosmotech.orchestrator.core.executors import default_max_workers
+from cosmotech.orchestrator.core.history import GROUP_BY_TEMPLATE
+from cosmotech.orchestrator.core.history import StepHistory
+from cosmotech.orchestrator.core.history import percentile
+from cosmotech.orchestrator.core.orchestrator import Orchestrator
+from cosmotech.orchestrator.core.selection import StepSelection
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+DEFAULT_STEP_DURATION = 1.0
+
+
+def historical_durations(
+    template_path: str, steps: Dict[str, Step], stats_db: Optional[str] = None
+) -> Dict[str, Optional[float]]:
+    """
+    Get the median duration of each step from the runs recorded with `csm-orc run --stats-db`.
+
+    Args:
+        template_path: Path to the template file the steps were loaded from
+        steps: Steps of the template
+        stats_db: Path to the SQLite statistics database
+
+    Returns:
+        Median duration of each step, from its own history or else from the history of its command template,
+        None for steps without any history
+    """
+    result = {step_id: None for step_id in steps}
+    if stats_db is None or not pathlib.Path(stats_db).is_file():
+        return result
+    history = StepHistory(stats_db)
+    try:
+        by_step = history.durations()
+        by_template = history.durations(GROUP_BY_TEMPLATE)
+    finally:
+        history.close()
+    project = str(pathlib.Path(template_path).resolve())
+    for step_id, step in steps.items():
+        # commandId is cleared once the template is loaded in the step, the template id is kept for display
+        durations = by_step.get((project, step_id)) or by_template.get((step.display_command_id,))
+        if durations:
+            result[step_id] = percentile(sorted(durations), 50)
+    return result
+
+
+def analyze_template(
+    template_path: str, max_parallel: Optional[int] = None, stats_db: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Statically analyze the step DAG of a template file without running it.
+
+    Args:
+        template_path: Path to the template file
+        max_parallel: Number of steps able to run at the same time for the makespan estimation (None for unlimited)
+        stats_db: Path to a SQLite database filled by `csm-orc run --stats-db`, providing the step durations
+
+    Returns:
+        Dictionary with the level widths, the critical path, the makespan, the links serializing the DAG
+        and the duration used for each step
+    """
+    steps, _ = Orchestrator().load_json_file(template_path, dry=True, ignore_error=True)
+    steps = {step_id: step for step_id, (step, _) in steps.items()}
+    known = historical_durations(template_path, steps, stats_db)
+    durations = {step_id: DEFAULT_STEP_DURATION if d is None else d for step_id, d in known.items()}
+    result = analyze(step_predecessors(steps), durations, step_data_predecessors(steps), max_parallel)
+    result["durations"] = {
+        step_id: {"duration": durations[step_id], "source": "default" if d is None else "history"}
+        for step_id, d in known.items()
+    }
+    return result
+
+
+def display_analysis(analysis: Dict[str, Any], stats_db: Optional[str] = None) -> None:
+    """
+    Display the result of analyze_template.
+
+    Args:
+        analysis: The analysis to display
+        stats_db: Path of the statistics database the durations were read from
+    """
+    known = sum(1 for d in analysis["durations"].values() if d["source"] == "history")
+    if known:
+        LOGGER.info(
+            T("csm-orc.cli.analyze.durations.history").format(
+                known=known, total=analysis["steps"], stats_db=stats_db, default=DEFAULT_STEP_DURATION
+            )
+        )
+    else:
+        LOGGER.info(T("csm-orc.cli.analyze.durations.default").format(default=DEFAULT_STEP_DURATION))
+    LOGGER.info(
+        T("csm-orc.cli.analyze.summary").format(
+            steps=analysis["steps"], levels=len(analysis["levels"]), width=analysis["maxWidth"]
+        )
+    )
+    for level in analysis["levels"]:
+        LOGGER.info(T("csm-orc.cli.analyze.level").format(level=level["level"], width=level["width"]))
+    LOGGER.info(
+        T("csm-orc.cli.analyze.critical_path").format(
+            duration=analysis["criticalPath"]["duration"], steps=" -> ".join(analysis["criticalPath"]["steps"])
+        )
+    )
+    LOGGER.info(T("csm-orc.cli.analyze.total_duration").format(duration=analysis["totalDuration"]))
+    if analysis["maxParallel"]:
+        LOGGER.info(
+            T("csm-orc.cli.analyze.makespan.limited").format(
+                max_parallel=analysis["maxParallel"], makespan=analysis["makespan"]
+            )
+        )
+    else:
+        LOGGER.info(T("csm-orc.cli.analyze.makespan.unlimited").format(makespan=analysis["makespan"]))
+    if not analysis["serialization"]:
+        LOGGER.info(T("csm-orc.cli.analyze.serialization.none"))
+        return
+    LOGGER.info(T("csm-orc.cli.analyze.serialization.header"))
+    for link in analysis["serialization"]:
+        key = "redundant" if link["kind"] == "redundant" else "order_only"
+        LOGGER.info(
+            T(f"csm-orc.cli.analyze.serialization.{key}").format(
+                step_id=link["stepId"], precedent=link["precedent"], saving=link["saving"]
+            )
+        )
+
+
+def simulate_schedule(graph: StepGraph, durations: Dict[str, float], max_parallel: int) -> Dict[str, tuple]:
+    """
+    Start and finish time of each step of a graph if it lasted its given duration, without running anything.
+
+    A copy of the graph, made of steps without command nor environment, is evaluated on the simulated backend,
+    so the steps are scheduled by the scheduler of the real runs.
+
+    Args:
+        graph: Graph of the steps, as loaded for a run
+        durations: Duration of each step
+        max_parallel: Maximum number of steps running at once
+
+    Returns:
+        (start, finish) of each step on simulated time, None for the steps that never started
+    """
+    executor = SimulatedExecutor({"steps": {step_id: {"duration": d} for step_id, d in durations.items()}})
+    simulated = StepGraph(name=graph.name, executor=executor)
+    for step in graph.steps:
+        _step = Step(id=step.id, command="true")
+        _step.skipped = step.skipped
+        simulated.add_step(_step)
+    for index, precedents in enumerate(graph.predecessors):
+        for precedent in precedents:
+            simulated.add_edge(precedent, index)
+    times = dict()
+
+    def _on_event(event):
+        # Skipped steps are never started, every step is finished with the duration it took
+        if event["type"] == STEP_FINISHED and event["stepId"] in simulated.nodes:
+            times[event["stepId"]] = (executor.clock() - event["duration"], executor.clock())
+
+    # The simulated steps log like real ones, only warnings and errors are relevant to a prediction
+    level = LOGGER.level
+    LOGGER.setLevel(max(LOGGER.getEffectiveLevel(), logging.WARNING))
+    EVENT_BUS.subscribe(_on_event)
+    try:
+        simulated.evaluate(max_workers=max_parallel)
+    finally:
+        EVENT_BUS.unsubscribe(_on_event)
+        LOGGER.setLevel(level)
+    for step in simulated.steps:
+        if step.id not in times and not step.skipped:
+            LOGGER.error(T("csm-orc.cli.run.prediction.never_started").format(step_id=step.id))
+    return {step.id: times.get(step.id) for step in simulated.steps}
+
+
+def predict_template(
+    template_path: str,
+    max_parallel: Optional[int] = None,
+    stats_db: Optional[str] = None,
+    skipped_steps: List[str] = (),
+    only_steps: List[str] = (),
+    from_steps: List[str] = (),
+    until_steps: List[str] = (),
+) -> Dict[str, Any]:
+    """
+    Predict a run of a template file by scheduling its steps on simulated time, without running them.
+
+    Steps are scheduled like a real run does, with their `expectedDuration`, or else their median duration recorded
+    with `csm-orc run --stats-db`, or else a default duration. Skipped steps take no time.
+
+    Args:
+        template_path: Path to the template file
+        max_parallel: Maximum number of steps running at once, as `csm-orc run --max-parallel` (None for the default)
+        stats_db: Path to a SQLite database filled by `csm-orc run --stats-db`, providing the step durations
+        skipped_steps: List of steps to skip
+        only_steps: Run only these steps, the others are skipped
+        from_steps: Run only these steps and the steps depending on them
+        until_steps: Run only these steps and the steps they depend on
+
+    Returns:
+        Dictionary with the predicted start, finish and duration source of each step, the steps that would never
+        start, the makespan and the utilization of the slots available to the steps
+    """
+    selection = StepSelection(list(only_steps), list(from_steps), list(until_steps))
+    steps, graph = Orchestrator().load_json_file(
+        template_path, dry=True, skipped_steps=skipped_steps, ignore_error=True, selection=selection
+    )
+    steps = {step_id: step for step_id, (step, _) in steps.items()}
+    known = historical_durations(template_path, steps, stats_db)
+    durations, sources = dict(), dict()
+    for step_id, step in steps.items():
+        if step.skipped:
+            durations[step_id], sources[step_id] = 0.0, "skipped"
+        elif step.expectedDuration is not None:
+            durations[step_id], sources[step_id] = float(step.expectedDuration), "expected"
+        elif known[step_id] is not None:
+            durations[step_id], sources[step_id] = known[step_id], "history"
+        else:
+            durations[step_id], sources[step_id] = DEFAULT_STEP_DURATION, "default"
+    slots = max_parallel or default_max_workers()
+    schedule = simulate_schedule(graph, durations, slots)
+    never_started = sorted(step_id for step_id, times in schedule.items() if times is None)
+    schedule = {step_id: times for step_id, times in schedule.items() if times is not None}
+    makespan = max((finish for _, finish in schedule.values()), default=0.0)
+    busy = sum(durations.values())
+    return {
+        "steps": [
+            {
+                "stepId": step_id,
+                "start": schedule[step_id][0],
+                "finish": schedule[step_id][1],
+                "duration": durations[step_id],
+                "source": sources[step_id],
+            }
+            for step_id in sorted(schedule, key=lambda s: (schedule[s], s))
+        ],
+        "neverStarted": never_started,
+        "maxParallel": slots,
+        "makespan": makespan,
+        "busyTime": busy,
+        "utilization": busy / (makespan * slots) if makespan else 0.0,
+    }
+
+
+def display_prediction(prediction: Dict[str, Any]) -> None:
+    """
+    Display the result of predict_template.
+
+    Args:
+        prediction: The prediction to display
+    """
+    rows = [
+        (s["stepId"], f"{s['start']:.3f}s", f"{s['finish']:.3f}s", f"{s['duration']:.3f}s", s["source"])
+        for s in prediction["steps"]
+    ]
+    headers = ("id", "start", "finish", "duration", "source")
+    widths = [max(len(r[i]) for r in rows + [headers]) for i in range(len(headers))]
+    for row in [headers] + rows:
+        LOGGER.info("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    LOGGER.info(
+        T("csm-orc.cli.run.prediction.makespan").format(
+            makespan=prediction["makespan"], max_parallel=prediction["maxParallel"]
+        )
+    )
+    LOGGER.info(
+        T("csm-orc.cli.run.prediction.utilization").format(
+            utilization=prediction["utilization"] * 100, busy=prediction["busyTime"]
+        )
+    )
@@ -0,0 +1,51 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+API functions for the artifact store.
+
+This module provides functions that implement the core functionality of the
+csm-orc artifacts command, allowing them to be used directly without the CLI context.
+"""
+
+import pathlib
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from cosmotech.orchestrator.core.artifacts import ArtifactStore
+from cosmotech.orchestrator.utils.translate import T
+
+
+def collect_artifacts(
+    store_path: str, max_age: Optional[float] = None, max_size: Optional[int] = None, dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Evict objects from an artifact store filled by `csm-orc run --artifact-store`.
+
+    Objects unused for more than `max_age` seconds are evicted first, then the least recently used ones
+    until the store holds at most `max_size` bytes. Files linked to an evicted object keep their content.
+
+    Args:
+        store_path: Directory of the artifact store
+        max_age: Maximum number of seconds since an object was last stored or restored
+        max_size: Maximum total size of the stored objects in bytes
+        dry_run: Only report what would be evicted
+
+    Returns:
+        Dictionary with the number and size (bytes) of the evicted and remaining objects
+    """
+    if max_age is None and max_size is None:
+        raise ValueError(T("csm-orc.cli.artifacts.no_limit"))
+    if not (pathlib.Path(store_path) / "index.sqlite").is_file():
+        raise ValueError(T("csm-orc.cli.artifacts.missing_store").format(store_path=store_path))
+    store = ArtifactStore()
+    store.open(store_path)
+    try:
+        return store.gc(max_age, max_size, dry_run)
+    finally:
+        store.close()
@@ -13,6 +13,7 @@ csm-orc run command, allowing them to be used directly without the CLI context.
 """
 
 import pathlib
+import signal
 from typing import Any
 from typing import Dict
 from typing import List
@@ -20,11 +21,27 @@ from typing import Optional
 from typing import Tuple
 
 from cosmotech.orchestrator import VERSION
+from cosmotech.orchestrator.core.artifacts import ARTIFACT_STORE
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import EventFileWriter
+from cosmotech.orchestrator.core.events import STEP_QUEUED
+from cosmotech.orchestrator.core.executors import SimulatedExecutor
+from cosmotech.orchestrator.core.executors import StepExecutor
+from cosmotech.orchestrator.core.history import StepHistory
 from cosmotech.orchestrator.core.orchestrator import Orchestrator
+from cosmotech.orchestrator.core.run_control import DEFAULT_DRAIN_TIMEOUT
+from cosmotech.orchestrator.core.run_control import DEFAULT_GRACE_PERIOD
+from cosmotech.orchestrator.core.run_control import RUN_CONTROL
+from cosmotech.orchestrator.core.selection import StepSelection
+from cosmotech.orchestrator.core.selection import read_step_outputs
 from cosmotech.orchestrator.core.step import Step, StepStatus
+from cosmotech.orchestrator.core.up_to_date import UP_TO_DATE_STATE
 from cosmotech.orchestrator.utils.logger import LOGGER
 from cosmotech.orchestrator.utils.translate import T
 
+DEFAULT_EXIT_HANDLERS_PARALLEL = 4
+
 
 def validate_template(template_path: str) -> bool:
     """
@@ -85,13 +102,14 @@ def generate_env_file(template_path: str, target_path: str) -> bool:
 
         with _fp.open("w") as _f:
             _env: Dict[str, str] = dict()
-            _env.update(
-                {
-                    k: v.description if v.effective_value() is None else v.effective_value()
-                    for _s, _ in s.values()
-                    for k, v in _s.environment.items()
-                }
-            )
+            for _s, _ in s.values():
+                _snapshot = _s.snapshot_env()
+                _env.update(
+                    {
+                        k: v.description if k in _snapshot.unset else _snapshot.values[k]
+                        for k, v in _s.environment.items()
+                    }
+                )
             _f.writelines(f"{k}={v}\n" for k, v in sorted(_env.items(), key=lambda e: e[0]))
         return True
     except ValueError as e:
@@ -105,6 +123,22 @@ def run_template(
     display_env: bool = False,
     skipped_steps: List[str] = None,
     exit_handlers: bool = True,
+    event_file: Optional[str] = None,
+    stats_db: Optional[str] = None,
+    only_steps: List[str] = (),
+    from_steps: List[str] = (),
+    until_steps: List[str] = (),
+    outputs_from: Optional[str] = None,
+    fail_fast: bool = False,
+    max_parallel: Optional[int] = None,
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    grace_period: float = DEFAULT_GRACE_PERIOD,
+    up_to_date_state: Optional[str] = None,
+    artifact_store: Optional[str] = None,
+    exit_handlers_parallel: int = DEFAULT_EXIT_HANDLERS_PARALLEL,
+    exit_handler_timeout: Optional[float] = None,
+    exit_handlers_timeout: Optional[float] = None,
+    simulation: Optional[str] = None,
 ) -> Tuple[bool, Optional[Dict[str, Any]]]:
     """
     Run a template file.
@@ -115,57 +149,202 @@ def run_template(
         display_env: Whether to display environment variables
         skipped_steps: List of steps to skip
         exit_handlers: Whether to run exit handlers
+        event_file: Path of a file (or pipe) receiving the run events as JSON lines
+        stats_db: Path of a SQLite database recording the duration, status and resource usage of each step
+        only_steps: Steps to run, all others are skipped
+        from_steps: Run only these steps and their descendants
+        until_steps: Run only these steps and their ancestors
+        outputs_from: Path of the event file of a previous run, giving the outputs of the steps not selected
+        fail_fast: Whether to cancel the running steps and start no other step once a step fails
+        max_parallel: Maximum number of steps running at once, instances of expanded steps included
+        drain_timeout: Seconds given to the running steps to stop after a SIGTERM (or SIGINT) before killing them
+        grace_period: Seconds given to the whole run, exit handlers included, after a SIGTERM (or SIGINT)
+        up_to_date_state: Path of a JSON file recording the steps with file outputs, to skip them while up to date
+        artifact_store: Directory of a content-addressed store keeping a single copy of each step file output
+        exit_handlers_parallel: Maximum number of exit handlers running at once
+        exit_handler_timeout: Seconds after which a running exit handler is killed
+        exit_handlers_timeout: Seconds given to all exit handlers, the ones not started by then do not run
+        simulation: Path of a JSON simulation spec, the commands are then simulated on a virtual clock
+            (see `cosmotech.orchestrator.core.executors`) and no statistics, state or artifact is recorded
 
     Returns:
         Tuple of (success, results)
     """
+    selection = StepSelection(list(only_steps), list(from_steps), list(until_steps))
+    if outputs_from is not None:
+        # Read before the event file of this run is opened, it may be the same file
+        selection.previous_outputs = read_step_outputs(outputs_from)
+    try:
+        executor = None if simulation is None else SimulatedExecutor.from_file(simulation)
+    except ValueError as e:
+        LOGGER.error(e)
+        return False, None
+    # Neither dry nor simulated runs produce anything worth recording
+    record = not dry_run and executor is None
+    handlers = list()
+    history = None
+    if event_file is not None:
+        handlers.append(EventFileWriter(event_file))
+    if stats_db is not None and record:
+        history = StepHistory(stats_db)
+        handlers.append(history.recorder(str(pathlib.Path(template_path).resolve())))
+    if fail_fast:
+        handlers.append(RUN_CONTROL.fail_fast_handler())
+    if up_to_date_state is not None and record:
+        UP_TO_DATE_STATE.open(up_to_date_state)
+    if artifact_store is not None and record:
+        ARTIFACT_STORE.open(artifact_store)
+    for handler in handlers:
+        EVENT_BUS.subscribe(handler)
+    try:
+        return _run_template(
+            template_path,
+            dry_run,
+            display_env,
+            skipped_steps,
+            exit_handlers,
+            selection,
+            drain_timeout,
+            grace_period,
+            max_parallel,
+            exit_handlers_parallel,
+            exit_handler_timeout,
+            exit_handlers_timeout,
+            executor,
+        )
+    finally:
+        for handler in handlers:
+            EVENT_BUS.unsubscribe(handler)
+            if isinstance(handler, EventFileWriter):
+                handler.close()
+        if history is not None:
+            history.close()
+        UP_TO_DATE_STATE.close()
+        ARTIFACT_STORE.close()
+
+
+def _run_template(
+    template_path: str,
+    dry_run: bool,
+    display_env: bool,
+    skipped_steps: Optional[List[str]],
+    exit_handlers: bool,
+    selection: Optional[StepSelection] = None,
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    grace_period: float = DEFAULT_GRACE_PERIOD,
+    max_parallel: Optional[int] = None,
+    exit_handlers_parallel: int = DEFAULT_EXIT_HANDLERS_PARALLEL,
+    exit_handler_timeout: Optional[float] = None,
+    exit_handlers_timeout: Optional[float] = None,
+    executor: Optional[StepExecutor] = None,
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
     if skipped_steps is None:
         skipped_steps = []
 
     LOGGER.info(T("csm-orc.cli.run.starting").format(version=VERSION))
     f = Orchestrator()
     try:
-        s, g = f.load_json_file(template_path, dry_run, display_env, skipped_steps)
+        s, g = f.load_json_file(template_path, dry_run, display_env, skipped_steps, selection=selection)
     except ValueError as e:
         LOGGER.error(e)
         return False, None
     else:
         if g is None:
             return True, None
+        if executor is not None:
+            g.executor = executor
 
         success = True
         results = {}
 
+        for k in s:
+            EVENT_BUS.emit(STEP_QUEUED, stepId=k, exitHandler=False)
+
         LOGGER.info(T("csm-orc.cli.run.sections.run"))
-        g.evaluate(mode="threading")
-        LOGGER.info(T("csm-orc.cli.run.sections.results"))
-
-        for k, v in s.items():
-            LOGGER.info(v[0].simple_repr())
-            LOGGER.debug(str(v[0]))
-            results[k] = v[0]
-            if v[0].status == StepStatus.ERROR:
-                success = False
+        RUN_CONTROL.reset()
+        with RUN_CONTROL.terminate_on_signals(
+            signal.SIGINT, signal.SIGTERM, drain_timeout=drain_timeout, grace_period=grace_period
+        ):
+            g.evaluate(max_workers=max_parallel)
+            LOGGER.info(T("csm-orc.cli.run.sections.results"))
 
-        if exit_handlers:
-            from cosmotech.orchestrator.templates.library import Library
+            for k, v in s.items():
+                if v[0].status == StepStatus.INITIALIZED:
+                    # Never ready: the graph is checked for cycles when loaded, this should not happen
+                    LOGGER.error(T("csm-orc.cli.run.never_ready_step").format(step_id=k))
+                    v[0].status = StepStatus.ERROR
+                LOGGER.info(v[0].simple_repr())
+                LOGGER.debug(str(v[0]))
+                results[k] = v[0]
+                if v[0].status in (StepStatus.ERROR, StepStatus.CANCELLED):
+                    success = False
+            if RUN_CONTROL.cancelled:
+                success = False
 
-            library = Library()
-            exit_steps = []
-            for command_template in library.list_exit_commands():
-                _s = Step(
-                    id=command_template,
-                    commandId=command_template,
-                    environment={"CSM_ORC_IS_SUCCESS": {"value": str(success)}},
+            if exit_handlers:
+                _run_exit_handlers(
+                    success, results, exit_handlers_parallel, exit_handler_timeout, exit_handlers_timeout, executor
                 )
-                _s.run(as_exit=True)
-                exit_steps.append(_s)
-
-            if exit_steps:
-                LOGGER.info(T("csm-orc.cli.run.sections.exit_handlers"))
+            if isinstance(executor, SimulatedExecutor):
+                LOGGER.info(T("csm-orc.cli.run.simulated_time").format(time=executor.clock()))
 
-            for _s in exit_steps:
-                LOGGER.info(_s.simple_repr())
-                results[_s.id] = _s
+        if RUN_CONTROL.deadline is not None:
+            # Terminated: the container may be killed right after this process ends
+            for handler in LOGGER.handlers:
+                handler.flush()
 
         return success, results
+
+
+def _run_exit_handlers(
+    success: bool,
+    results: Dict[str, Any],
+    max_parallel: int = DEFAULT_EXIT_HANDLERS_PARALLEL,
+    handler_timeout: Optional[float] = None,
+    timeout: Optional[float] = None,
+    executor: Optional[StepExecutor] = None,
+):
+    """Run the exit handlers concurrently, each one after the exit handlers listed in the `runAfter` of its template"""
+    from cosmotech.orchestrator.templates.library import Library
+
+    library = Library()
+    graph = StepGraph(name="exit handlers", as_exit=True, executor=executor)
+    for command_template in library.list_exit_commands():
+        graph.add_step(
+            Step(
+                id=command_template,
+                commandId=command_template,
+                environment={"CSM_ORC_IS_SUCCESS": {"value": str(success)}},
+            )
+        )
+
+    remaining = RUN_CONTROL.remaining()
+    if len(graph) and remaining == 0:
+        LOGGER.warning(T("csm-orc.cli.run.no_time_for_exit_handlers"))
+        return
+
+    for _s, index in list(graph.nodes.values()):
+        for precedent in library.find_template_by_name(_s.id).runAfter:
+            if precedent in graph.nodes:
+                graph.add_edge(graph.nodes[precedent][1], index)
+            else:
+                LOGGER.warning(T("csm-orc.cli.run.unknown_exit_precedent").format(step_id=_s.id, precedent=precedent))
+
+    for _s in graph.steps:
+        EVENT_BUS.emit(STEP_QUEUED, stepId=_s.id, exitHandler=True)
+    # Once terminating, exit handlers only get what remains of the grace period
+    if remaining is not None:
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    graph.evaluate(max_workers=max_parallel, step_timeout=handler_timeout, timeout=timeout)
+
+    if len(graph):
+        LOGGER.info(T("csm-orc.cli.run.sections.exit_handlers"))
+
+    for _s in graph.steps:
+        if _s.status == StepStatus.INITIALIZED:
+            # Never ready: waiting for one another through `runAfter`
+            LOGGER.error(T("csm-orc.cli.run.circular_exit_handler").format(step_id=_s.id))
+            _s.status = StepStatus.ERROR
+        duration = "-" if _s.duration is None else f"{_s.duration:.3f}s"
+        LOGGER.info(T("csm-orc.cli.run.exit_handler_result").format(result=_s.simple_repr(), duration=duration))
+        results[_s.id] = _s
@@ -0,0 +1,86 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+API functions for the step duration history.
+
+This module provides functions that implement the core functionality of the
+csm-orc stats command, allowing them to be used directly without the CLI context.
+"""
+
+import pathlib
+from typing import Any
+from typing import Dict
+from typing import List
+
+from cosmotech.orchestrator.core.history import GROUP_BY_STEP
+from cosmotech.orchestrator.core.history import GROUP_BY_TEMPLATE
+from cosmotech.orchestrator.core.history import StepHistory
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+
+def get_step_stats(
+    stats_db: str, group_by: str = GROUP_BY_STEP, recent: int = 5, threshold: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Get duration percentiles of the steps recorded by previous runs.
+
+    Args:
+        stats_db: Path to the SQLite database filled by `csm-orc run --stats-db`
+        group_by: Either "step" (per project and step id) or "template" (per command template id)
+        recent: Number of latest executions compared to the older ones to detect regressions
+        threshold: Ratio above the baseline median duration flagging a regression
+
+    Returns:
+        List of statistics dictionaries (count, p50, p95, p99, baselineP50, recentP50, regression)
+    """
+    if group_by not in (GROUP_BY_STEP, GROUP_BY_TEMPLATE):
+        raise ValueError(T("csm-orc.cli.stats.invalid_group").format(group_by=group_by))
+    if not pathlib.Path(stats_db).is_file():
+        raise ValueError(T("csm-orc.cli.stats.missing_db").format(stats_db=stats_db))
+    history = StepHistory(stats_db)
+    try:
+        return history.statistics(group_by, recent, threshold)
+    finally:
+        history.close()
+
+
+def _format_duration(value) -> str:
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def display_step_stats(stats: List[Dict[str, Any]]) -> None:
+    """
+    Display step statistics as a table.
+
+    Args:
+        stats: Statistics as returned by get_step_stats
+    """
+    if not stats:
+        LOGGER.warning(T("csm-orc.cli.stats.no_stats"))
+        return
+    rows = [
+        (
+            s["commandId"] if "commandId" in s else f"{s['project']}:{s['stepId']}",
+            str(s["count"]),
+            _format_duration(s["p50"]),
+            _format_duration(s["p95"]),
+            _format_duration(s["p99"]),
+            _format_duration(s["baselineP50"]),
+            _format_duration(s["recentP50"]),
+            T("csm-orc.cli.stats.regression") if s["regression"] else "",
+        )
+        for s in stats
+    ]
+    headers = ("id", "count", "p50", "p95", "p99", "baseline p50", "recent p50", "")
+    widths = [max(len(r[i]) for r in rows + [headers]) for i in range(len(headers))]
+    for row in [headers] + rows:
+        LOGGER.info("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    regressions = sum(1 for s in stats if s["regression"])
+    if regressions:
+        LOGGER.warning(T("csm-orc.cli.stats.regressions_found").format(count=regressions))
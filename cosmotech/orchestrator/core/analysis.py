@@ -0,0 +1,183 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Static analysis of the step DAG of an orchestration file.
+
+The DAG is given as the precedents of each step (in file order) and the duration expected for each step,
+every function here works on that structure only and never runs anything.
+"""
+
+import heapq
+from typing import Optional
+
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.utils.translate import T
+
+Predecessors = dict[str, list[str]]
+
+
+def step_predecessors(steps: dict[str, Step]) -> Predecessors:
+    """Precedents of each step, as step ids"""
+    return {step_id: [p if isinstance(p, str) else p.id for p in step.precedents] for step_id, step in steps.items()}
+
+
+def step_data_predecessors(steps: dict[str, Step]) -> dict[str, set[str]]:
+    """Precedents each step reads outputs from"""
+    return {step_id: {i["stepId"] for i in step.inputs.values()} for step_id, step in steps.items()}
+
+
+def successors_of(predecessors: Predecessors) -> Predecessors:
+    successors = {step_id: list() for step_id in predecessors}
+    for step_id, precedents in predecessors.items():
+        for precedent in precedents:
+            successors[precedent].append(step_id)
+    return successors
+
+
+def topological_order(predecessors: Predecessors) -> list[str]:
+    """Steps ordered so that each one comes after its precedents, file order is kept between independent steps"""
+    successors = successors_of(predecessors)
+    in_degree = {step_id: len(precedents) for step_id, precedents in predecessors.items()}
+    position = {step_id: index for index, step_id in enumerate(predecessors)}
+    ready = [position[step_id] for step_id, degree in in_degree.items() if not degree]
+    heapq.heapify(ready)
+    steps = list(predecessors)
+    order = list()
+    while ready:
+        step_id = steps[heapq.heappop(ready)]
+        order.append(step_id)
+        for successor in successors[step_id]:
+            in_degree[successor] -= 1
+            if not in_degree[successor]:
+                heapq.heappush(ready, position[successor])
+    if len(order) != len(steps):
+        cycle = sorted(step_id for step_id, degree in in_degree.items() if degree)
+        raise ValueError(T("csm-orc.orchestrator.core.analysis.cycle").format(steps=", ".join(cycle)))
+    return order
+
+
+def levels(predecessors: Predecessors, order: list[str]) -> dict[str, int]:
+    """Level of each step: steps without precedents are on level 0, others one level below their lowest precedent"""
+    result = dict()
+    for step_id in order:
+        result[step_id] = 1 + max((result[p] for p in predecessors[step_id]), default=-1)
+    return result
+
+
+def critical_path(predecessors: Predecessors, order: list[str], durations: dict[str, float]) -> tuple[float, list[str]]:
+    """Longest path of the DAG weighted by the step durations: the makespan with unlimited parallelism"""
+    finish = dict()
+    previous: dict[str, Optional[str]] = dict()
+    for step_id in order:
+        start, previous[step_id] = 0.0, None
+        for precedent in predecessors[step_id]:
+            if finish[precedent] > start:
+                start, previous[step_id] = finish[precedent], precedent
+        finish[step_id] = start + durations[step_id]
+    if not finish:
+        return 0.0, []
+    step_id = max(order, key=lambda s: finish[s])
+    length = finish[step_id]
+    path = list()
+    while step_id is not None:
+        path.append(step_id)
+        step_id = previous[step_id]
+    return length, path[::-1]
+
+
+def simulate_makespan(
+    predecessors: Predecessors, order: list[str], durations: dict[str, float], max_parallel: Optional[int] = None
+) -> float:
+    """Makespan of a list schedule running at most `max_parallel` steps at once (unlimited if None).
+
+    Ready steps are started by decreasing remaining critical path (time from their start to the end of the DAG),
+    the usual heuristic to keep the longest chains busy first.
+    """
+    if not max_parallel:
+        return critical_path(predecessors, order, durations)[0]
+    successors = successors_of(predecessors)
+    remaining = dict()
+    for step_id in reversed(order):
+        remaining[step_id] = durations[step_id] + max((remaining[s] for s in successors[step_id]), default=0.0)
+    position = {step_id: index for index, step_id in enumerate(order)}
+    waiting = {step_id: len(precedents) for step_id, precedents in predecessors.items()}
+    ready = [(-remaining[s], position[s], s) for s, count in waiting.items() if not count]
+    heapq.heapify(ready)
+    running: list[tuple[float, int, str]] = list()
+    now = 0.0
+    while ready or running:
+        while ready and len(running) < max_parallel:
+            _, index, step_id = heapq.heappop(ready)
+            heapq.heappush(running, (now + durations[step_id], index, step_id))
+        now, _, step_id = heapq.heappop(running)
+        for successor in successors[step_id]:
+            waiting[successor] -= 1
+            if not waiting[successor]:
+                heapq.heappush(ready, (-remaining[successor], position[successor], successor))
+    return now
+
+
+def unnecessary_serialization(
+    predecessors: Predecessors, data_predecessors: dict[str, set[str]], order: list[str], durations: dict[str, float]
+) -> list[dict]:
+    """Precedence links that serialize the DAG without a reason visible in the orchestration file.
+
+    - `redundant` links are implied by another path between the same steps, removing them changes nothing
+    - `orderOnly` links sit on the critical path without passing any output, `saving` is the makespan reduction
+      obtained by removing just that link (if the order is not required by a side effect such as a shared file)
+    """
+    ancestors: dict[str, set[str]] = dict()
+    for step_id in order:
+        ancestors[step_id] = set()
+        for precedent in predecessors[step_id]:
+            ancestors[step_id] |= ancestors[precedent] | {precedent}
+    result = list()
+    for step_id in order:
+        for precedent in predecessors[step_id]:
+            if any(precedent in ancestors[other] for other in predecessors[step_id] if other != precedent):
+                result.append({"kind": "redundant", "stepId": step_id, "precedent": precedent, "saving": 0.0})
+
+    length, path = critical_path(predecessors, order, durations)
+    redundant = {(r["stepId"], r["precedent"]) for r in result}
+    for precedent, step_id in zip(path, path[1:]):
+        if precedent in data_predecessors.get(step_id, ()) or (step_id, precedent) in redundant:
+            continue
+        relaxed = dict(predecessors)
+        relaxed[step_id] = [p for p in predecessors[step_id] if p != precedent]
+        saving = length - critical_path(relaxed, order, durations)[0]
+        if saving > 0:
+            result.append({"kind": "orderOnly", "stepId": step_id, "precedent": precedent, "saving": saving})
+    return result
+
+
+def analyze(
+    predecessors: Predecessors,
+    durations: dict[str, float],
+    data_predecessors: Optional[dict[str, set[str]]] = None,
+    max_parallel: Optional[int] = None,
+) -> dict:
+    """Full static analysis of a DAG, see the functions above for each part of the result"""
+    order = topological_order(predecessors)
+    step_levels = levels(predecessors, order)
+    widths = [0] * (1 + max(step_levels.values(), default=-1))
+    for level in step_levels.values():
+        widths[level] += 1
+    length, path = critical_path(predecessors, order, durations)
+    return {
+        "steps": len(order),
+        "levels": [
+            {"level": level, "width": width, "steps": [s for s in order if step_levels[s] == level]}
+            for level, width in enumerate(widths)
+        ],
+        "maxWidth": max(widths, default=0),
+        "totalDuration": sum(durations.values()),
+        "criticalPath": {"duration": length, "steps": path},
+        "maxParallel": max_parallel,
+        "makespan": simulate_makespan(predecessors, order, durations, max_parallel),
+        "serialization": unnecessary_serialization(predecessors, data_predecessors or dict(), order, durations),
+    }
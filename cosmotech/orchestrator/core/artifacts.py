@@ -0,0 +1,218 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Content-addressed store of the files written by the steps.
+
+Once a step declaring `fileOutputs` succeeds, each of its output files is hashed (sha256, read by chunks) and stored
+once under `objects/<2 first hex digits>/<other hex digits>` of the store directory. The output file and the stored
+object then share their content: a reflink (copy on write) where the file system supports it, a hardlink otherwise,
+a copy as last resort (store on another device). An output with a content already stored is replaced by a link
+to the stored object, so identical files written by several steps or runs use the disk once.
+
+Objects made by reflink or copy are read-only. A hardlinked object is the output file itself, it keeps the mode the
+step gave it. Before a step runs, its declared output files linked to other files are removed, so the command writes
+new files instead of modifying stored objects. File inputs stay linked: steps read them, they must not modify them.
+The last use of each object is kept in a SQLite index of the store,
+`csm-orc artifacts gc` evicts the objects unused for too long or the least recently used ones above a size.
+"""
+
+import errno
+import hashlib
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used);
+"""
+
+_CHUNK_SIZE = 1 << 20
+# ioctl request cloning a whole file (reflink) on Linux file systems supporting it (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+
+def file_digest(path: str) -> str:
+    """sha256 of the content of a file, read by chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as _file:
+        for chunk in iter(lambda: _file.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source: str, target: str) -> bool:
+    """Clone `source` to `target` sharing their blocks until one is modified, when the file system supports it"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(source, "rb") as _source, open(target, "wb") as _target:
+            fcntl.ioctl(_target.fileno(), _FICLONE, _source.fileno())
+        return True
+    except OSError:
+        pathlib.Path(target).unlink(missing_ok=True)
+        return False
+
+
+def _share(source: str, target: str):
+    """Give `target` the content of `source`: reflink, else hardlink, else copy"""
+    if _reflink(source, target):
+        return
+    try:
+        os.link(source, target)
+        return
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+    shutil.copyfile(source, target)
+
+
+# Mode of the stored objects not sharing their inode with an output file
+_OBJECT_MODE = 0o444
+
+
+def _temporary_path(path: pathlib.Path) -> pathlib.Path:
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+class ArtifactStore:
+    """Content-addressed store of step output files, safe to use from the step threads and from concurrent runs"""
+
+    def __init__(self):
+        self.root: Optional[pathlib.Path] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def open(self, root: str):
+        self.root = pathlib.Path(root)
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False, timeout=30)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        if self.root is None:
+            return
+        with self._lock:
+            self._connection.close()
+            self._connection = None
+            self.root = None
+
+    def object_path(self, digest: str) -> pathlib.Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    def _touch(self, digest: str, size: int):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO objects VALUES (?, ?, ?, ?) ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used",
+                (digest, size, now, now),
+            )
+
+    def ingest(self, paths: list[str]) -> Optional[dict[str, str]]:
+        """Store the given files, returns their content hashes (None when the store is not opened)"""
+        if not self.enabled:
+            return None
+        result = dict()
+        for path in paths:
+            digest = file_digest(path)
+            _object = self.object_path(digest)
+            _path = pathlib.Path(path)
+            if _object.exists():
+                if not os.path.samefile(_object, _path):
+                    # Same content already stored: the output becomes a link to the stored object
+                    _tmp = _temporary_path(_path)
+                    _share(str(_object), str(_tmp))
+                    os.replace(_tmp, _path)
+            else:
+                _object.parent.mkdir(exist_ok=True)
+                _tmp = _temporary_path(_object)
+                _share(path, str(_tmp))
+                if not os.path.samefile(_tmp, _path):
+                    os.chmod(_tmp, _OBJECT_MODE)
+                os.replace(_tmp, _object)
+            self._touch(digest, _object.stat().st_size)
+            result[path] = digest
+        return result
+
+    def restore(self, outputs: dict[str, str]) -> bool:
+        """Link the stored objects of the given hashes to their paths, False if any of them is not stored"""
+        if not self.enabled:
+            return False
+        for path, digest in outputs.items():
+            _object = self.object_path(digest)
+            if not _object.exists():
+                return False
+            _path = pathlib.Path(path)
+            _path.parent.mkdir(parents=True, exist_ok=True)
+            _tmp = _temporary_path(_path)
+            try:
+                _share(str(_object), str(_tmp))
+            except FileNotFoundError:
+                # Evicted by a concurrent garbage collection
+                return False
+            os.replace(_tmp, _path)
+            self._touch(digest, _path.stat().st_size)
+        return True
+
+    def unlink_shared(self, paths: list[str]):
+        """Remove the given files if they are hardlinks (to stored objects), so writing them creates new files"""
+        if not self.enabled:
+            return
+        for path in paths:
+            _path = pathlib.Path(path)
+            if _path.is_file() and _path.stat().st_nlink > 1:
+                _path.unlink()
+
+    def gc(self, max_age: Optional[float] = None, max_size: Optional[int] = None, dry_run: bool = False) -> dict:
+        """Evict the objects unused for more than `max_age` seconds, then the least recently used ones until the
+        store holds at most `max_size` bytes"""
+        with self._lock:
+            objects = self._connection.execute(
+                "SELECT digest, size, last_used FROM objects ORDER BY last_used"
+            ).fetchall()
+        evicted = list()
+        evicted_size = 0
+        total = sum(size for _, size, _ in objects)
+        limit = None if max_age is None else time.time() - max_age
+        for digest, size, last_used in objects:
+            if (limit is not None and last_used < limit) or (max_size is not None and total > max_size):
+                evicted.append(digest)
+                evicted_size += size
+                total -= size
+        if not dry_run:
+            for digest in evicted:
+                # Files linked to the object keep their content, only the store forgets it
+                self.object_path(digest).unlink(missing_ok=True)
+            with self._lock, self._connection:
+                self._connection.executemany("DELETE FROM objects WHERE digest = ?", ((d,) for d in evicted))
+        return {
+            "evicted": len(evicted),
+            "evictedSize": evicted_size,
+            "remaining": len(objects) - len(evicted),
+            "remainingSize": total,
+        }
+
+
+ARTIFACT_STORE = ArtifactStore()
@@ -20,6 +20,10 @@ class CommandTemplate:
     arguments: list[str] = field(default_factory=list)
     environment: dict[str, Union[EnvironmentVariable, dict]] = field(default_factory=dict)
     useSystemEnvironment: bool = field(default=False)
+    fileInputs: list[str] = field(default_factory=list)
+    fileOutputs: list[str] = field(default_factory=list)
+    # Only used by exit handlers: the exit handlers to wait for
+    runAfter: list[str] = field(default_factory=list)
     sourcePlugin: str = field(default=None, repr=False)
 
     def __post_init__(self):
@@ -42,4 +46,10 @@ class CommandTemplate:
             r["description"] = self.description
         if self.useSystemEnvironment:
             r["useSystemEnvironment"] = self.useSystemEnvironment
+        if self.fileInputs:
+            r["fileInputs"] = self.fileInputs
+        if self.fileOutputs:
+            r["fileOutputs"] = self.fileOutputs
+        if self.runAfter:
+            r["runAfter"] = self.runAfter
         return r
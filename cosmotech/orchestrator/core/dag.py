@@ -0,0 +1,217 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Step DAG of a run and its evaluation.
+
+Steps are integer indexed nodes, links are adjacency lists of indexes and each step counts the precedents it waits
+for, so scheduling a step only costs a few list operations whatever the size of the graph.
+The exit handlers of a run are evaluated as a graph of their own, time boxed per handler and as a whole.
+Steps are run by a step executor (see `cosmotech.orchestrator.core.executors`): subprocesses by default,
+or commands simulated on a virtual clock.
+The graph can still be exported to flowpipe (optional dependency) with `StepGraph.to_flowpipe`.
+"""
+
+import threading
+from collections import deque
+from typing import Optional
+
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.events import STEP_QUEUED
+from cosmotech.orchestrator.core.executors import PROCESS_EXECUTOR
+from cosmotech.orchestrator.core.executors import StepExecutor
+from cosmotech.orchestrator.core.expansion import instance_steps
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.core.step import StepStatus
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+
+class StepGraph:
+    """Steps of a run linked by their precedents"""
+
+    def __init__(
+        self, name: str, dry_run: bool = False, as_exit: bool = False, executor: Optional[StepExecutor] = None
+    ):
+        self.name = name
+        self.dry_run = dry_run
+        # Exit handlers run whatever the status of the handlers they wait for
+        self.as_exit = as_exit
+        self.executor = executor or PROCESS_EXECUTOR
+        self.steps: list[Step] = list()
+        # Step id -> (step, index), kept as the result of the run, instances of expanded steps included
+        self.nodes: dict[str, tuple[Step, int]] = dict()
+        self.predecessors: list[list[int]] = list()
+        self.successors: list[list[int]] = list()
+        self.in_degree: list[int] = list()
+        # Precedents each step still waits for, only while the graph is evaluated
+        self._waiting: Optional[list[int]] = None
+        self._step_timeout: Optional[float] = None
+        self._deadline: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add_step(self, step: Step) -> int:
+        with self._lock:
+            if step.id in self.nodes:
+                raise ValueError(
+                    T("csm-orc.orchestrator.core.orchestrator.step_already_defined").format(step_id=step.id)
+                )
+            index = len(self.steps)
+            self.steps.append(step)
+            self.nodes[step.id] = (step, index)
+            self.predecessors.append(list())
+            self.successors.append(list())
+            self.in_degree.append(0)
+            if self._waiting is not None:
+                self._waiting.append(0)
+        return index
+
+    def add_edge(self, precedent: int, index: int):
+        """Make the step `index` wait for the step `precedent`"""
+        with self._lock:
+            self.predecessors[index].append(precedent)
+            self.successors[precedent].append(index)
+            self.in_degree[index] += 1
+            if self._waiting is not None:
+                self._waiting[index] += 1
+
+    def cycle(self) -> list[str]:
+        """Ids of the steps waiting for one another (directly or not), empty if the graph has no cycle.
+
+        Steps are removed from the graph as their precedents are (Kahn's algorithm), and then as their dependents are,
+        so only the steps on a cycle, or linking two cycles, remain.
+        """
+        with self._lock:
+            in_degree = list(self.in_degree)
+            ready = deque(index for index, count in enumerate(in_degree) if not count)
+            while ready:
+                for successor in self.successors[ready.popleft()]:
+                    in_degree[successor] -= 1
+                    if not in_degree[successor]:
+                        ready.append(successor)
+            remaining = {index for index, count in enumerate(in_degree) if count}
+            out_degree = {index: sum(s in remaining for s in self.successors[index]) for index in remaining}
+            ready = deque(index for index, count in out_degree.items() if not count)
+            while ready:
+                index = ready.popleft()
+                remaining.discard(index)
+                for precedent in self.predecessors[index]:
+                    if precedent in remaining:
+                        out_degree[precedent] -= 1
+                        if not out_degree[precedent]:
+                            ready.append(precedent)
+            return [self.steps[index].id for index in sorted(remaining)]
+
+    def _inputs(self, step: Step, previous: dict) -> dict:
+        """Values of the inputs of a step, read from the outputs of its precedents"""
+        result = dict()
+        for input_name, input_config in step.inputs.items():
+            if input_config["stepId"] in previous:
+                value = self.nodes[input_config["stepId"]][0].captured_output.get(input_config["output"])
+                if value is not None:
+                    result[input_name] = value
+        return result
+
+    def _run_step(self, index: int) -> int:
+        step = self.steps[index]
+        if self._deadline is not None and self.executor.clock() >= self._deadline:
+            LOGGER.warning(T("csm-orc.orchestrator.core.dag.deadline_passed").format(step_id=step.id))
+            step.status = StepStatus.CANCELLED
+            EVENT_BUS.emit(
+                STEP_FINISHED, stepId=step.id, exitHandler=self.as_exit, status=step.status.name, duration=0.0
+            )
+            return index
+        with self.executor.time_box(self._step_timeout, [step.id]):
+            if self.as_exit:
+                step.run(dry=self.dry_run, as_exit=True, executor=self.executor)
+                return index
+            previous = {self.steps[p].id: self.steps[p].status for p in self.predecessors[index]}
+            status = step.run(
+                dry=self.dry_run, previous=previous, input_data=self._inputs(step, previous), executor=self.executor
+            )
+        if step.expand and status == StepStatus.SUCCESS:
+            self.expand(index)
+        return index
+
+    def expand(self, index: int):
+        """Add the instances of an expanded step, they run after it and before the steps depending on it.
+
+        Called from the thread of the expanded step before it is done, its dependents can not be ready yet.
+        """
+        step = self.steps[index]
+        instances = instance_steps(step)
+        LOGGER.info(
+            T("csm-orc.orchestrator.core.expansion.expanding").format(
+                step_id=step.id, count=len(instances), command_id=step.expand["commandId"]
+            )
+        )
+        dependents = list(self.successors[index])
+        for instance in instances:
+            if missing := instance.check_env():
+                LOGGER.error(
+                    T("csm-orc.orchestrator.core.expansion.missing_env").format(
+                        step_id=instance.id, variables=", ".join(missing)
+                    )
+                )
+                instance.status = StepStatus.ERROR
+            instance_index = self.add_step(instance)
+            self.add_edge(index, instance_index)
+            for dependent in dependents:
+                self.add_edge(instance_index, dependent)
+            EVENT_BUS.emit(STEP_QUEUED, stepId=instance.id, exitHandler=False, expandedFrom=step.id)
+
+    def evaluate(
+        self, max_workers: Optional[int] = None, step_timeout: Optional[float] = None, timeout: Optional[float] = None
+    ):
+        """Run every step once its precedents are done, at most `max_workers` at once.
+
+        Steps still running after `step_timeout` seconds are killed. Once `timeout` seconds passed since the start of
+        the evaluation, the running steps are killed and the ones not started yet end as cancelled without running.
+        """
+        with self._lock:
+            self._waiting = list(self.in_degree)
+            ready = deque(index for index, count in enumerate(self._waiting) if not count)
+            self._step_timeout = step_timeout
+            self._deadline = None if timeout is None else self.executor.clock() + timeout
+        try:
+            with self.executor.time_box(timeout), self.executor.pool(max_workers) as pool:
+                while ready or pool:
+                    while ready:
+                        pool.submit(self._run_step, ready.popleft())
+                    for index in pool.wait():
+                        with self._lock:
+                            for successor in self.successors[index]:
+                                self._waiting[successor] -= 1
+                                if not self._waiting[successor]:
+                                    ready.append(successor)
+        finally:
+            with self._lock:
+                self._waiting = None
+                self._step_timeout = None
+                self._deadline = None
+
+    def to_flowpipe(self):
+        """The same graph as flowpipe nodes, to export it or evaluate it with flowpipe (optional dependency)"""
+        import flowpipe
+
+        from cosmotech.orchestrator.core.runner import Runner
+
+        graph = flowpipe.Graph(name=self.name)
+        nodes = [Runner(graph=graph, name=step.id, step=step, dry_run=self.dry_run) for step in self.steps]
+        for index, precedents in enumerate(self.predecessors):
+            step = self.steps[index]
+            data_precedents = {i["stepId"] for i in step.inputs.values()}
+            for precedent in precedents:
+                precedent_id = self.steps[precedent].id
+                nodes[precedent].outputs["status"].connect(nodes[index].inputs["previous"][precedent_id])
+                if precedent_id in data_precedents:
+                    nodes[precedent].outputs["output_data"].connect(nodes[index].inputs["input_data"])
+        return graph
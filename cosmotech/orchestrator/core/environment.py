@@ -6,11 +6,20 @@
 # specifically authorized by written means by Cosmo Tech.
 
 import os
+from collections import ChainMap
 from dataclasses import dataclass
 from dataclasses import field
+from types import MappingProxyType
+from typing import Mapping
 
+# Standard environment variables (mostly the ones configured in the docker image by default) given to every step
+# This avoids needing to add "useSystemEnvironment" in every/most steps
+SYSTEM_VARIABLES = ("PATH", "PYTHONPATH", "LD_LIBRARY_PATH", "SSL_CERT_DIR")
 
-@dataclass
+_EMPTY = MappingProxyType({})
+
+
+@dataclass(frozen=True, slots=True)
 class EnvironmentVariable:
     name: str = field(repr=False)
     defaultValue: str = field(default=None)
@@ -27,11 +36,15 @@ class EnvironmentVariable:
             return str(v)
         return None
 
-    def join(self, other: "EnvironmentVariable"):
-        self.defaultValue = self.defaultValue or other.defaultValue
-        self.value = self.value or other.value
-        self.description = self.description or other.description
-        self.optional = self.optional or other.optional
+    def join(self, other: "EnvironmentVariable") -> "EnvironmentVariable":
+        """New variable completing this one with `other`, variables are immutable as templates share theirs"""
+        return EnvironmentVariable(
+            self.name,
+            defaultValue=self.defaultValue or other.defaultValue,
+            value=self.value or other.value,
+            description=self.description or other.description,
+            optional=self.optional or other.optional,
+        )
 
     def serialize(self):
         r = {}
@@ -44,3 +57,47 @@ class EnvironmentVariable:
         if self.optional:
             r["optional"] = self.optional
         return r
+
+
+def layered_environment(overrides: dict[str, EnvironmentVariable], shared: dict[str, EnvironmentVariable]) -> ChainMap:
+    """Variables of a step stacked on the variables of its command template.
+
+    The template variables are shared by every step using the template, not copied: lookups fall back to them
+    while writes only go to the step layer (copy on write). A variable defined by both is joined into the step layer.
+    """
+    _overrides = {k: v.join(shared[k]) if k in shared else v for k, v in overrides.items()}
+    return ChainMap(_overrides, shared)
+
+
+@dataclass(frozen=True, slots=True)
+class EnvironmentSnapshot:
+    """Environment of a step resolved once, shared by its checks, the generated env files and its launch"""
+
+    # Variables given to the command: unset optional variables are left out, other unset ones are empty
+    values: Mapping[str, str]
+    # Variables without any value (neither set, given by the system nor defaulted)
+    unset: frozenset[str]
+    # Required variables without any value, with their description
+    missing: Mapping[str, str]
+
+
+def snapshot_environment(environment: Mapping[str, EnvironmentVariable]) -> EnvironmentSnapshot:
+    values = dict()
+    unset = set()
+    missing = dict()
+    for k, v in environment.items():
+        _v = v.effective_value()
+        if _v is None:
+            unset.add(k)
+            if v.is_required():
+                missing[k] = v.description
+            if v.optional:
+                continue
+            _v = ""
+        values[k] = _v
+    for env_name in SYSTEM_VARIABLES:
+        if env_name not in values and os.environ.get(env_name):
+            values[env_name] = os.environ.get(env_name)
+    return EnvironmentSnapshot(
+        MappingProxyType(values), frozenset(unset), MappingProxyType(missing) if missing else _EMPTY
+    )
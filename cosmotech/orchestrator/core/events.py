@@ -0,0 +1,79 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Typed events emitted while running an orchestration file.
+
+Every event is a JSON serializable dict with a `type` (one of the constants below), a `time` (epoch seconds)
+and type specific data, always including the `stepId` of the step concerned.
+`step_started` is only emitted when the command of the step is launched: skipped, dry run, up to date and
+cancelled steps go straight to `step_finished` with their status.
+"""
+
+import json
+import threading
+import time
+from typing import Callable
+from typing import TextIO
+
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+STEP_QUEUED = "step_queued"
+STEP_STARTED = "step_started"
+STEP_OUTPUT = "step_output"
+STEP_FINISHED = "step_finished"
+
+EventHandler = Callable[[dict], None]
+
+
+class EventBus:
+    """In-process publish/subscribe of run events, handlers are called synchronously by the emitting thread"""
+
+    def __init__(self):
+        self._handlers: list[EventHandler] = list()
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: EventHandler) -> EventHandler:
+        with self._lock:
+            self._handlers.append(handler)
+        return handler
+
+    def unsubscribe(self, handler: EventHandler):
+        with self._lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+
+    def emit(self, event_type: str, **data) -> dict:
+        event = {"type": event_type, "time": time.time(), **data}
+        with self._lock:
+            handlers = list(self._handlers)
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                # A failing subscriber must never break the run
+                LOGGER.debug(f"Event handler {handler} failed on {event_type}: {e}")
+        return event
+
+
+class EventFileWriter:
+    """Event handler writing each event as a JSON line, to relay events to another process"""
+
+    def __init__(self, target: str):
+        self._file: TextIO = open(target, "w", buffering=1)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        with self._lock:
+            self._file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+EVENT_BUS = EventBus()
@@ -0,0 +1,265 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Backends running the steps of a graph being evaluated.
+
+A step executor runs the command of a step (`execute`), gives the clock of the run, limits how many steps run
+at once (`pool`) and how long they may run (`time_box`). `StepGraph.evaluate` keeps the scheduling logic
+(precedents, expansions, deadlines) whatever the backend.
+
+`ProcessExecutor` is the real backend: a thread pool running each command in a bash subprocess, on wall clock time.
+`SimulatedExecutor` starts no process: each command succeeds or fails, outputs values and uses resources as given by
+a spec, and lasts its given duration on a virtual clock. A step is executed when it starts on the virtual clock and
+the clock jumps to the next step to finish, so thousands of steps are scheduled in a fraction of a second.
+The outcome of a step is decided when it starts: cancelling the run (fail fast, signals) only affects the steps
+started after the step causing it.
+
+A simulation spec gives the command of each step, by step id, else by command template id, else by default:
+
+    {
+      "seed": 0,
+      "default": {"duration": 1},
+      "commandTemplates": {"process": {"duration": [0.5, 2], "failureRate": 0.1}},
+      "steps": {"discover": {"duration": 3, "outputs": {"items": ["a", "b"]}, "resources": {"maxMemory": 1048576}}}
+    }
+
+The fields of a command are its `duration` in seconds (or `[min, max]` for a uniform draw), its `returnCode`,
+a `failureRate` (probability of returning 1), its `outputs` (non string values are JSON encoded) and its `resources`.
+Random draws only depend on the seed and the step id, so a spec always gives the same run.
+"""
+
+import abc
+import contextlib
+import heapq
+import json
+import math
+import os
+import pathlib
+import random
+import time
+from collections import deque
+from concurrent import futures
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+
+from cosmotech.orchestrator.core.run_control import RUN_CONTROL
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+# Exit code of a command killed with SIGKILL, as reported by subprocess
+_KILLED = -9
+
+
+def default_max_workers() -> int:
+    """Steps running at once when evaluating a graph without limit: the default of `ThreadPoolExecutor`"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+@dataclass(frozen=True, slots=True)
+class CommandResult:
+    """What the command of a step did: its exit code, the outputs it printed and the resources it used"""
+
+    return_code: int
+    outputs: dict = field(default_factory=dict)
+    resources: dict = field(default_factory=dict)
+    # Stopped by the run control (run cancelled or time box expired)
+    signalled: bool = False
+
+
+class StepPool(abc.ABC):
+    """Steps submitted to an executor and not reported as done yet"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @abc.abstractmethod
+    def __len__(self) -> int: ...
+
+    @abc.abstractmethod
+    def submit(self, function: Callable[[int], int], index: int):
+        """Run `function(index)` once a slot is free, it returns the index of the step it ran"""
+
+    @abc.abstractmethod
+    def wait(self) -> list[int]:
+        """Indexes of the next steps done, waiting for at least one"""
+
+
+class StepExecutor(abc.ABC):
+    """Backend of `StepGraph.evaluate`, running the commands of the steps"""
+
+    @abc.abstractmethod
+    def clock(self) -> float: ...
+
+    @abc.abstractmethod
+    def pool(self, max_workers: Optional[int] = None) -> StepPool: ...
+
+    @abc.abstractmethod
+    def time_box(
+        self, timeout: Optional[float], step_ids: Optional[list[str]] = None
+    ) -> contextlib.AbstractContextManager:
+        """Kill the commands (of the given steps only) still running `timeout` seconds from now"""
+
+    @abc.abstractmethod
+    def execute(self, step, environment: dict[str, str], as_exit: bool) -> CommandResult: ...
+
+
+class _ThreadPool(StepPool):
+    def __init__(self, max_workers: Optional[int]):
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._running: set[futures.Future] = set()
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
+        return False
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    def submit(self, function: Callable[[int], int], index: int):
+        self._running.add(self._executor.submit(function, index))
+
+    def wait(self) -> list[int]:
+        done, _ = futures.wait(self._running, return_when=futures.FIRST_COMPLETED)
+        self._running -= done
+        return [future.result() for future in done]
+
+
+class ProcessExecutor(StepExecutor):
+    """Commands run as bash subprocesses by a thread pool, on wall clock time"""
+
+    def clock(self) -> float:
+        return time.monotonic()
+
+    def pool(self, max_workers: Optional[int] = None) -> StepPool:
+        return _ThreadPool(max_workers)
+
+    def time_box(
+        self, timeout: Optional[float], step_ids: Optional[list[str]] = None
+    ) -> contextlib.AbstractContextManager:
+        return RUN_CONTROL.time_box(timeout, step_ids)
+
+    def execute(self, step, environment: dict[str, str], as_exit: bool) -> CommandResult:
+        return step.run_command(environment, as_exit)
+
+
+class _VirtualPool(StepPool):
+    def __init__(self, executor: "SimulatedExecutor", max_workers: int):
+        self._executor = executor
+        self._max_workers = max_workers
+        self._queued: deque[tuple[Callable[[int], int], int]] = deque()
+        # (finish time, start order, index) of the running steps
+        self._running: list[tuple[float, int, int]] = list()
+        self._started = 0
+
+    def __len__(self) -> int:
+        return len(self._queued) + len(self._running)
+
+    def _start_queued(self):
+        while self._queued and len(self._running) < self._max_workers:
+            function, index = self._queued.popleft()
+            start = self._executor.now
+            index = function(index)
+            # Executing the step moved the clock to its finish, other steps may start at the same time
+            finish, self._executor.now = self._executor.now, start
+            self._started += 1
+            heapq.heappush(self._running, (finish, self._started, index))
+
+    def submit(self, function: Callable[[int], int], index: int):
+        self._queued.append((function, index))
+        self._start_queued()
+
+    def wait(self) -> list[int]:
+        finish, _, index = heapq.heappop(self._running)
+        done = [index]
+        while self._running and self._running[0][0] == finish:
+            done.append(heapq.heappop(self._running)[2])
+        self._executor.now = finish
+        # Like a thread pool, queued steps take the freed slots before the dependents of the steps done
+        self._start_queued()
+        return done
+
+
+class SimulatedExecutor(StepExecutor):
+    """Commands simulated from a spec on a virtual clock, starting no process"""
+
+    def __init__(self, spec: Optional[dict] = None):
+        spec = spec or dict()
+        self.seed = spec.get("seed", 0)
+        self.default: dict = spec.get("default", dict())
+        self.command_templates: dict[str, dict] = spec.get("commandTemplates", dict())
+        self.steps: dict[str, dict] = spec.get("steps", dict())
+        self.now = 0.0
+        # Time after which the commands get killed: per step id, None for every step
+        self._limits: dict[Optional[str], float] = dict()
+
+    @classmethod
+    def from_file(cls, path: str) -> "SimulatedExecutor":
+        return cls(json.loads(pathlib.Path(path).read_text()))
+
+    def clock(self) -> float:
+        return self.now
+
+    def pool(self, max_workers: Optional[int] = None) -> StepPool:
+        return _VirtualPool(self, max_workers or default_max_workers())
+
+    @contextlib.contextmanager
+    def time_box(self, timeout: Optional[float], step_ids: Optional[list[str]] = None) -> Iterator[None]:
+        if timeout is None:
+            yield
+            return
+        keys = step_ids or [None]
+        previous = {key: self._limits.get(key) for key in keys}
+        for key in keys:
+            self._limits[key] = min(self.now + timeout, self._limits.get(key, math.inf))
+        try:
+            yield
+        finally:
+            for key, limit in previous.items():
+                if limit is None:
+                    self._limits.pop(key, None)
+                else:
+                    self._limits[key] = limit
+
+    def command(self, step) -> dict:
+        """Spec of the command of a step: the default one, updated by the one of its template, then its own"""
+        return {
+            **self.default,
+            **self.command_templates.get(step.display_command_id, dict()),
+            **self.steps.get(step.id, dict()),
+        }
+
+    def execute(self, step, environment: dict[str, str], as_exit: bool) -> CommandResult:
+        command = self.command(step)
+        draw = random.Random(f"{self.seed}:{step.id}")
+        duration = command.get("duration", 0.0)
+        if isinstance(duration, list):
+            duration = draw.uniform(*duration)
+        return_code = command.get("returnCode", 0)
+        if draw.random() < command.get("failureRate", 0.0):
+            return_code = 1
+        outputs = {k: v if isinstance(v, str) else json.dumps(v) for k, v in command.get("outputs", dict()).items()}
+        limit = min(self._limits.get(step.id, math.inf), self._limits.get(None, math.inf))
+        signalled = self.now + duration > limit
+        if signalled:
+            duration, return_code, outputs = max(limit - self.now, 0.0), _KILLED, dict()
+        LOGGER.debug(
+            T("csm-orc.orchestrator.core.executors.simulated").format(
+                step_id=step.id, duration=duration, return_code=return_code
+            )
+        )
+        self.now += duration
+        return CommandResult(return_code, outputs, dict(command.get("resources", dict())), signalled)
+
+
+PROCESS_EXECUTOR = ProcessExecutor()
@@ -0,0 +1,80 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Expansion of steps into new step instances while the run is going on.
+
+A step with an `expand` section outputs a JSON list, once it succeeds each item of the list becomes an instance
+of the given command template. Instances depend on the expanded step, and the steps depending on the expanded step
+also wait for every instance. They are added to the graph being evaluated (see `StepGraph.expand`) and run
+in the same thread pool as the other steps, so they share its limit.
+
+Instance ids are the id of the expanded step followed by the index of their item (`discover.0`, `discover.1`...),
+no other step of the run can use such an id (see `check_instance_ids`).
+"""
+
+import json
+import re
+from typing import Iterable
+
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.templates.library import Library
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+_INSTANCE_ID = re.compile(r"(.+)\.(0|[1-9][0-9]*)")
+
+
+def _env_value(value) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def check_instance_ids(steps: Iterable[Step]):
+    """Raise a ValueError if a step uses an id reserved for the instances of an expanded step"""
+    steps = list(steps)
+    expanded = {step.id for step in steps if step.expand}
+    for step in steps:
+        if (match := _INSTANCE_ID.fullmatch(step.id)) and match.group(1) in expanded:
+            raise ValueError(
+                T("csm-orc.orchestrator.core.expansion.reserved_id").format(step_id=step.id, expanded_id=match.group(1))
+            )
+
+
+def instance_steps(step: Step) -> list[Step]:
+    """Instances of the command template of an expanded step, one per item of its expansion output.
+
+    Each instance gets the index and the item (JSON encoded if not a string) of its item in CSM_ORC_EXPAND_INDEX
+    and CSM_ORC_EXPAND_ITEM. The keys of an object item that the template declares in its environment are also
+    given as environment variables, other keys are only available in CSM_ORC_EXPAND_ITEM.
+    """
+    command_id = step.expand["commandId"]
+    template = Library().find_template_by_name(command_id)
+    declared = set(template.environment) if template is not None else set()
+    ignored = set()
+    result = list()
+    for index, item in enumerate(step.expansion_items):
+        environment = dict()
+        if isinstance(item, dict):
+            environment.update({k: {"value": _env_value(v)} for k, v in item.items() if k in declared})
+            ignored.update(k for k in item if k not in declared)
+        environment["CSM_ORC_EXPAND_INDEX"] = {"value": str(index)}
+        environment["CSM_ORC_EXPAND_ITEM"] = {"value": _env_value(item)}
+        result.append(
+            Step(
+                id=f"{step.id}.{index}",
+                commandId=command_id,
+                environment=environment,
+                precedents=[step.id],
+            )
+        )
+    if ignored:
+        LOGGER.warning(
+            T("csm-orc.orchestrator.core.expansion.undeclared_keys").format(
+                step_id=step.id, command_id=command_id, keys=", ".join(sorted(ignored))
+            )
+        )
+    return result
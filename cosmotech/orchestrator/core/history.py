@@ -0,0 +1,145 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+History of the steps executed by previous runs, stored in a local SQLite database.
+
+Each finished step is recorded with its duration, status, resource usage and command template,
+durations of successful steps are then summarized as percentiles per step or per command template.
+"""
+
+import math
+import pathlib
+import sqlite3
+import threading
+import uuid
+from typing import Optional
+
+from cosmotech.orchestrator.core.events import EventHandler
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS step_runs (
+    run_id TEXT NOT NULL,
+    project TEXT NOT NULL,
+    step_id TEXT NOT NULL,
+    command_id TEXT,
+    exit_handler INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    user_time REAL,
+    system_time REAL,
+    max_memory INTEGER
+);
+CREATE INDEX IF NOT EXISTS step_runs_step ON step_runs (project, step_id, finished_at);
+CREATE INDEX IF NOT EXISTS step_runs_command ON step_runs (command_id, finished_at);
+"""
+
+GROUP_BY_STEP = "step"
+GROUP_BY_TEMPLATE = "template"
+
+
+def percentile(sorted_values: list[float], q: float) -> Optional[float]:
+    """Percentile `q` (0-100) of sorted values, with linear interpolation between the closest ranks"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class StepHistory:
+    """SQLite database of the steps executed by previous runs, safe to use from the step threads"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def record(self, run_id: str, project: str, event: dict):
+        """Store a `step_finished` event"""
+        resources = event.get("resources") or {}
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO step_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    project,
+                    event["stepId"],
+                    event.get("commandId"),
+                    int(bool(event.get("exitHandler"))),
+                    event["status"],
+                    event["time"],
+                    event["duration"],
+                    resources.get("userTime"),
+                    resources.get("systemTime"),
+                    resources.get("maxMemory"),
+                ),
+            )
+
+    def recorder(self, project: str, run_id: Optional[str] = None) -> EventHandler:
+        """Event handler recording the steps finished during one run of `project`"""
+        run_id = run_id or uuid.uuid4().hex
+
+        def _record(event: dict):
+            if event["type"] == STEP_FINISHED:
+                self.record(run_id, project, event)
+
+        return _record
+
+    def durations(self, group_by: str = GROUP_BY_STEP) -> dict[tuple, list[float]]:
+        """Durations of the successful executions, oldest first, grouped by (project, step id) or by template id"""
+        if group_by == GROUP_BY_TEMPLATE:
+            query = (
+                "SELECT command_id, duration FROM step_runs WHERE status = 'SUCCESS' AND command_id IS NOT NULL "
+                "ORDER BY finished_at"
+            )
+        else:
+            query = "SELECT project, step_id, duration FROM step_runs WHERE status = 'SUCCESS' ORDER BY finished_at"
+        result: dict[tuple, list[float]] = dict()
+        with self._lock:
+            for *key, duration in self._connection.execute(query):
+                result.setdefault(tuple(key), list()).append(duration)
+        return result
+
+    def statistics(self, group_by: str = GROUP_BY_STEP, recent: int = 5, threshold: float = 0.2) -> list[dict]:
+        """Duration percentiles of each step (or command template), oldest executions first.
+
+        The `recent` last executions are compared to the ones before them (the baseline): a median duration
+        more than `threshold` (ratio) above the baseline median is flagged as a regression.
+        A baseline needs at least `recent` executions, keys with a shorter history are never flagged.
+        """
+        result = list()
+        for key, durations in sorted(self.durations(group_by).items()):
+            _sorted = sorted(durations)
+            entry = {"commandId": key[0]} if group_by == GROUP_BY_TEMPLATE else {"project": key[0], "stepId": key[1]}
+            entry.update(
+                {
+                    "count": len(durations),
+                    "p50": percentile(_sorted, 50),
+                    "p95": percentile(_sorted, 95),
+                    "p99": percentile(_sorted, 99),
+                    "baselineP50": None,
+                    "recentP50": None,
+                    "regression": False,
+                }
+            )
+            baseline, latest = durations[:-recent], durations[-recent:]
+            if recent > 0 and len(baseline) >= recent:
+                entry["baselineP50"] = percentile(sorted(baseline), 50)
+                entry["recentP50"] = percentile(sorted(latest), 50)
+                entry["regression"] = entry["recentP50"] > entry["baselineP50"] * (1 + threshold)
+            result.append(entry)
+        return result
@@ -8,10 +8,11 @@
 import json
 import pathlib
 
-import flowpipe
 import jsonschema
 
-from cosmotech.orchestrator.core.runner import Runner
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.expansion import check_instance_ids
+from cosmotech.orchestrator.core.selection import StepSelection
 from cosmotech.orchestrator.core.step import Step
 from cosmotech.orchestrator.core.step import StepStatus
 from cosmotech.orchestrator.templates.library import Library
@@ -32,26 +33,97 @@ class FileLoader:
         container[_id] = _item
         return _item
 
+    # Keys allowed on an include step, the other step properties only make sense for commands
+    INCLUDE_KEYS = {"id", "include", "description", "precedents", "environment"}
+
     def __init__(self, file_path):
         self.file_path = file_path
         self.library = Library()
+        # Include step id -> ids of every step it pulled in
+        self.groups: dict[str, list[str]] = dict()
 
-    def __call__(self, skipped_steps: list[str] = ()):
-        _path = pathlib.Path(self.file_path)
+    def _read_file(self, file_path: str) -> dict:
+        _path = pathlib.Path(file_path)
         _run_content = json.load(_path.open())
         schema_path = pathlib.Path(__file__).parent.parent / "schema/run_template_json_schema.json"
         schema = json.load(schema_path.open())
         jsonschema.validate(_run_content, schema)
-        steps: dict[str, Step] = dict()
-        plugin = Plugin(self.file_path)
-        plugin.name = self.file_path
+        plugin = Plugin(file_path)
+        plugin.name = file_path
         for tmpl in _run_content.get("commandTemplates", list()):
             _template = plugin.register_template(tmpl)
         self.library.load_plugin(plugin)
+        return _run_content
+
+    def _flatten(self, file_path: str, prefix: str = "", included_from: tuple = ()) -> list[dict]:
+        """Step descriptions of a file, include steps replaced by the steps of the file they include.
+
+        Included steps get the include step id (and a dot) as prefix, their links are prefixed the same way.
+        Included steps without precedents depend on the precedents of the include step, and depending on the
+        include step means depending on every included step nothing else depends on.
+        Environment variables of the include step override the ones of every included step.
+        """
+        _run_content = self._read_file(file_path)
+        result = list()
+        # Include step id -> final ids of the included steps nothing else depends on
+        leaves: dict[str, list[str]] = dict()
         for step in _run_content.get("steps", list()):
+            _id = prefix + step["id"]
+            if "include" not in step:
+                if prefix:
+                    step = dict(step, id=_id)
+                    if "precedents" in step:
+                        step["precedents"] = [prefix + p for p in step["precedents"]]
+                    if "inputs" in step:
+                        step["inputs"] = {k: dict(v, stepId=prefix + v["stepId"]) for k, v in step["inputs"].items()}
+                result.append(step)
+                continue
+
+            if unknown := set(step) - self.INCLUDE_KEYS:
+                raise ValueError(
+                    T("csm-orc.orchestrator.core.orchestrator.include.invalid_keys").format(
+                        step_id=_id, keys=", ".join(sorted(unknown))
+                    )
+                )
+            _sub_path = str(pathlib.Path(file_path).parent / step["include"])
+            _chain = included_from + (str(pathlib.Path(file_path).resolve()),)
+            if str(pathlib.Path(_sub_path).resolve()) in _chain:
+                raise ValueError(
+                    T("csm-orc.orchestrator.core.orchestrator.include.cycle").format(step_id=_id, file_path=_sub_path)
+                )
+            LOGGER.debug(
+                T("csm-orc.orchestrator.core.orchestrator.include.loading").format(step_id=_id, file_path=_sub_path)
+            )
+            included = self._flatten(_sub_path, _id + ".", _chain)
+            depended_on = {p for s in included for p in s.get("precedents", ())}
+            leaves[_id] = [s["id"] for s in included if s["id"] not in depended_on]
+            self.groups[_id] = [s["id"] for s in included]
+            for sub_step in included:
+                if not sub_step.get("precedents"):
+                    sub_step["precedents"] = [prefix + p for p in step.get("precedents", ())]
+                if overrides := step.get("environment"):
+                    _env = dict(sub_step.get("environment", dict()))
+                    for k, v in overrides.items():
+                        _env[k] = {**_env.get(k, dict()), **v}
+                    sub_step["environment"] = _env
+            result.extend(included)
+
+        if leaves:
+            for step in result:
+                if any(p in leaves for p in step.get("precedents", ())):
+                    step["precedents"] = [_p for p in step["precedents"] for _p in leaves.get(p, [p])]
+        return result
+
+    def __call__(self, skipped_steps: list[str] = ()):
+        steps: dict[str, Step] = dict()
+        _flat_steps = self._flatten(self.file_path)
+        skipped = set(skipped_steps)
+        for group in skipped_steps:
+            skipped.update(self.groups.get(group, ()))
+        for step in _flat_steps:
             _id = step.get("id")
             s = self.load_step(steps, **step)
-            if _id in skipped_steps:
+            if _id in skipped:
                 s.skipped = True
             steps[_id] = s
 
@@ -70,6 +142,7 @@ class Orchestrator(metaclass=Singleton):
         skipped_steps: list[str] = (),
         validate_only: bool = False,
         ignore_error: bool = False,
+        selection: StepSelection = None,
     ):
         # Call a loader class for the orchestration file to get steps
         steps = FileLoader(json_file_path)(skipped_steps=skipped_steps)
@@ -77,19 +150,20 @@ class Orchestrator(metaclass=Singleton):
         if validate_only:
             LOGGER.info(T("csm-orc.orchestrator.core.orchestrator.valid_file").format(file_path=json_file_path))
             return None, None
+        if selection:
+            selection.apply(steps)
         return self._load_from_json_content(json_file_path, steps, dry, display_env, ignore_error)
 
     @staticmethod
     def _load_from_json_content(
         json_file_path, steps: dict[str, Step], dry: bool = False, display_env: bool = False, ignore_error: bool = False
     ):
-        _graph = flowpipe.Graph(name=json_file_path)
-        _steps: dict[str, (Step, flowpipe.Node)] = dict()
-
-        # Generate flowpipe runners for execution
-        for k, v in steps.items():
-            node = Runner(graph=_graph, name=k, step=v, dry_run=dry)
-            _steps[k] = (v, node)
+        # Index the steps for execution, they are linked to their precedents below
+        check_instance_ids(steps.values())
+        _graph = StepGraph(name=json_file_path, dry_run=dry)
+        for v in steps.values():
+            _graph.add_step(v)
+        _steps = _graph.nodes
 
         # Check for missing environment variable and instantiate DAG
         missing_env = dict()
@@ -108,7 +182,7 @@ class Orchestrator(metaclass=Singleton):
                             T("csm-orc.orchestrator.core.orchestrator.step_not_exists").format(step_id=_precedent)
                         )
                     _prec_step, _prec_node = _steps.get(_precedent)
-                    _prec_node.outputs["status"].connect(_node.inputs["previous"][_precedent])
+                    _graph.add_edge(_prec_node, _node)
                     LOGGER.debug(
                         T("csm-orc.orchestrator.core.orchestrator.dependencies.found").format(precedent=_precedent)
                     )
@@ -141,10 +215,10 @@ class Orchestrator(metaclass=Singleton):
                                         to_input=input_name,
                                     )
                                 )
-                            # Connect the output_data to input_data
-                            _prec_node.outputs["output_data"].connect(_node.inputs["input_data"])
             if _step_missing_env := _step.check_env():
                 missing_env[_step.id] = _step_missing_env
+        if cycle := _graph.cycle():
+            raise ValueError(T("csm-orc.orchestrator.core.orchestrator.cycle").format(steps=", ".join(cycle)))
         if display_env:
             # Pure display of environment variables names and descriptions
             _env: dict[str, set] = dict()
@@ -0,0 +1,219 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Control of the step processes running for the current run.
+
+Each step runs its command in its own process group and registers it here while it runs,
+cancelling the run signals every registered process group and keeps new steps from starting.
+A termination (SIGTERM, SIGINT) also gives the run a deadline: steps still running after the drain timeout
+are killed, and the exit handlers get whatever remains of the grace period.
+"""
+
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Iterator
+from typing import Optional
+
+from cosmotech.orchestrator.core.events import EventHandler
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+DEFAULT_DRAIN_TIMEOUT = 15.0
+DEFAULT_GRACE_PERIOD = 25.0
+
+
+class RunControl:
+    def __init__(self):
+        # Registered processes, with whether a cancellation stops them (exit handlers are only time boxed)
+        self._processes: dict[str, tuple[subprocess.Popen, bool]] = dict()
+        self._signalled: set[str] = set()
+        # Steps whose time box ended, their process is killed as soon as it is registered
+        self._expired: set[str] = set()
+        # Reentrant: signal handlers run on the main thread, possibly while it holds the lock
+        self._lock = threading.RLock()
+        self._timers: list[threading.Timer] = list()
+        self.cancelled = False
+        self.reason: Optional[str] = None
+        self.deadline: Optional[float] = None
+
+    def reset(self):
+        """Forget the cancellation of a previous run"""
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+            self._processes.clear()
+            self._signalled.clear()
+            self._expired.clear()
+            self.cancelled = False
+            self.reason = None
+            self.deadline = None
+
+    @staticmethod
+    def _signal(process: subprocess.Popen, sig: int):
+        try:
+            os.killpg(process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            # Process group already gone
+            pass
+
+    def _start_timer(self, delay: float, function, *args) -> threading.Timer:
+        timer = threading.Timer(max(delay, 0), function, args=args)
+        timer.daemon = True
+        with self._lock:
+            self._timers.append(timer)
+        timer.start()
+        return timer
+
+    def register(self, step_id: str, process: subprocess.Popen, cancellable: bool = True):
+        """Track the process of a running step, signalling it right away if the run got cancelled meanwhile"""
+        with self._lock:
+            self._processes[step_id] = (process, cancellable)
+            if step_id in self._expired:
+                self._signalled.add(step_id)
+                self._signal(process, signal.SIGKILL)
+            elif self.cancelled and cancellable:
+                self._signalled.add(step_id)
+                self._signal(process, signal.SIGTERM)
+
+    def unregister(self, step_id: str):
+        with self._lock:
+            self._processes.pop(step_id, None)
+
+    def was_signalled(self, step_id: str) -> bool:
+        """Whether the process of the step was stopped by a cancellation rather than failing by itself"""
+        with self._lock:
+            return step_id in self._signalled
+
+    def cancel(self, reason: str, sig: int = signal.SIGTERM) -> list[str]:
+        """Cancel the run: no step starts anymore and the running ones get `sig`. Returns the signalled steps"""
+        with self._lock:
+            if not self.cancelled:
+                self.cancelled = True
+                self.reason = reason
+            signalled = list()
+            for step_id, (process, cancellable) in self._processes.items():
+                if cancellable:
+                    self._signalled.add(step_id)
+                    self._signal(process, sig)
+                    signalled.append(step_id)
+        if signalled:
+            LOGGER.warning(T("csm-orc.orchestrator.core.run_control.signalled").format(steps=", ".join(signalled)))
+        return signalled
+
+    def kill(self, cancellable_only: bool = True, step_ids: Optional[list[str]] = None) -> list[str]:
+        """Send SIGKILL to the registered processes (only the cancellable ones by default). Returns the killed steps
+
+        Given `step_ids`, only the processes of these steps are killed, even if they register later on.
+        """
+        with self._lock:
+            killed = list()
+            if step_ids is not None:
+                self._expired.update(step_ids)
+            for step_id, (process, cancellable) in self._processes.items():
+                if step_ids is not None and step_id not in step_ids:
+                    continue
+                if cancellable or not cancellable_only:
+                    self._signalled.add(step_id)
+                    self._signal(process, signal.SIGKILL)
+                    killed.append(step_id)
+        if killed:
+            LOGGER.warning(T("csm-orc.orchestrator.core.run_control.killed").format(steps=", ".join(killed)))
+        return killed
+
+    def terminate(
+        self,
+        reason: str,
+        sig: int = signal.SIGTERM,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        grace_period: float = DEFAULT_GRACE_PERIOD,
+    ):
+        """Gracefully stop the run: cancel it, then kill the steps still running after `drain_timeout` seconds.
+
+        The whole run (steps draining and exit handlers) gets `grace_period` seconds from the first termination,
+        later terminations only forward their signal.
+        """
+        with self._lock:
+            first = self.deadline is None
+            if first:
+                self.deadline = time.monotonic() + grace_period
+        if first:
+            LOGGER.warning(
+                T("csm-orc.orchestrator.core.run_control.terminating").format(
+                    reason=reason, drain_timeout=drain_timeout, grace_period=grace_period
+                )
+            )
+            self._start_timer(min(drain_timeout, grace_period), self.kill)
+        self.cancel(reason, sig)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the termination deadline, None if the run is not terminating"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    @contextlib.contextmanager
+    def time_box(self, timeout: Optional[float], step_ids: Optional[list[str]] = None) -> Iterator[None]:
+        """Kill every registered process (exit handlers included) still running `timeout` seconds from now.
+
+        Given `step_ids`, only the processes of these steps are time boxed.
+        """
+        if timeout is None:
+            yield
+            return
+        timer = self._start_timer(timeout, self.kill, False, step_ids)
+        try:
+            yield
+        finally:
+            timer.cancel()
+
+    def fail_fast_handler(self) -> EventHandler:
+        """Event handler cancelling the run as soon as a step (not an exit handler) ends in error"""
+
+        def _on_event(event: dict):
+            if event["type"] == STEP_FINISHED and event["status"] == "ERROR" and not event.get("exitHandler"):
+                if not self.cancelled:
+                    LOGGER.warning(T("csm-orc.orchestrator.core.run_control.fail_fast").format(step_id=event["stepId"]))
+                self.cancel(reason=event["stepId"])
+
+        return _on_event
+
+    @contextlib.contextmanager
+    def terminate_on_signals(
+        self,
+        *signals: int,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        grace_period: float = DEFAULT_GRACE_PERIOD,
+    ) -> Iterator[None]:
+        """Gracefully terminate the run when one of `signals` is received, forwarding it to the running steps.
+
+        Step commands run in their own process group and no longer get the signals sent to the orchestrator
+        (like Ctrl-C in a terminal or SIGTERM from Kubernetes), the handlers forward them.
+        Handlers can only be installed from the main thread, elsewhere this does nothing.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        def _handler(signum, frame):
+            self.terminate(signal.Signals(signum).name, signum, drain_timeout, grace_period)
+
+        previous = {sig: signal.signal(sig, _handler) for sig in signals}
+        try:
+            yield
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+
+RUN_CONTROL = RunControl()
@@ -0,0 +1,126 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Selection of the part of an orchestration file to run.
+
+Steps outside the selection are skipped, the outputs they would give to the selected steps are taken
+from the events of a previous run (see `read_step_outputs`).
+"""
+
+import json
+from dataclasses import dataclass
+from dataclasses import field
+
+from cosmotech.orchestrator.core.analysis import Predecessors
+from cosmotech.orchestrator.core.analysis import step_predecessors
+from cosmotech.orchestrator.core.analysis import successors_of
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.events import STEP_OUTPUT
+from cosmotech.orchestrator.core.events import STEP_STARTED
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.utils.logger import LOGGER
+from cosmotech.orchestrator.utils.translate import T
+
+# Statuses of the steps whose outputs can be reused, skipped steps may hand over outputs they reused themselves
+REUSABLE_STATUSES = ("SUCCESS", "SKIPPED_BY_USER", "UP_TO_DATE")
+
+
+def read_step_outputs(event_file: str) -> dict[str, dict[str, str]]:
+    """Outputs of each step in an event file written by `csm-orc run --event-file`.
+
+    Only the last execution of each step is kept, and only if it ended successfully.
+    Hidden outputs are never written to event files and cannot be reused.
+    """
+    outputs: dict[str, dict[str, str]] = dict()
+    with open(event_file) as _f:
+        for line in _f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if event.get("exitHandler"):
+                continue
+            step_id = event.get("stepId")
+            if event.get("type") == STEP_STARTED:
+                outputs[step_id] = dict()
+            elif event.get("type") == STEP_OUTPUT and "value" in event:
+                outputs.setdefault(step_id, dict())[event["output"]] = event["value"]
+            elif event.get("type") == STEP_FINISHED and event.get("status") not in REUSABLE_STATUSES:
+                outputs.pop(step_id, None)
+    return outputs
+
+
+def _closure(start: list[str], links: Predecessors) -> set[str]:
+    result = set(start)
+    pending = list(start)
+    while pending:
+        for linked in links[pending.pop()]:
+            if linked not in result:
+                result.add(linked)
+                pending.append(linked)
+    return result
+
+
+@dataclass
+class StepSelection:
+    """Steps to run: the `only` steps, plus the descendants of `from_steps` that are ancestors of `until_steps`"""
+
+    only: list[str] = field(default_factory=list)
+    from_steps: list[str] = field(default_factory=list)
+    until_steps: list[str] = field(default_factory=list)
+    previous_outputs: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.only or self.from_steps or self.until_steps)
+
+    def selected(self, predecessors: Predecessors) -> set[str]:
+        for step_id in [*self.only, *self.from_steps, *self.until_steps]:
+            if step_id not in predecessors:
+                raise ValueError(T("csm-orc.orchestrator.core.orchestrator.step_not_exists").format(step_id=step_id))
+        result = set(self.only)
+        if self.from_steps or self.until_steps:
+            closure = set(predecessors)
+            if self.from_steps:
+                closure &= _closure(self.from_steps, successors_of(predecessors))
+            if self.until_steps:
+                closure &= _closure(self.until_steps, predecessors)
+            result |= closure
+        return result
+
+    def apply(self, steps: dict[str, Step]) -> set[str]:
+        """Skip the steps outside the selection, giving them the outputs of the previous run.
+
+        Raises a ValueError if a selected step requires an output that neither a selected step nor the previous
+        run provides. Returns the selected step ids.
+        """
+        selected = self.selected(step_predecessors(steps))
+        for step_id, step in steps.items():
+            if step_id in selected:
+                continue
+            step.skipped = True
+            if step_id in self.previous_outputs:
+                step.captured_output = dict(self.previous_outputs[step_id])
+        missing = list()
+        for step_id in selected:
+            for input_name, input_config in steps[step_id].inputs.items():
+                source = input_config["stepId"]
+                if (
+                    source not in selected
+                    and input_config["output"] not in steps[source].captured_output
+                    and "defaultValue" not in input_config
+                    and not input_config.get("optional", False)
+                ):
+                    missing.append(f"{step_id}.{input_name} <- {source}.{input_config['output']}")
+        if missing:
+            raise ValueError(T("csm-orc.orchestrator.core.selection.missing_outputs").format(inputs=", ".join(missing)))
+        LOGGER.info(
+            T("csm-orc.orchestrator.core.selection.selected").format(
+                count=len(selected), total=len(steps), steps=", ".join(s for s in steps if s in selected)
+            )
+        )
+        return selected
@@ -4,6 +4,7 @@
 # Any use, reproduction, translation, broadcasting, transmission, distribution,
 # etc., to any person is prohibited unless it has been previously and
 # specifically authorized by written means by Cosmo Tech.
+import json
 import logging
 import os
 import pathlib
@@ -14,13 +15,27 @@ import threading
 from dataclasses import InitVar
 from dataclasses import dataclass
 from dataclasses import field
+from typing import Optional
 from typing import TextIO
 from typing import Union
 
 import sys
 
+from cosmotech.orchestrator.core.artifacts import ARTIFACT_STORE
 from cosmotech.orchestrator.core.command_template import CommandTemplate
+from cosmotech.orchestrator.core.environment import EnvironmentSnapshot
 from cosmotech.orchestrator.core.environment import EnvironmentVariable
+from cosmotech.orchestrator.core.environment import layered_environment
+from cosmotech.orchestrator.core.environment import snapshot_environment
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.events import STEP_OUTPUT
+from cosmotech.orchestrator.core.events import STEP_STARTED
+from cosmotech.orchestrator.core.executors import CommandResult
+from cosmotech.orchestrator.core.executors import PROCESS_EXECUTOR
+from cosmotech.orchestrator.core.executors import StepExecutor
+from cosmotech.orchestrator.core.run_control import RUN_CONTROL
+from cosmotech.orchestrator.core.up_to_date import UP_TO_DATE_STATE
 from cosmotech.orchestrator.templates.library import Library
 from cosmotech.orchestrator.utils.logger import LOGGER
 from cosmotech.orchestrator.utils.translate import T
@@ -37,9 +52,11 @@ class StepStatus(Enum):
     SKIPPED_AFTER_FAILURE = 4
     ERROR = 5
     DRY_RUN = 6
+    CANCELLED = 7
+    UP_TO_DATE = 8
 
 
-@dataclass
+@dataclass(slots=True)
 class Step:
     id: str = field()
     commandId: str = field(default=None)
@@ -51,10 +68,21 @@ class Step:
     useSystemEnvironment: bool = field(default=True)
     outputs: dict = field(default_factory=dict)
     inputs: dict = field(default_factory=dict)
+    expand: dict = field(default_factory=dict)
+    fileInputs: list[str] = field(default_factory=list)
+    fileOutputs: list[str] = field(default_factory=list)
+    expectedDuration: Optional[float] = field(default=None)
     captured_output: dict = field(default_factory=dict)
-    loaded = False
+    expansion_items: list = field(default_factory=list)
+    resources: dict = field(default_factory=dict)
+    duration: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+    loaded: bool = field(default=False, init=False, repr=False, compare=False)
     status: StepStatus = StepStatus.CREATED
-    skipped = False
+    skipped: bool = field(default=False, init=False, repr=False, compare=False)
+    display_id: str = field(default=None, init=False, repr=False, compare=False)
+    display_command_id: str = field(default=None, init=False, repr=False, compare=False)
+    processed_output_logger: logging.Logger = field(default=None, init=False, repr=False, compare=False)
+    env_snapshot: Optional[EnvironmentSnapshot] = field(default=None, init=False, repr=False, compare=False)
     stop_library_load: InitVar[bool] = field(default=False, repr=False)
 
     class OutputParser(threading.Thread):
@@ -80,11 +108,29 @@ class Step:
                     self.queue.put((self.is_stderr, line))
             self.stream.close()
 
+    def _poll_process(self, process: subprocess.Popen) -> Optional[int]:
+        """Same as `process.poll()`, also recording the resources used by the process once it is over"""
+        try:
+            pid, wait_status, usage = os.wait4(process.pid, os.WNOHANG)
+        except (TypeError, ChildProcessError):
+            # Process already reaped (or not a real child process), rely on Popen
+            return process.poll()
+        if not pid:
+            return None
+        process.returncode = os.waitstatus_to_exitcode(wait_status)
+        self.resources = {
+            "userTime": usage.ru_utime,
+            "systemTime": usage.ru_stime,
+            # ru_maxrss is given in kilobytes on Linux
+            "maxMemory": usage.ru_maxrss * 1024,
+        }
+        return process.returncode
+
     def _process_output_queue(self, output_queue: queue.Queue, process: subprocess.Popen) -> None:
         """Process output queue until subprocess completes"""
         while True:
             # Check if process has completed
-            if process.poll() is not None and output_queue.empty():
+            if self._poll_process(process) is not None and output_queue.empty():
                 break
 
             try:
@@ -107,7 +153,7 @@ class Step:
         self.display_command_id = self.commandId
         command: CommandTemplate = library.find_template_by_name(self.commandId)
         if command is None:
-            self.StepStatus = StepStatus.ERROR
+            self.status = StepStatus.ERROR
             LOGGER.error(
                 T("csm-orc.orchestrator.core.step.template_not_found").format(
                     step_id=self.display_id, command_id=self.display_command_id
@@ -121,14 +167,12 @@ class Step:
         )
         self.command = command.command
         self.arguments = command.arguments[:] + self.arguments
+        self.fileInputs = command.fileInputs[:] + self.fileInputs
+        self.fileOutputs = command.fileOutputs[:] + self.fileOutputs
         self.useSystemEnvironment = self.useSystemEnvironment or command.useSystemEnvironment
         if self.description is None:
             self.description = command.description
-        for _env_key, _env in command.environment.items():
-            if _env_key in self.environment:
-                self.environment[_env_key].join(_env)
-            else:
-                self.environment[_env_key] = _env
+        self.environment = layered_environment(self.environment, command.environment)
 
     def __post_init__(self, stop_library_load):
         if not bool(self.command) ^ bool(self.commandId):
@@ -143,6 +187,13 @@ class Step:
         if self.commandId and not stop_library_load:
             self.__load_command_from_library()
             self.commandId = None
+        if self.expand and not stop_library_load and Library().find_template_by_name(self.expand["commandId"]) is None:
+            self.status = StepStatus.ERROR
+            raise ValueError(
+                T("csm-orc.orchestrator.core.step.expand.template_not_found").format(
+                    step_id=self.id, command_id=self.expand["commandId"]
+                )
+            )
         self.loaded = True
         self.processed_output_logger = logging.getLogger("csm-orc.run.step.output_parser")
         if not self.processed_output_logger.hasHandlers():
@@ -162,32 +213,112 @@ class Step:
         if self.arguments:
             r["arguments"] = self.arguments
         if self.environment:
-            r["environment"] = self.environment
+            r["environment"] = dict(self.environment)
         if self.precedents:
             r["precedents"] = self.precedents
         if self.description:
             r["description"] = self.description
         if self.useSystemEnvironment:
             r["useSystemEnvironment"] = self.useSystemEnvironment
+        if self.fileInputs:
+            r["fileInputs"] = self.fileInputs
+        if self.fileOutputs:
+            r["fileOutputs"] = self.fileOutputs
+        if self.expectedDuration is not None:
+            r["expectedDuration"] = self.expectedDuration
         return r
 
+    def snapshot_env(self) -> EnvironmentSnapshot:
+        """Environment of the step, resolved on first use (when the run is planned) and reused afterwards"""
+        if self.env_snapshot is None:
+            self.env_snapshot = snapshot_environment(self.environment)
+        return self.env_snapshot
+
     def _effective_env(self):
-        _env = dict()
-        for k, v in self.environment.items():
-            _v = v.effective_value()
-            if _v is None:
-                if v.optional:
-                    continue
-                _v = ""
-            _env[k] = _v
-        # Special case for some standard env var (mostly the ones configured in the docker image by default)
-        # This avoids needing to add "useSystemEnvironment" in every/most steps
-        for env_name in ["PATH", "PYTHONPATH", "LD_LIBRARY_PATH", "SSL_CERT_DIR"]:
-            if env_name not in _env and os.environ.get(env_name):
-                _env[env_name] = os.environ.get(env_name)
-        return _env
-
-    def run(self, dry: bool = False, previous=None, input_data: dict = None, as_exit: bool = False):
+        # Copy of the snapshot, the runtime inputs are added to it
+        return dict(self.snapshot_env().values)
+
+    def run_command(self, environment: dict[str, str], as_exit: bool = False) -> CommandResult:
+        """Run the command in a bash subprocess, logging the lines it prints"""
+        if self.useSystemEnvironment:
+            environment = {**os.environ, **environment}
+        executable = pathlib.Path(sys.executable)
+        venv = executable.parent / "activate"
+        tmp_file = tempfile.NamedTemporaryFile("w", delete=False)
+        tmp_file_content = []
+        if venv.exists():
+            tmp_file_content.append(f"source {str(venv)}")
+        tmp_file_content.append(f"""{self.command} {" ".join(f'"{a}"' for a in self.arguments)}""")
+        tmp_file.write("\n".join(tmp_file_content))
+        LOGGER.debug(T("csm-orc.orchestrator.core.step.running_command").format(command=";".join(tmp_file_content)))
+        tmp_file.close()
+
+        # Start process with pipes
+        process = subprocess.Popen(
+            f"/bin/bash {tmp_file.name}",
+            shell=True,
+            env=environment,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,  # Line buffered
+            universal_newlines=True,
+            # Own process group, so that cancelling the run stops the whole command tree
+            start_new_session=True,
+        )
+        RUN_CONTROL.register(self.id, process, cancellable=not as_exit)
+
+        # Create queue for output processing
+        output_queue = queue.Queue()
+
+        # Start output parser threads
+        stdout_parser = self.OutputParser(process.stdout, output_queue, is_stderr=False)
+        stderr_parser = self.OutputParser(process.stderr, output_queue, is_stderr=True)
+
+        stdout_parser.start()
+        stderr_parser.start()
+
+        # Process output queue until completion
+        self._process_output_queue(output_queue, process)
+
+        # Wait for parser threads to complete
+        stdout_parser.join()
+        stderr_parser.join()
+
+        # Clean up temporary file
+        os.remove(tmp_file.name)
+
+        # Get return code
+        return_code = process.wait()
+        RUN_CONTROL.unregister(self.id)
+        return CommandResult(return_code, stdout_parser.outputs, self.resources, RUN_CONTROL.was_signalled(self.id))
+
+    def run(
+        self,
+        dry: bool = False,
+        previous=None,
+        input_data: dict = None,
+        as_exit: bool = False,
+        executor: Optional[StepExecutor] = None,
+    ):
+        if executor is None:
+            executor = PROCESS_EXECUTOR
+        _start = executor.clock()
+        try:
+            return self._run(dry, previous, input_data, as_exit, executor)
+        finally:
+            self.duration = executor.clock() - _start
+            EVENT_BUS.emit(
+                STEP_FINISHED,
+                stepId=self.id,
+                commandId=self.display_command_id,
+                exitHandler=as_exit,
+                status=self.status.name,
+                duration=self.duration,
+                resources=self.resources,
+            )
+
+    def _run(self, dry: bool, previous, input_data: dict, as_exit: bool, executor: StepExecutor):
         if previous is None:
             previous = dict()
         if input_data is None:
@@ -201,7 +332,8 @@ class Step:
 
         if isinstance(previous, dict) and any(
             map(
-                lambda a: a not in [StepStatus.SUCCESS, StepStatus.DRY_RUN, StepStatus.SKIPPED_BY_USER],
+                lambda a: a
+                not in [StepStatus.SUCCESS, StepStatus.DRY_RUN, StepStatus.SKIPPED_BY_USER, StepStatus.UP_TO_DATE],
                 previous.values(),
             )
         ):
@@ -220,8 +352,16 @@ class Step:
                     )
                 )
                 self.status = StepStatus.SKIPPED_BY_USER
+                # Outputs reused from a previous run are handed over like captured ones
+                for output_name, value in self.captured_output.items():
+                    EVENT_BUS.emit(STEP_OUTPUT, stepId=self.id, output=output_name, value=value, reused=True)
             elif dry:
                 self.status = StepStatus.DRY_RUN
+            elif RUN_CONTROL.cancelled and not as_exit:
+                LOGGER.warning(
+                    T("csm-orc.orchestrator.core.step.cancelled").format(step_type=step_type, step_id=self.display_id)
+                )
+                self.status = StepStatus.CANCELLED
             else:
                 # Set up environment with input data
                 _e = self._effective_env()
@@ -251,60 +391,37 @@ class Step:
                             )
                         )
 
-                if self.useSystemEnvironment:
-                    _e = {**os.environ, **_e}
-
-                try:
-                    executable = pathlib.Path(sys.executable)
-                    venv = executable.parent / "activate"
-                    tmp_file = tempfile.NamedTemporaryFile("w", delete=False)
-                    tmp_file_content = []
-                    if venv.exists():
-                        tmp_file_content.append(f"source {str(venv)}")
-                    tmp_file_content.append(f"""{self.command} {" ".join(f'"{a}"' for a in self.arguments)}""")
-                    tmp_file.write("\n".join(tmp_file_content))
-                    LOGGER.debug(
-                        T("csm-orc.orchestrator.core.step.running_command").format(command=";".join(tmp_file_content))
-                    )
-                    tmp_file.close()
-
-                    # Start process with pipes
-                    process = subprocess.Popen(
-                        f"/bin/bash {tmp_file.name}",
-                        shell=True,
-                        env=_e,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        bufsize=1,  # Line buffered
-                        universal_newlines=True,
+                if UP_TO_DATE_STATE.is_up_to_date(self, _e):
+                    LOGGER.info(
+                        T("csm-orc.orchestrator.core.step.up_to_date").format(
+                            step_type=step_type, step_id=self.display_id
+                        )
                     )
+                    self.status = StepStatus.UP_TO_DATE
+                    for output_name, value in self.captured_output.items():
+                        EVENT_BUS.emit(STEP_OUTPUT, stepId=self.id, output=output_name, value=value, reused=True)
+                    return self.status
 
-                    # Create queue for output processing
-                    output_queue = queue.Queue()
-
-                    # Start output parser threads
-                    stdout_parser = self.OutputParser(process.stdout, output_queue, is_stderr=False)
-                    stderr_parser = self.OutputParser(process.stderr, output_queue, is_stderr=True)
-
-                    stdout_parser.start()
-                    stderr_parser.start()
-
-                    # Process output queue until completion
-                    self._process_output_queue(output_queue, process)
-
-                    # Wait for parser threads to complete
-                    stdout_parser.join()
-                    stderr_parser.join()
+                if ARTIFACT_STORE.enabled and self.fileOutputs:
+                    # Writing to a file linked to the artifact store would modify the stored object
+                    ARTIFACT_STORE.unlink_shared(UP_TO_DATE_STATE.file_outputs(self, _e))
 
-                    # Clean up temporary file
-                    os.remove(tmp_file.name)
+                EVENT_BUS.emit(STEP_STARTED, stepId=self.id, exitHandler=as_exit)
+                try:
+                    result = executor.execute(self, _e, as_exit)
+                    self.resources = result.resources
 
-                    # Get return code
-                    return_code = process.wait()
+                    if result.return_code != 0 and not as_exit and result.signalled:
+                        LOGGER.warning(
+                            T("csm-orc.orchestrator.core.step.cancelled").format(
+                                step_type=step_type, step_id=self.display_id
+                            )
+                        )
+                        self.status = StepStatus.CANCELLED
+                        return self.status
 
-                    if return_code != 0:
-                        raise subprocess.CalledProcessError(return_code, self.command)
+                    if result.return_code != 0:
+                        raise subprocess.CalledProcessError(result.return_code, self.command)
 
                     # Get captured outputs
                     self.captured_output = {}
@@ -327,7 +444,7 @@ class Step:
                                 )
 
                     # Then override with actual outputs
-                    self.captured_output.update(stdout_parser.outputs)
+                    self.captured_output.update(result.outputs)
 
                     # Log all final output values
                     LOGGER.debug(
@@ -335,10 +452,12 @@ class Step:
                     )
                     for output_name, value in self.captured_output.items():
                         if output_name in self.outputs and self.outputs[output_name].get("hidden", False):
+                            EVENT_BUS.emit(STEP_OUTPUT, stepId=self.id, output=output_name, hidden=True)
                             LOGGER.debug(
                                 T("csm-orc.orchestrator.core.step.output.captured_hidden").format(output=output_name)
                             )
                         else:
+                            EVENT_BUS.emit(STEP_OUTPUT, stepId=self.id, output=output_name, value=value)
                             LOGGER.debug(
                                 T("csm-orc.orchestrator.core.step.output.captured_value").format(
                                     output=output_name, value=value
@@ -367,12 +486,20 @@ class Step:
                             )
                         )
 
+                    if self.expand and not self._read_expansion_items():
+                        self.status = StepStatus.ERROR
+                        return self.status
+
                     LOGGER.info(
                         T("csm-orc.orchestrator.core.step.done_running").format(
                             step_type=step_type, step_id=self.display_id
                         )
                     )
                     self.status = StepStatus.SUCCESS
+                    _output_hashes = None
+                    if ARTIFACT_STORE.enabled and self.fileOutputs:
+                        _output_hashes = ARTIFACT_STORE.ingest(UP_TO_DATE_STATE.file_outputs(self, _e))
+                    UP_TO_DATE_STATE.record(self, _e, _output_hashes)
 
                 except subprocess.CalledProcessError as e:
                     LOGGER.error(
@@ -385,13 +512,27 @@ class Step:
 
         return self.status
 
+    def _read_expansion_items(self) -> bool:
+        """Read the JSON list of items to expand the step into from its expansion output"""
+        value = self.captured_output.get(self.expand["output"])
+        try:
+            items = json.loads(value) if value is not None else None
+        except json.JSONDecodeError:
+            items = None
+        if not isinstance(items, list):
+            LOGGER.error(
+                T("csm-orc.orchestrator.core.step.expand.invalid_items").format(
+                    step_id=self.id, output=self.expand["output"]
+                )
+            )
+            return False
+        self.expansion_items = items
+        return True
+
     def check_env(self):
-        r = dict()
-        if not self.skipped:
-            for k, v in self.environment.items():
-                if v.effective_value() is None and v.is_required():
-                    r[k] = v.description
-        return r
+        if self.skipped:
+            return dict()
+        return dict(self.snapshot_env().missing)
 
     def simple_repr(self):
         if self.description:
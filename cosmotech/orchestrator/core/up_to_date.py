@@ -0,0 +1,147 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Make-style up-to-date checks of the steps declaring the files they read and write.
+
+Once a step declaring `fileOutputs` succeeds, a state file records the signature of its command and environment,
+the content hash of its file inputs and outputs and its captured outputs.
+In a later run the step is skipped when its signature did not change, its input patterns match the recorded files,
+all its file outputs exist and they are either newer than all its file inputs or identical (content hash)
+to the recorded ones, with unchanged inputs.
+Missing file outputs are restored from the artifact store, when one is used and still holds them.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pathlib
+import string
+import threading
+from typing import Optional
+
+from cosmotech.orchestrator.core.artifacts import ARTIFACT_STORE
+from cosmotech.orchestrator.core.artifacts import file_digest
+from cosmotech.orchestrator.core.environment import SYSTEM_VARIABLES
+
+
+def expand_patterns(patterns: list[str], environment: dict[str, str]) -> list[str]:
+    """Files matching glob patterns, after replacing the environment variables ($NAME or ${NAME}) they contain"""
+    result = set()
+    for pattern in patterns:
+        result.update(glob.glob(string.Template(pattern).safe_substitute(environment), recursive=True))
+    return sorted(path for path in result if os.path.isfile(path))
+
+
+def content_hashes(paths: list[str]) -> dict[str, str]:
+    return {path: file_digest(path) for path in paths}
+
+
+def step_signature(step, environment: dict[str, str]) -> str:
+    """Hash of what a step runs: its command, arguments, environment and file patterns.
+
+    The system variables added to every step do not define what a step does, they are left out.
+    """
+    content = {
+        "command": step.command,
+        "arguments": step.arguments,
+        "environment": {k: v for k, v in environment.items() if k not in SYSTEM_VARIABLES},
+        "fileInputs": step.fileInputs,
+        "fileOutputs": step.fileOutputs,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+class UpToDateState:
+    """Records of the steps with file outputs, read from and written to a JSON state file"""
+
+    def __init__(self):
+        self.path: Optional[pathlib.Path] = None
+        self.records: dict[str, dict] = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def open(self, path: str):
+        self.path = pathlib.Path(path)
+        try:
+            self.records = json.loads(self.path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.records = dict()
+
+    def close(self):
+        """Write the records (atomically) and stop checking steps"""
+        if self.path is None:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_path.write_text(json.dumps(self.records, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.path)
+            self.path = None
+            self.records = dict()
+
+    @staticmethod
+    def file_inputs(step, environment: dict[str, str]) -> list[str]:
+        return expand_patterns(step.fileInputs, {**os.environ, **environment})
+
+    @staticmethod
+    def file_outputs(step, environment: dict[str, str]) -> list[str]:
+        return expand_patterns(step.fileOutputs, {**os.environ, **environment})
+
+    def is_up_to_date(self, step, environment: dict[str, str]) -> bool:
+        """Whether the step can be skipped, its captured outputs are then restored from the record"""
+        if not self.enabled or not step.fileOutputs:
+            return False
+        with self._lock:
+            record = self.records.get(step.id)
+        if record is None or record["signature"] != step_signature(step, environment):
+            return False
+        outputs = self.file_outputs(step, environment)
+        missing = {path: digest for path, digest in record["outputs"].items() if path not in outputs}
+        if missing and ARTIFACT_STORE.restore(missing):
+            outputs = sorted(outputs + list(missing))
+        if sorted(record["outputs"]) != outputs:
+            # Missing (or new) file outputs
+            return False
+        inputs = self.file_inputs(step, environment)
+        if sorted(record["inputs"]) != inputs:
+            # Input patterns matching other files, whatever their modification time
+            return False
+        newest_input = max((os.path.getmtime(p) for p in inputs), default=None)
+        oldest_output = min(os.path.getmtime(p) for p in outputs)
+        if newest_input is not None and oldest_output < newest_input:
+            # Inputs touched since: still up to date if no input nor output content changed
+            if content_hashes(inputs) != record["inputs"] or content_hashes(outputs) != record["outputs"]:
+                return False
+        step.captured_output = dict(record["capturedOutput"])
+        return True
+
+    def record(self, step, environment: dict[str, str], output_hashes: Optional[dict[str, str]] = None):
+        """Remember a step that just succeeded, `output_hashes` saves hashing its file outputs again"""
+        if not self.enabled or not step.fileOutputs:
+            return
+        inputs, outputs = self.file_inputs(step, environment), self.file_outputs(step, environment)
+        hidden = {name for name, config in step.outputs.items() if config.get("hidden", False)}
+        record = {
+            "signature": step_signature(step, environment),
+            "inputs": content_hashes(inputs),
+            "outputs": output_hashes if output_hashes is not None else content_hashes(outputs),
+            "capturedOutput": {k: v for k, v in step.captured_output.items() if k not in hidden},
+        }
+        with self._lock:
+            if hidden or not outputs:
+                # Hidden outputs are never stored, such a step always runs (as does one without any file output)
+                self.records.pop(step.id, None)
+            else:
+                self.records[step.id] = record
+
+
+UP_TO_DATE_STATE = UpToDateState()
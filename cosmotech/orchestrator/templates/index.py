@@ -0,0 +1,101 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+import bisect
+import re
+from typing import Iterable
+from typing import Optional
+
+from cosmotech.orchestrator.core.command_template import CommandTemplate
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _tokens(text: Optional[str]) -> set[str]:
+    """Lowercase words of a text, identifiers like `CSM_DATA_PATH` give both the whole name and its parts"""
+    if not text:
+        return set()
+    result = set()
+    for word in text.lower().split():
+        result.add(word)
+        result.update(t for t in _TOKEN_SPLIT.split(word) if t)
+    return result
+
+
+def sort_key(template: CommandTemplate) -> tuple[str, str]:
+    return template.sourcePlugin or "", template.id
+
+
+class TemplateIndex:
+    """Read-only index of a set of templates, built once and queried many times.
+
+    Templates are kept sorted by source plugin then id, each template is found by its position in that order.
+    Search goes through an inverted index of the words of the ids, descriptions and environment variable names,
+    stored as a sorted vocabulary so that a search term matches every word it is a prefix of.
+    """
+
+    def __init__(self, templates: Iterable[CommandTemplate]):
+        self.templates: list[CommandTemplate] = sorted(templates, key=sort_key)
+        self._keys: list[tuple[str, str]] = [sort_key(t) for t in self.templates]
+        self._by_plugin: dict[str, list[int]] = dict()
+        postings: dict[str, set[int]] = dict()
+        for position, template in enumerate(self.templates):
+            self._by_plugin.setdefault(template.sourcePlugin or "", list()).append(position)
+            words = _tokens(template.id) | _tokens(template.description)
+            for env_name in template.environment:
+                words |= _tokens(env_name)
+            for word in words:
+                postings.setdefault(word, set()).add(position)
+        self._vocabulary: list[str] = sorted(postings)
+        self._postings: list[set[int]] = [postings[word] for word in self._vocabulary]
+
+    def __len__(self):
+        return len(self.templates)
+
+    def _matching(self, term: str) -> set[int]:
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff", lo=start)
+        result = set()
+        for postings in self._postings[start:end]:
+            result |= postings
+        return result
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        source_plugin: Optional[str] = None,
+        after: Optional[tuple[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[list[CommandTemplate], bool]:
+        """Get the templates matching every word of `query` (as prefix) from `source_plugin`, in index order.
+
+        `after` is the sort key (see `sort_key`) of the last template of the previous page.
+        Returns the page of templates and whether more templates follow it.
+        """
+        start = 0 if after is None else bisect.bisect_right(self._keys, tuple(after))
+        terms = _tokens(query) if query else set()
+        if terms:
+            matching = None
+            for term in sorted(terms, key=len, reverse=True):
+                _positions = self._matching(term)
+                matching = _positions if matching is None else matching & _positions
+                if not matching:
+                    return [], False
+            positions = sorted(
+                p for p in matching if p >= start and (source_plugin is None or self._keys[p][0] == source_plugin)
+            )
+        elif source_plugin is not None:
+            _plugin_positions = self._by_plugin.get(source_plugin, [])
+            positions = _plugin_positions[bisect.bisect_left(_plugin_positions, start) :]
+        else:
+            positions = range(start, len(self.templates))
+        page = list()
+        for position in positions:
+            if limit is not None and len(page) == limit:
+                return page, True
+            page.append(self.templates[position])
+        return page, False
@@ -10,12 +10,15 @@ import os
 import pathlib
 import pkgutil
 import pprint
+import threading
+import time
 from typing import Optional
 
 import sys
 
 import cosmotech.orchestrator_plugins
 from cosmotech.orchestrator.core.command_template import CommandTemplate
+from cosmotech.orchestrator.templates.index import TemplateIndex
 from cosmotech.orchestrator.templates.plugin import Plugin
 from cosmotech.orchestrator.utils.logger import LOGGER
 from cosmotech.orchestrator.utils.translate import T
@@ -26,6 +29,10 @@ class Library:
     __templates = None
     __plugins = None
     __exit_templates = None
+    __index = None
+    __generation = 0
+    __refreshed_at = None
+    __refresh_lock = threading.Lock()
 
     def display_library(self, log_function=LOGGER.info, verbose=False):
         log_function(T("csm-orc.orchestrator.library.content"))
@@ -56,9 +63,21 @@ class Library:
             return
         self.display_template(tpl, log_function=LOGGER.info, verbose=verbose)
 
+    @property
+    def index(self) -> TemplateIndex:
+        """Search index of the templates, built on first use after each change of the library"""
+        if self.__index is None or self.__index[0] is not self.__templates:
+            self.__index = (self.__templates, TemplateIndex(self.__templates.values()))
+        return self.__index[1]
+
+    @property
+    def generation(self) -> int:
+        """Increased on every change of the templates, lets callers cache what they derive from them"""
+        return self.__generation
+
     @property
     def templates(self) -> list[CommandTemplate]:
-        return list(sorted(self.__templates.values(), key=lambda t: t.sourcePlugin))
+        return list(self.index.templates)
 
     def find_template_by_name(self, template_id) -> Optional[CommandTemplate]:
         return self.__templates.get(template_id)
@@ -75,6 +94,8 @@ class Library:
             T("csm-orc.orchestrator.library.plugin.template_count").format(count=len(plugin.templates.values()))
         )
         self.__templates.update(plugin.templates)
+        self.__index = None
+        self.__generation += 1
         for command in plugin.exit_commands:
             if command not in self.__exit_templates:
                 self.__exit_templates.append(command)
@@ -90,6 +111,8 @@ class Library:
         else:
             LOGGER.debug(T("csm-orc.orchestrator.library.loading"))
         self.__templates = dict()
+        self.__index = None
+        self.__generation += 1
         self.__plugins = dict()
         self.__exit_templates = list()
 
@@ -102,9 +125,56 @@ class Library:
                 if isinstance(_plug, Plugin):
                     self.load_plugin(_plug, plugin_module=_mod)
 
+    def refresh(self, min_interval: float = 0) -> bool:
+        """
+        Re-read the template files of the plugins that got added, modified or removed since they were loaded,
+        checking at most once every `min_interval` seconds.
+        Only the changed files are parsed again, the lookup structures are then rebuilt aside and swapped,
+        so concurrent readers see either the previous or the new library, never a partially loaded one.
+        Returns True if the library changed
+        """
+        with self.__refresh_lock:
+            now = time.monotonic()
+            if self.__refreshed_at is not None and now - self.__refreshed_at < min_interval:
+                return False
+            self.__refreshed_at = now
+            plugins = list(self.__plugins.values())
+            owned = {id(t) for _plugin in plugins for t in _plugin.templates.values()}
+            extra_templates = {k: v for k, v in self.__templates.items() if id(v) not in owned}
+            changed_library = False
+            for _plugin in plugins:
+                changed, removed = _plugin.changed_files()
+                if not changed and not removed:
+                    continue
+                LOGGER.debug(
+                    T("csm-orc.orchestrator.library.refreshed").format(
+                        changed=len(changed), removed=len(removed), name=_plugin.name
+                    )
+                )
+                for _path in changed + removed:
+                    _plugin.forget_file(_path)
+                _plugin.load_folder(_plugin.folder, files=changed)
+                changed_library = True
+            if not changed_library:
+                return False
+            templates = dict()
+            exit_templates = list()
+            for _plugin in plugins:
+                templates.update(_plugin.templates)
+                for command in _plugin.exit_commands:
+                    if command not in exit_templates:
+                        exit_templates.append(command)
+            templates.update(extra_templates)
+            self.__exit_templates = exit_templates
+            self.__templates = templates
+            self.__generation += 1
+            return True
+
     def add_template(self, template: CommandTemplate, override: bool = False):
         if override or template.id not in self.__templates:
             self.__templates[template.id] = template
+            self.__index = None
+            self.__generation += 1
 
     def list_exit_commands(self) -> list[str]:
         return self.__exit_templates
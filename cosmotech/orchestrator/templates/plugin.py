@@ -7,16 +7,29 @@
 
 import json
 import pathlib
+from typing import Iterable
+from typing import Optional
 
 from cosmotech.orchestrator.core.command_template import CommandTemplate
 
 
+def _file_key(path: pathlib.Path) -> Optional[tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 class Plugin:
     def __init__(self, __file: str):
         self.name: str = pathlib.Path(__file).parent.name
 
         self.templates: dict[str, CommandTemplate] = dict()
         self.exit_commands: list[str] = list()
+        # Folder given to `load_folder`, and for each template file read: its (mtime, size) and the template ids
+        self.folder: Optional[pathlib.Path] = None
+        self.files: dict[pathlib.Path, tuple[Optional[tuple[int, int]], list[str]]] = dict()
 
     def __register_template(self, template_name: str, template: CommandTemplate):
         template.sourcePlugin = self.name
@@ -36,10 +49,15 @@ class Plugin:
             return False
         return _template
 
-    def load_folder(self, plugin_folder: pathlib.Path):
+    def load_folder(self, plugin_folder: pathlib.Path, files: Optional[Iterable[pathlib.Path]] = None):
+        """Read the templates of the `templates` folder of the plugin, or only the given `files` of that folder"""
+        self.folder = plugin_folder
         count = 0
-        for _path in plugin_folder.glob("templates/**/*.json"):
+        for _path in plugin_folder.glob("templates/**/*.json") if files is None else files:
             if _path.is_file():
+                # Files are recorded even when invalid, so that they are only read again once modified
+                _file_templates = list()
+                self.files[_path] = (_file_key(_path), _file_templates)
                 with _path.open("r") as _file:
                     try:
                         _file_content = json.load(_file)
@@ -59,6 +77,7 @@ class Plugin:
                             self.__register_template(_template_name, _template)
                             if is_exit_command:
                                 self.__register_exit_command(_template_name)
+                            _file_templates.append(_template_name)
                             return 1
 
                         if _templates := _file_content.get("commandTemplates", []):
@@ -67,3 +86,20 @@ class Plugin:
                         else:
                             count += _read(_file_content, is_exit_command)
         return count
+
+    def forget_file(self, path: pathlib.Path):
+        """Unregister the templates read from a template file"""
+        _, _template_names = self.files.pop(path, (None, []))
+        for _template_name in _template_names:
+            self.templates.pop(_template_name, None)
+            if _template_name in self.exit_commands:
+                self.exit_commands.remove(_template_name)
+
+    def changed_files(self) -> tuple[list[pathlib.Path], list[pathlib.Path]]:
+        """Compare the template files of the plugin folder with the ones read, returns (new or modified, removed)"""
+        if self.folder is None:
+            return [], []
+        current = {_path: _file_key(_path) for _path in self.folder.glob("templates/**/*.json") if _path.is_file()}
+        changed = [_path for _path, _key in current.items() if _path not in self.files or self.files[_path][0] != _key]
+        removed = [_path for _path in self.files if _path not in current]
+        return changed, removed
@@ -12,7 +12,6 @@ import {
   useEdgesState,
   useReactFlow,
 } from '@xyflow/react';
-import Dagre from '@dagrejs/dagre';
 import '@xyflow/react/dist/style.css';
 import MEME_GIFS from './memeList.json';
 const MEME_SET = new Set(MEME_GIFS);
@@ -98,48 +97,18 @@ function FallingEggs() {
   );
 }
 
-const NODE_WIDTH = 172;
-const NODE_HEIGHT = 36;
-
-function getLayoutedElements(nodes, edges) {
-  const g = new Dagre.graphlib.Graph().setDefaultEdgeLabel(() => ({}));
-  g.setGraph({ rankdir: 'TB', nodesep: 50, ranksep: 80 });
-
-  nodes.forEach((node) => {
-    g.setNode(node.id, { width: NODE_WIDTH, height: NODE_HEIGHT });
-  });
-
-  edges.forEach((edge) => {
-    g.setEdge(edge.source, edge.target);
-  });
-
-  Dagre.layout(g);
-
-  const layoutedNodes = nodes.map((node) => {
-    const pos = g.node(node.id);
-    return {
-      ...node,
-      position: {
-        x: pos.x - NODE_WIDTH / 2,
-        y: pos.y - NODE_HEIGHT / 2,
-      },
-    };
-  });
-
-  return { nodes: layoutedNodes, edges };
-}
-
-function stepsToNodes(steps) {
-  return steps.map((stepId) => ({
-    id: stepId,
-    type: MEME_SET.has(stepId) ? 'meme' : undefined,
-    data: { label: stepId },
-    position: { x: 0, y: 0 },
+// Nodes come positioned by the layered layout computed by the API
+function graphNodesToNodes(graphNodes) {
+  return graphNodes.map(({ id, position }) => ({
+    id,
+    type: MEME_SET.has(id) ? 'meme' : undefined,
+    data: { label: id },
+    position,
   }));
 }
 
-function linksToEdges(links) {
-  return links.map(([source, target], index) => ({
+function graphEdgesToEdges(graphEdges) {
+  return graphEdges.map(({ source, target }, index) => ({
     id: `e${index}-${source}-${target}`,
     source,
     target,
@@ -190,16 +159,32 @@ function TemplatesPanel({ onClose, projectName, onStepCreated, onSelectStep }) {
       });
   };
 
-  useEffect(() => {
-    fetch('/template/list')
+  const [query, setQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+
+  // Templates come as pages of summaries, `cursor` continues the current search
+  const fetchTemplates = useCallback((search, cursor) => {
+    const params = new URLSearchParams({ limit: '100' });
+    if (search) params.set('q', search);
+    if (cursor) params.set('cursor', cursor);
+    return fetch(`/template/search?${params}`)
       .then((res) => {
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
         return res.json();
       })
-      .then((data) => { setTemplates(data); setLoading(false); })
+      .then((data) => {
+        setTemplates((prev) => (cursor ? [...prev, ...data.items] : data.items));
+        setNextCursor(data.nextCursor);
+        setLoading(false);
+      })
       .catch((err) => { setError(err.message); setLoading(false); });
   }, []);
 
+  useEffect(() => {
+    const timer = setTimeout(() => fetchTemplates(query.trim(), null), 200);
+    return () => clearTimeout(timer);
+  }, [query, fetchTemplates]);
+
   useEffect(() => {
     if (!selectedId) { setDetail(null); return; }
     setDetailLoading(true);
@@ -216,10 +201,17 @@ function TemplatesPanel({ onClose, projectName, onStepCreated, onSelectStep }) {
     <>
       {loading && <p className="status">Loading…</p>}
       {error && <p className="status error">{error}</p>}
+      <input
+        type="search"
+        className="edit-input"
+        placeholder="Search templates…"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+      />
       {!loading && templates.length === 0 && <p className="status">No templates available.</p>}
       {!loading && templates.length > 0 && (
         <div className="template-list">
-          {templates.map((id) => (
+          {templates.map(({ id, description }) => (
             <button
               key={id}
               className="template-list-item"
@@ -229,11 +221,17 @@ function TemplatesPanel({ onClose, projectName, onStepCreated, onSelectStep }) {
                 e.dataTransfer.effectAllowed = 'copy';
               }}
               onClick={() => setSelectedId(id)}
+              title={description || undefined}
             >
               <span className="mono">{id}</span>
               <span className="drag-hint">⠿</span>
             </button>
           ))}
+          {nextCursor && (
+            <button className="panel-btn" onClick={() => fetchTemplates(query.trim(), nextCursor)}>
+              Load more…
+            </button>
+          )}
         </div>
       )}
     </>
@@ -1330,28 +1328,16 @@ function GraphViewInner({ projectName }) {
         setError(null);
       }
 
-      Promise.all([
-        fetch(`/project/${projectName}/steps`).then((res) => {
-          if (!res.ok) throw new Error(`Steps: HTTP ${res.status}`);
-          return res.json();
-        }),
-        fetch(`/project/${projectName}/links`).then((res) => {
-          if (!res.ok) throw new Error(`Links: HTTP ${res.status}`);
-          return res.json();
-        }),
-        fetch(`/project/${projectName}/outputs`).then((res) => {
-          if (!res.ok) throw new Error(`Outputs: HTTP ${res.status}`);
+      // The browser revalidates with the ETag, an unchanged project costs a 304
+      fetch(`/project/${projectName}/graph`)
+        .then((res) => {
+          if (!res.ok) throw new Error(`Graph: HTTP ${res.status}`);
           return res.json();
-        }),
-      ])
-        .then(([steps, links, outputs]) => {
-          const rawNodes = stepsToNodes(steps);
-          const rawEdges = linksToEdges(links);
-          const { nodes: layoutedNodes, edges: layoutedEdges } =
-            getLayoutedElements(rawNodes, rawEdges);
-          setNodes(layoutedNodes);
-          setEdges(layoutedEdges);
-          setStepOutputs(outputs);
+        })
+        .then((graph) => {
+          setNodes(graphNodesToNodes(graph.nodes));
+          setEdges(graphEdgesToEdges(graph.edges));
+          setStepOutputs(graph.outputs);
           setLoading(false);
         })
         .catch((err) => {
@@ -1525,22 +1511,29 @@ function GraphViewInner({ projectName }) {
   // Track per-step run status from log analysis
   const [stepStatuses, setStepStatuses] = useState({}); // stepId -> 'running' | 'success' | 'error' | 'skipped'
 
-  const parseLogForStepStatus = useCallback((logText) => {
-    // Patterns matching orchestrator log output (log lines have timestamp+level prefix)
-    const patterns = [
-      { regex: /Starting (?:step|exit handler) (.+)/, status: 'running' },
-      { regex: /Done running (?:step|exit handler) (.+)/, status: 'success' },
-      { regex: /Error during (?:step|exit handler) (.+)/, status: 'error' },
-      { regex: /Skipping (?:step|exit handler) (.+?) due to previous errors/, status: 'skipped' },
-      { regex: /Skipping (?:step|exit handler) (.+?) as required/, status: 'skipped' },
-    ];
-    for (const { regex, status } of patterns) {
-      const match = logText.match(regex);
-      if (match) {
-        const stepId = match[1].trim();
-        setStepStatuses((prev) => ({ ...prev, [stepId]: status }));
-        return;
-      }
+  const stepEventStatuses = {
+    SUCCESS: 'success',
+    DRY_RUN: 'success',
+    ERROR: 'error',
+    SKIPPED_BY_USER: 'skipped',
+    SKIPPED_AFTER_FAILURE: 'skipped',
+    CANCELLED: 'skipped',
+    UP_TO_DATE: 'skipped',
+  };
+
+  const handleRunEvent = useCallback((evt) => {
+    if (evt.type === 'step_started') {
+      setStepStatuses((prev) => ({ ...prev, [evt.stepId]: 'running' }));
+    } else if (evt.type === 'step_finished') {
+      setStepStatuses((prev) => ({ ...prev, [evt.stepId]: stepEventStatuses[evt.status] || 'error' }));
+    } else if (evt.type === 'exit') {
+      setRunExitCode(evt.code);
+      setRunStatus(evt.code === 0 ? 'success' : 'error');
+      setRunning(false);
+    } else if (evt.type === 'error') {
+      setRunLogs((prev) => [...prev, `ERROR: ${evt.text}`]);
+      setRunStatus('error');
+      setRunning(false);
     }
   }, []);
 
@@ -1663,22 +1656,18 @@ function GraphViewInner({ projectName }) {
           const parts = buffer.split('\n\n');
           buffer = parts.pop(); // keep incomplete chunk
           for (const part of parts) {
-            const line = part.replace(/^data: /, '');
-            if (!line) continue;
+            // Each frame is an "id:" line followed by a "data:" line holding a batch of events
+            const dataLine = part.split('\n').find((l) => l.startsWith('data: '));
+            if (!dataLine) continue;
             try {
-              const evt = JSON.parse(line);
-              if (evt.type === 'log') {
-                setRunLogs((prev) => [...prev, evt.text]);
-                parseLogForStepStatus(evt.text);
-              } else if (evt.type === 'exit') {
-                setRunExitCode(evt.code);
-                setRunStatus(evt.code === 0 ? 'success' : 'error');
-                setRunning(false);
-              } else if (evt.type === 'error') {
-                setRunLogs((prev) => [...prev, `ERROR: ${evt.text}`]);
-                setRunStatus('error');
-                setRunning(false);
+              const evt = JSON.parse(dataLine.slice('data: '.length));
+              const events = evt.type === 'batch' ? evt.events : [evt];
+              const logs = [];
+              for (const e of events) {
+                if (e.type === 'log') logs.push(e.text);
+                else handleRunEvent(e);
               }
+              if (logs.length) setRunLogs((prev) => [...prev, ...logs]);
             } catch { /* ignore parse errors */ }
           }
           return reader.read().then(processChunk);
@@ -0,0 +1,224 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Latency and throughput of the Visual Orchestrator API.
+
+Runs the FastAPI app in process (no server, no network) in a temporary working directory and generates one project
+per `--sizes` entry (10 to 5 000 steps by default). For each project, `--concurrency` clients send `--requests`
+requests picked from a mix: project list, graph reads (half of them revalidating the ETag they got), step reads,
+step edits, link adds and runs streamed to their end. Runs are simulated (`csm-orc run --simulate`), so they
+exercise the run manager and the event stream rather than the steps, and are left out when `csm-orc` is not
+installed. Reports the latency percentiles and the throughput of each endpoint as JSON.
+
+    python scripts/benchmark_api.py --sizes 10,100,1000,5000 --concurrency 8 --requests 2000 --output api.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from cosmotech.orchestrator.core.history import percentile
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+DEFAULT_MIX = {"list": 5, "graph": 30, "step_read": 25, "step_edit": 20, "link_add": 15, "run": 5}
+
+
+def generate_project(path: pathlib.Path, steps: int, seed: int):
+    """A project of `steps` steps, each one waiting for up to 2 of the 20 steps before it"""
+    draw = random.Random(seed)
+    content = {
+        "steps": [
+            {
+                "id": f"step-{s}",
+                "command": "echo",
+                "arguments": [str(s)],
+                "description": f"Step {s} of the benchmark",
+                "environment": {"STEP_INDEX": {"value": str(s)}, "SHARED": {"defaultValue": "shared"}},
+                "outputs": {"result": {"description": "Result of the step", "optional": True}},
+                "precedents": [f"step-{p}" for p in draw.sample(range(max(0, s - 20), s), min(s, draw.randint(0, 2)))],
+            }
+            for s in range(steps)
+        ]
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(content, indent=4))
+
+
+class Client:
+    """One simulated user of a project, remembering the graph ETag it got like a browser would"""
+
+    def __init__(self, http: httpx.AsyncClient, project: str, steps: int, simulation: str, draw: random.Random):
+        self.http = http
+        self.project = project
+        self.steps = steps
+        self.simulation = simulation
+        self.draw = draw
+        self.etag = None
+
+    def _step_id(self) -> str:
+        return f"step-{self.draw.randrange(self.steps)}"
+
+    async def list(self) -> int:
+        return (await self.http.get("/project/list")).status_code
+
+    async def graph(self) -> int:
+        headers = {"If-None-Match": self.etag} if self.etag and self.draw.random() < 0.5 else {}
+        response = await self.http.get(f"/project/{self.project}/graph", headers=headers)
+        self.etag = response.headers.get("ETag", self.etag)
+        return response.status_code
+
+    async def step_read(self) -> int:
+        return (await self.http.get(f"/project/{self.project}/step/{self._step_id()}")).status_code
+
+    async def step_edit(self) -> int:
+        step_id = self._step_id()
+        response = await self.http.get(f"/project/{self.project}/step/{step_id}")
+        if response.status_code != 200:
+            return response.status_code
+        step = response.json()
+        step["description"] = f"Edited at {time.time()}"
+        return (await self.http.put(f"/project/{self.project}/step/{step_id}", json=step)).status_code
+
+    async def link_add(self) -> int:
+        # Links only go forward, they can not create a cycle (409 when the link already exists)
+        source, target = sorted(self.draw.sample(range(self.steps), 2))
+        link = {"source": f"step-{source}", "target": f"step-{target}"}
+        return (await self.http.post(f"/project/{self.project}/link", json=link)).status_code
+
+    async def run(self) -> int:
+        response = await self.http.post(
+            f"/project/{self.project}/run", json={"environment": {"CSM_ORC_SIMULATE": self.simulation}}
+        )
+        events = [
+            event
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+            for event in json.loads(line[len("data: ") :])["events"]
+        ]
+        statuses = [event["status"] for event in events if event.get("type") == "status"]
+        # The stream is complete, report a failed run as a server error
+        return response.status_code if statuses and statuses[-1] == "SUCCESS" else 500
+
+
+async def drive(http: httpx.AsyncClient, project: str, steps: int, simulation: str, args, mix: dict) -> dict:
+    """Send the requests of `--concurrency` clients on a project, returns the latencies and statuses per endpoint"""
+    latencies = {endpoint: list() for endpoint in mix}
+    statuses = {endpoint: Counter() for endpoint in mix}
+    draw = random.Random(args.seed)
+    plan = draw.choices(list(mix), weights=list(mix.values()), k=args.requests)
+
+    async def _client(index: int):
+        client = Client(http, project, steps, simulation, random.Random(f"{args.seed}:{index}"))
+        while plan:
+            endpoint = plan.pop()
+            start = time.perf_counter()
+            status = await getattr(client, endpoint)()
+            latencies[endpoint].append(time.perf_counter() - start)
+            statuses[endpoint][status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(i) for i in range(args.concurrency)))
+    duration = time.perf_counter() - start
+    result = {"requests": args.requests, "duration": duration, "throughput": args.requests / duration, "endpoints": {}}
+    for endpoint, values in latencies.items():
+        if not values:
+            continue
+        values.sort()
+        result["endpoints"][endpoint] = {
+            "count": len(values),
+            "throughput": len(values) / duration,
+            "statuses": {str(k): v for k, v in sorted(statuses[endpoint].items())},
+            "mean": sum(values) / len(values),
+            **{f"p{q}": percentile(values, q) for q in (50, 90, 95, 99)},
+            "max": values[-1],
+        }
+    return result
+
+
+async def benchmark(args, mix: dict, work_dir: pathlib.Path) -> dict:
+    # Imported once in the working directory: the project store indexes the projects below it
+    from cosmotech.csm_orc_api import app
+    from cosmotech.csm_orc_api.project_store import ProjectStore
+    from cosmotech.csm_orc_api.run_manager import RunManager
+
+    simulation = work_dir / "simulation.json"
+    simulation.write_text(json.dumps({"default": {"duration": 0, "outputs": {"result": "done"}}}))
+    for size in args.sizes:
+        generate_project(work_dir / "code" / "run_templates" / f"bench-{size}" / "run.json", size, args.seed)
+    results = dict()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as http:
+        for size in args.sizes:
+            print(f"{size} steps...", file=sys.stderr)
+            results[str(size)] = await drive(http, f"bench-{size}", size, str(simulation), args, mix)
+    await RunManager().shutdown()
+    ProjectStore().flush()
+    return results
+
+
+def parse_mix(value: str) -> dict:
+    mix = dict()
+    for item in value.split(","):
+        endpoint, _, weight = item.partition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{endpoint}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")], default=[10, 100, 1000, 5000])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests sent to each project")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Weight of each endpoint, as endpoint=weight,... (default: "
+        + ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items())
+        + ")",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=pathlib.Path, default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+    mix = {endpoint: weight for endpoint, weight in args.mix.items() if weight > 0}
+    if "run" in mix and shutil.which("csm-orc") is None:
+        print("csm-orc not found, runs are left out of the mix", file=sys.stderr)
+        del mix["run"]
+    LOGGER.setLevel(logging.WARNING)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            results = asyncio.run(benchmark(args, mix, pathlib.Path(tmp_dir)))
+        finally:
+            os.chdir(cwd)
+    report = {
+        "config": {"sizes": args.sizes, "concurrency": args.concurrency, "requests": args.requests, "mix": mix},
+        "results": results,
+    }
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
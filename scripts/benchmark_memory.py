@@ -0,0 +1,77 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Memory used to load a large run template.
+
+Generates a template of `--steps` steps (10 000 by default) using a few command templates with many environment
+variables, each step overriding some of them, then reports the memory allocated while loading it.
+
+    python scripts/benchmark_memory.py --steps 10000
+"""
+
+import argparse
+import json
+import logging
+import pathlib
+import tempfile
+import time
+import tracemalloc
+
+from cosmotech.orchestrator.core.orchestrator import Orchestrator
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+
+def generate_template(path: pathlib.Path, steps: int, templates: int = 10, variables: int = 20):
+    content = {
+        "commandTemplates": [
+            {
+                "id": f"template-{t}",
+                "command": "echo",
+                "arguments": ["$VAR_0"],
+                "environment": {
+                    f"VAR_{v}": {"defaultValue": f"value-{v}", "description": f"Variable {v} of template {t}"}
+                    for v in range(variables)
+                },
+            }
+            for t in range(templates)
+        ],
+        "steps": [
+            {
+                "id": f"step-{s}",
+                "commandId": f"template-{s % templates}",
+                "environment": {"VAR_0": {"value": f"step-{s}"}, f"STEP_VAR_{s % 3}": {"value": "1"}},
+                "precedents": [f"step-{s - 1}"] if s else [],
+            }
+            for s in range(steps)
+        ],
+    }
+    path.write_text(json.dumps(content))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=10000)
+    args = parser.parse_args()
+    LOGGER.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = pathlib.Path(tmp_dir) / "benchmark.json"
+        generate_template(path, args.steps)
+        tracemalloc.start()
+        start = time.perf_counter()
+        steps, graph = Orchestrator().load_json_file(str(path), dry=True)
+        duration = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f"steps: {len(steps)}")
+    print(f"load time: {duration:.2f}s")
+    print(f"retained: {current / (1 << 20):.1f} MiB ({current / len(steps):.0f} bytes per step)")
+    print(f"peak: {peak / (1 << 20):.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Copyright (C) - 2023 - 2025 - Cosmo Tech
+# This document and all information contained herein is the exclusive property -
+# including all intellectual property rights pertaining thereto - of Cosmo Tech.
+# Any use, reproduction, translation, broadcasting, transmission, distribution,
+# etc., to any person is prohibited unless it has been previously and
+# specifically authorized by written means by Cosmo Tech.
+
+"""
+Scheduling of many simulated runs.
+
+Generates `--scenarios` random step graphs of `--steps` steps (each step waits for up to 3 of the previous ones),
+with random durations and a `--failure-rate` per step, and evaluates each of them with `--max-parallel` steps at once
+on the simulated backend: no process is started. Reports the time spent scheduling and the simulated makespans,
+as JSON with `--json`.
+
+    python scripts/benchmark_scheduler.py --scenarios 1000 --steps 100 --max-parallel 8
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import time
+from collections import Counter
+
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.executors import SimulatedExecutor
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.utils.logger import LOGGER
+
+
+def generate_graph(seed: int, steps: int, executor: SimulatedExecutor) -> StepGraph:
+    draw = random.Random(seed)
+    graph = StepGraph(name=f"scenario-{seed}", executor=executor)
+    for s in range(steps):
+        graph.add_step(Step(id=f"step-{s}", command="true"))
+        for precedent in draw.sample(range(s), min(s, draw.randint(0, 3))):
+            graph.add_edge(precedent, s)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--max-parallel", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    LOGGER.setLevel(logging.CRITICAL)
+    makespans = list()
+    statuses = Counter()
+    scheduling = 0.0
+    for seed in range(args.scenarios):
+        executor = SimulatedExecutor({"seed": seed, "default": {"duration": [1, 60], "failureRate": args.failure_rate}})
+        graph = generate_graph(seed, args.steps, executor)
+        start = time.perf_counter()
+        graph.evaluate(max_workers=args.max_parallel)
+        scheduling += time.perf_counter() - start
+        makespans.append(executor.clock())
+        statuses.update(step.status.name for step in graph.steps)
+    result = {
+        "scenarios": args.scenarios,
+        "steps": args.steps,
+        "maxParallel": args.max_parallel,
+        "schedulingTime": scheduling,
+        "stepsPerSecond": args.scenarios * args.steps / scheduling,
+        "makespan": {
+            "min": min(makespans),
+            "median": statistics.median(makespans),
+            "max": max(makespans),
+        },
+        "statuses": dict(statuses),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"scenarios: {args.scenarios} x {args.steps} steps, {args.max_parallel} at once")
+    print(f"scheduling time: {scheduling:.2f}s ({result['stepsPerSecond']:.0f} steps per second)")
+    print("simulated makespan: {min:.0f}s min, {median:.0f}s median, {max:.0f}s max".format(**result["makespan"]))
+    print("statuses: " + ", ".join(f"{k} {v}" for k, v in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,11 +14,17 @@ import click
 
 from cosmotech.csm_orc.run import run_command
 from cosmotech.csm_orc.list_templates import list_templates_command
+from cosmotech.csm_orc.stats import stats_command
+from cosmotech.csm_orc.analyze import analyze_command
+from cosmotech.csm_orc.artifacts import gc_command
 
 ansi_escape = re.compile(r"(?:\x1B[@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]")
 commands = {
     "csm-orc run": run_command,
     "csm-orc list-templates": list_templates_command,
+    "csm-orc stats": stats_command,
+    "csm-orc analyze": analyze_command,
+    "csm-orc artifacts gc": gc_command,
 }
 help_folder = pathlib.Path("generated/commands_help")
 help_folder.mkdir(parents=True, exist_ok=True)
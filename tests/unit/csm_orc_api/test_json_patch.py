@@ -0,0 +1,189 @@
+import copy
+
+import pytest
+
+from cosmotech.csm_orc_api.json_patch import JsonPatchError
+from cosmotech.csm_orc_api.json_patch import apply_patch
+
+
+class TestApplyPatch:
+    """Examples of RFC 6902 appendix A"""
+
+    @pytest.mark.parametrize(
+        "document, operations, expected",
+        [
+            # A.1. Adding an Object Member
+            ({"foo": "bar"}, [{"op": "add", "path": "/baz", "value": "qux"}], {"baz": "qux", "foo": "bar"}),
+            # A.2. Adding an Array Element
+            (
+                {"foo": ["bar", "baz"]},
+                [{"op": "add", "path": "/foo/1", "value": "qux"}],
+                {"foo": ["bar", "qux", "baz"]},
+            ),
+            # A.3. Removing an Object Member
+            ({"baz": "qux", "foo": "bar"}, [{"op": "remove", "path": "/baz"}], {"foo": "bar"}),
+            # A.4. Removing an Array Element
+            ({"foo": ["bar", "qux", "baz"]}, [{"op": "remove", "path": "/foo/1"}], {"foo": ["bar", "baz"]}),
+            # A.5. Replacing a Value
+            (
+                {"baz": "qux", "foo": "bar"},
+                [{"op": "replace", "path": "/baz", "value": "boo"}],
+                {"baz": "boo", "foo": "bar"},
+            ),
+            # A.6. Moving a Value
+            (
+                {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+                [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+                {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}},
+            ),
+            # A.7. Moving an Array Element
+            (
+                {"foo": ["all", "grass", "cows", "eat"]},
+                [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+                {"foo": ["all", "cows", "eat", "grass"]},
+            ),
+            # A.8. Testing a Value: Success
+            (
+                {"baz": "qux", "foo": ["a", 2, "c"]},
+                [
+                    {"op": "test", "path": "/baz", "value": "qux"},
+                    {"op": "test", "path": "/foo/1", "value": 2},
+                ],
+                {"baz": "qux", "foo": ["a", 2, "c"]},
+            ),
+            # A.10. Adding a Nested Member Object
+            (
+                {"foo": "bar"},
+                [{"op": "add", "path": "/child", "value": {"grandchild": {}}}],
+                {"foo": "bar", "child": {"grandchild": {}}},
+            ),
+            # A.14. ~ Escape Ordering
+            (
+                {"/": 9, "~1": 10},
+                [{"op": "test", "path": "/~01", "value": 10}],
+                {"/": 9, "~1": 10},
+            ),
+            # A.16. Adding an Array Value
+            (
+                {"foo": ["bar"]},
+                [{"op": "add", "path": "/foo/-", "value": ["abc", "def"]}],
+                {"foo": ["bar", ["abc", "def"]]},
+            ),
+        ],
+    )
+    def test_rfc_examples(self, document, operations, expected):
+        # Execute
+        result = apply_patch(document, operations)
+
+        # Verify
+        assert result == expected
+
+    @pytest.mark.parametrize(
+        "document, operations",
+        [
+            # A.9. Testing a Value: Error
+            ({"baz": "qux"}, [{"op": "test", "path": "/baz", "value": "bar"}]),
+            # A.12. Adding to a Nonexistent Target
+            ({"foo": "bar"}, [{"op": "add", "path": "/baz/bat", "value": "qux"}]),
+            # A.15. Comparing Strings and Numbers
+            ({"/": 9, "~1": 10}, [{"op": "test", "path": "/~01", "value": "10"}]),
+            # Values of different JSON types are never equal
+            ({"a": True}, [{"op": "test", "path": "/a", "value": 1}]),
+            ({"a": 1}, [{"op": "test", "path": "/a", "value": True}]),
+            ({"a": [0, {"b": False}]}, [{"op": "test", "path": "/a", "value": [0, {"b": 0}]}]),
+            ({"a": None}, [{"op": "test", "path": "/a", "value": False}]),
+        ],
+    )
+    def test_rfc_error_examples(self, document, operations):
+        # Execute and verify
+        with pytest.raises(JsonPatchError):
+            apply_patch(document, operations)
+
+    def test_numbers_compare_by_value(self):
+        # Execute
+        result = apply_patch({"a": [1, {"b": 2.0}]}, [{"op": "test", "path": "/a", "value": [1.0, {"b": 2}]}])
+
+        # Verify
+        assert result == {"a": [1, {"b": 2.0}]}
+
+    def test_pointer_escapes(self):
+        # Setup
+        document = {"a/b": 1, "m~n": 2}
+
+        # Execute
+        result = apply_patch(
+            document,
+            [
+                {"op": "replace", "path": "/a~1b", "value": 3},
+                {"op": "copy", "from": "/m~0n", "path": "/m~0n~1copy"},
+            ],
+        )
+
+        # Verify
+        assert result == {"a/b": 3, "m~n": 2, "m~n/copy": 2}
+
+    def test_end_of_array_index_only_allowed_to_add(self):
+        # Setup
+        document = {"foo": [1, 2]}
+
+        # Execute and verify
+        assert apply_patch(document, [{"op": "add", "path": "/foo/-", "value": 3}]) == {"foo": [1, 2, 3]}
+        with pytest.raises(JsonPatchError):
+            apply_patch(document, [{"op": "remove", "path": "/foo/-"}])
+        with pytest.raises(JsonPatchError):
+            apply_patch(document, [{"op": "replace", "path": "/foo/3", "value": 0}])
+        with pytest.raises(JsonPatchError):
+            apply_patch(document, [{"op": "add", "path": "/foo/01", "value": 0}])
+
+    def test_copy_is_independent_from_its_source(self):
+        # Setup
+        document = {"a": {"list": [1]}}
+
+        # Execute
+        result = apply_patch(
+            document,
+            [{"op": "copy", "from": "/a", "path": "/b"}, {"op": "add", "path": "/b/list/-", "value": 2}],
+        )
+
+        # Verify
+        assert result == {"a": {"list": [1]}, "b": {"list": [1, 2]}}
+
+    def test_move_inside_itself_is_refused(self):
+        # Execute and verify
+        with pytest.raises(JsonPatchError):
+            apply_patch({"a": {"b": {}}}, [{"op": "move", "from": "/a", "path": "/a/b/c"}])
+
+    def test_root_replacement(self):
+        # Execute
+        result = apply_patch({"a": 1}, [{"op": "replace", "path": "", "value": {"b": 2}}])
+
+        # Verify
+        assert result == {"b": 2}
+
+    @pytest.mark.parametrize(
+        "operation",
+        [
+            {"op": "add", "path": "/a"},
+            {"op": "move", "path": "/a"},
+            {"op": "unknown", "path": "/a"},
+            {"path": "/a"},
+            {"op": "add", "path": "a", "value": 1},
+        ],
+    )
+    def test_invalid_operations(self, operation):
+        # Execute and verify
+        with pytest.raises(JsonPatchError):
+            apply_patch({}, [operation])
+
+    def test_invalid_patch_on_copy_leaves_document_untouched(self):
+        # Setup
+        document = {"steps": [{"id": "a"}]}
+        operations = [
+            {"op": "add", "path": "/steps/-", "value": {"id": "b"}},
+            {"op": "test", "path": "/steps/0/id", "value": "z"},
+        ]
+
+        # Execute and verify
+        with pytest.raises(JsonPatchError, match="Operation 1"):
+            apply_patch(copy.deepcopy(document), operations)
+        assert document == {"steps": [{"id": "a"}]}
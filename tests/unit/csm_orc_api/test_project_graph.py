@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+from cosmotech.csm_orc_api.project_graph import GraphCycleError
+from cosmotech.csm_orc_api.project_graph import ProjectGraph
+
+
+def _steps(links: dict[str, list[str]]) -> list[dict]:
+    return [{"id": step_id, "precedents": precedents} for step_id, precedents in links.items()]
+
+
+def _assert_topological(graph: ProjectGraph):
+    order = graph.topological_order()
+    assert sorted(order) == sorted(graph.steps)
+    for source, targets in graph.successors.items():
+        for target in targets:
+            assert graph.order[source] < graph.order[target], f"{source} placed after {target}"
+
+
+class TestProjectGraph:
+    def test_initial_order_is_topological(self):
+        # Setup
+        steps = _steps({"d": ["b", "c"], "c": ["a"], "b": ["a"], "a": []})
+
+        # Execute
+        graph = ProjectGraph(steps)
+
+        # Verify
+        assert graph.acyclic
+        assert graph.topological_order() == ["a", "c", "b", "d"]
+        _assert_topological(graph)
+
+    def test_dangling_precedents_are_linked_when_step_is_added(self):
+        # Setup
+        graph = ProjectGraph(_steps({"b": ["a"]}))
+
+        # Execute
+        graph.add_step({"id": "a"})
+
+        # Verify
+        assert graph.dangling == {}
+        assert list(graph.successors["a"]) == ["b"]
+        assert graph.topological_order() == ["a", "b"]
+
+    def test_add_link_reorders_only_when_needed(self):
+        # Setup
+        graph = ProjectGraph(_steps({"a": [], "b": [], "c": [], "d": ["c"]}))
+
+        # Execute
+        graph.add_link("d", "a")
+
+        # Verify
+        _assert_topological(graph)
+        order = graph.topological_order()
+        assert order.index("c") < order.index("d") < order.index("a")
+        assert order.index("b") == 1
+
+    def test_add_link_rejects_cycle_and_keeps_graph(self):
+        # Setup
+        graph = ProjectGraph(_steps({"a": [], "b": ["a"], "c": ["b"]}))
+        order = dict(graph.order)
+
+        # Execute and verify
+        with pytest.raises(GraphCycleError):
+            graph.add_link("c", "a")
+        with pytest.raises(GraphCycleError):
+            graph.add_link("a", "a")
+        assert graph.order == order
+        assert "a" not in graph.successors["c"]
+        assert "c" not in graph.predecessors["a"]
+
+    def test_order_stays_valid_after_link_removal(self):
+        # Setup
+        graph = ProjectGraph(_steps({"a": [], "b": ["a"], "c": ["b"]}))
+
+        # Execute
+        graph.remove_link("b", "c")
+        graph.add_link("c", "a")
+
+        # Verify
+        _assert_topological(graph)
+        assert graph.topological_order().index("c") < graph.topological_order().index("a")
+        with pytest.raises(GraphCycleError):
+            graph.add_link("b", "c")
+
+    def test_random_edits_keep_a_topological_order(self):
+        # Setup
+        draw = random.Random(0)
+        ids = [f"s{i}" for i in range(30)]
+        graph = ProjectGraph(_steps({step_id: [] for step_id in ids}))
+
+        # Execute and verify
+        for _ in range(300):
+            source, target = draw.sample(ids, 2)
+            if target in graph.successors[source]:
+                graph.remove_link(source, target)
+            else:
+                try:
+                    graph.add_link(source, target)
+                except GraphCycleError:
+                    assert graph._reaches(target, source)
+            _assert_topological(graph)
+
+    def test_add_step_creating_cycle_is_rejected(self):
+        # Setup
+        graph = ProjectGraph(_steps({"b": ["c"], "c": ["x"]}))
+
+        # Execute and verify
+        with pytest.raises(GraphCycleError):
+            graph.add_step({"id": "x", "precedents": ["b"]})
+        assert "x" not in graph.steps and "x" not in graph.order
+        assert graph.dangling == {"x": {"c": None}}
+        _assert_topological(graph)
+
+    def test_update_step_renames_and_keeps_links(self):
+        # Setup
+        graph = ProjectGraph(_steps({"a": [], "b": ["a"]}))
+
+        # Execute
+        successors = graph.update_step("a", {"id": "first", "precedents": []})
+
+        # Verify
+        assert successors == ["b"]
+        assert list(graph.predecessors["b"]) == ["first"]
+        assert graph.topological_order() == ["first", "b"]
+
+    def test_cyclic_file_falls_back_to_searches(self):
+        # Setup
+        graph = ProjectGraph(_steps({"a": ["b"], "b": ["a"], "c": []}))
+
+        # Execute and verify
+        assert not graph.acyclic
+        with pytest.raises(GraphCycleError):
+            graph.add_link("c", "c")
+        graph.add_link("a", "c")
+        with pytest.raises(GraphCycleError):
+            graph.add_link("c", "b")
@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cosmotech.csm_orc_api import app
+from cosmotech.csm_orc_api.project_store import ProjectStore
+from cosmotech.csm_orc_api.router import project
+from cosmotech.orchestrator.templates.library import Library
+from cosmotech.orchestrator.utils.singleton import Singleton
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    project_file = tmp_path / "code" / "run_templates" / "demo" / "run.json"
+    project_file.parent.mkdir(parents=True)
+    project_file.write_text(json.dumps({"steps": [{"id": "a", "command": "true"}, {"id": "b", "command": "true"}]}))
+    monkeypatch.chdir(tmp_path)
+    Singleton._instances.pop(ProjectStore, None)
+    yield TestClient(app)
+    ProjectStore().flush()
+    Singleton._instances.pop(ProjectStore, None)
+
+
+class TestProjectGraph:
+    def test_unchanged_project_is_not_modified(self, client, monkeypatch):
+        # Setup
+        first = client.get("/project/demo/graph")
+        layouts = list()
+        monkeypatch.setattr(project, "layered_layout", lambda structure: layouts.append(structure))
+
+        # Execute
+        response = client.get("/project/demo/graph", headers={"If-None-Match": first.headers["ETag"]})
+
+        # Verify
+        assert first.status_code == 200
+        assert [node["id"] for node in first.json()["nodes"]] == ["a", "b"]
+        assert response.status_code == 304
+        assert response.headers["ETag"] == first.headers["ETag"]
+        assert layouts == []
+
+    def test_edit_changes_etag(self, client):
+        # Setup
+        first = client.get("/project/demo/graph")
+
+        # Execute
+        client.post("/project/demo/link", json={"source": "a", "target": "b"})
+        response = client.get("/project/demo/graph", headers={"If-None-Match": first.headers["ETag"]})
+
+        # Verify
+        assert response.status_code == 200
+        assert response.headers["ETag"] != first.headers["ETag"]
+        assert response.json()["edges"] == [{"source": "a", "target": "b"}]
+
+    def test_changed_template_files_change_etag(self, client, monkeypatch):
+        # Setup
+        first = client.get("/project/demo/graph")
+        refreshes = list()
+
+        def _refresh(library, min_interval: float = 0) -> bool:
+            refreshes.append(min_interval)
+            library._Library__generation += 1
+            return True
+
+        monkeypatch.setattr(Library, "refresh", _refresh)
+
+        # Execute
+        response = client.get("/project/demo/graph", headers={"If-None-Match": first.headers["ETag"]})
+
+        # Verify
+        assert len(refreshes) == 1
+        assert response.status_code == 200
+        assert response.headers["ETag"] != first.headers["ETag"]
+
+
+class TestEditProject:
+    @pytest.mark.parametrize(
+        "method, url, body, status_code",
+        [
+            ("put", "/project/demo/step/a", {"id": "b", "command": "true"}, 409),
+            ("put", "/project/demo/step/a", {"command": "true"}, 400),
+            ("put", "/project/demo/step/a", {"id": "a", "command": "true", "precedents": ["b"]}, 400),
+            ("post", "/project/demo/step", {"id": "a", "command": "true"}, 409),
+            ("post", "/project/demo/link", {"source": "b", "target": "a"}, 400),
+            ("delete", "/project/demo/link", {"source": "b", "target": "a"}, 404),
+        ],
+    )
+    def test_refused_edit_changes_nothing(self, client, method, url, body, status_code):
+        # Setup
+        client.post("/project/demo/link", json={"source": "a", "target": "b"})
+        before = client.get("/project/demo")
+
+        # Execute
+        response = client.request(method, url, json=body)
+
+        # Verify
+        assert response.status_code == status_code
+        after = client.get("/project/demo")
+        assert after.headers["X-Project-Version"] == before.headers["X-Project-Version"]
+        assert after.json() == before.json()
+        assert client.get("/project/demo/graph").json()["edges"] == [{"source": "a", "target": "b"}]
+
+
+class TestPatchProject:
+    def test_invalid_patch_changes_nothing(self, client):
+        # Setup
+        version = client.get("/project/demo").headers["X-Project-Version"]
+        operations = [
+            {"op": "add", "path": "/steps/-", "value": {"id": "c", "command": "true"}},
+            {"op": "remove", "path": "/steps/5"},
+        ]
+
+        # Execute
+        response = client.patch("/project/demo", json=operations)
+
+        # Verify
+        assert response.status_code == 400
+        assert "Operation 1" in response.json()["detail"]
+        after = client.get("/project/demo")
+        assert after.headers["X-Project-Version"] == version
+        assert [step["id"] for step in after.json()["steps"]] == ["a", "b"]
+
+    def test_valid_patch_is_applied_as_one_edit(self, client):
+        # Setup
+        version = int(client.get("/project/demo").headers["X-Project-Version"])
+        operations = [
+            {"op": "add", "path": "/steps/-", "value": {"id": "c", "command": "true", "precedents": ["b"]}},
+            {"op": "add", "path": "/steps/1/precedents", "value": ["a"]},
+        ]
+
+        # Execute
+        response = client.patch("/project/demo", json=operations, headers={"X-Project-Version": str(version)})
+
+        # Verify
+        assert response.status_code == 200
+        assert response.headers["X-Project-Version"] == str(version + 1)
+        edges = client.get("/project/demo/graph").json()["edges"]
+        assert edges == [{"source": "a", "target": "b"}, {"source": "b", "target": "c"}]
@@ -0,0 +1,182 @@
+import json
+import os
+import time
+
+import pytest
+
+from cosmotech.csm_orc_api.project_store import ProjectDocument
+from cosmotech.csm_orc_api.project_store import ProjectStore
+from cosmotech.csm_orc_api.project_store import ProjectVersionConflict
+from cosmotech.orchestrator.utils.singleton import Singleton
+
+
+@pytest.fixture
+def project_file(tmp_path):
+    path = tmp_path / "code" / "run_templates" / "demo" / "run.json"
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps({"steps": [{"id": "a"}, {"id": "b", "precedents": ["a"]}]}))
+    return path
+
+
+@pytest.fixture
+def project_store(tmp_path):
+    Singleton._instances.pop(ProjectStore, None)
+    store = ProjectStore(str(tmp_path), refresh_interval=0, write_delay=0.05)
+    yield store
+    store.flush()
+    Singleton._instances.pop(ProjectStore, None)
+
+
+def _touch_later(path, content: dict):
+    """Rewrite a file with a modification time that differs from the one the document recorded"""
+    path.write_text(json.dumps(content))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestProjectDocument:
+    def test_edits_are_written_once_after_delay(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=0.1)
+        version = document.version
+
+        # Execute
+        with document.edit(version) as content:
+            content["steps"].append({"id": "c"})
+        with document.edit() as content:
+            content["steps"].append({"id": "d"})
+        written_before_delay = json.loads(project_file.read_text())
+        time.sleep(0.5)
+
+        # Verify
+        assert document.version == version + 2
+        assert [s["id"] for s in written_before_delay["steps"]] == ["a", "b"]
+        assert [s["id"] for s in json.loads(project_file.read_text())["steps"]] == ["a", "b", "c", "d"]
+        assert not document.is_stale()
+
+    def test_flush_writes_pending_edits(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=60)
+        with document.edit() as content:
+            content["description"] = "edited"
+
+        # Execute
+        document.flush()
+
+        # Verify
+        assert json.loads(project_file.read_text())["description"] == "edited"
+
+    def test_edit_with_outdated_version_raises_conflict(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=60)
+        version = document.version
+        with document.edit(version) as content:
+            content["description"] = "first"
+
+        # Execute and verify
+        with pytest.raises(ProjectVersionConflict) as error:
+            with document.edit(version) as content:
+                content["description"] = "second"
+        assert (error.value.expected_version, error.value.version) == (version, version + 1)
+        assert document.content["description"] == "first"
+        document.discard()
+
+    def test_refused_edit_keeps_version_and_graph(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=60)
+        version = document.version
+        graph = document.graph
+
+        # Execute
+        with pytest.raises(RuntimeError):
+            with document.edit():
+                raise RuntimeError("rejected")
+
+        # Verify
+        assert document.version == version
+        assert document.graph is graph
+        assert not document._dirty
+
+    def test_is_stale_after_external_change(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=60)
+
+        # Execute
+        _touch_later(project_file, {"steps": [{"id": "z"}]})
+
+        # Verify
+        assert document.is_stale()
+        document.reload()
+        assert not document.is_stale()
+        assert document.content == {"steps": [{"id": "z"}]}
+
+    def test_is_not_stale_with_pending_edits(self, project_file):
+        # Setup
+        document = ProjectDocument(project_file, write_delay=60)
+        with document.edit() as content:
+            content["description"] = "pending"
+
+        # Execute
+        _touch_later(project_file, {"steps": []})
+
+        # Verify
+        assert not document.is_stale()
+        document.discard()
+
+
+class TestProjectStore:
+    def test_find_indexes_projects_by_folder_name(self, project_store, project_file):
+        # Execute
+        found = project_store.find("demo")
+
+        # Verify
+        assert found is not None and found.samefile(project_file)
+        assert project_store.find("missing") is None
+
+    def test_refresh_finds_new_and_removed_projects(self, project_store, project_file, tmp_path):
+        # Setup
+        project_store.project_files()
+        other = tmp_path / "code" / "run_templates" / "other" / "run.json"
+
+        # Execute
+        other.parent.mkdir()
+        other.write_text(json.dumps({"steps": []}))
+        added = project_store.find("other")
+        other.unlink()
+        other.parent.rmdir()
+        removed = project_store.find("other")
+
+        # Verify
+        assert added is not None
+        assert removed is None
+
+    def test_open_reloads_stale_documents(self, project_store, project_file):
+        # Setup
+        path = project_store.find("demo")
+        document = project_store.open(path)
+        version = document.version
+
+        # Execute
+        _touch_later(project_file, {"steps": [{"id": "z"}]})
+        reopened = project_store.open(path)
+
+        # Verify
+        assert reopened is document
+        assert document.version == version + 1
+        assert document.content == {"steps": [{"id": "z"}]}
+
+    def test_open_keeps_edited_documents(self, project_store, project_file):
+        # Setup
+        path = project_store.find("demo")
+        document = project_store.open(path)
+        with document.edit() as content:
+            content["description"] = "edited"
+
+        # Execute
+        project_store.flush(path)
+        reopened = project_store.open(path)
+
+        # Verify
+        assert reopened is document
+        assert reopened.content["description"] == "edited"
+        assert json.loads(project_file.read_text())["description"] == "edited"
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import pathlib
+
+import pytest
+
+from cosmotech.csm_orc_api.run_manager import RunManager
+from cosmotech.csm_orc_api.run_manager import RunStatus
+from cosmotech.orchestrator.utils.singleton import Singleton
+
+
+@pytest.fixture
+def run_manager():
+    Singleton._instances.pop(RunManager, None)
+    yield RunManager
+    Singleton._instances.pop(RunManager, None)
+
+
+@pytest.fixture
+def slow_csm_orc(tmp_path, monkeypatch):
+    """A `csm-orc` taking some time to drain its steps when it gets a SIGTERM"""
+    script = tmp_path / "bin" / "csm-orc"
+    script.parent.mkdir()
+    script.write_text("#!/bin/bash\ntrap 'sleep 0.5; exit 143' TERM\nsleep 30 &\nwait\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    return {"PATH": os.environ["PATH"]}
+
+
+async def _wait_for_status(run, status: RunStatus):
+    while run.status != status:
+        await asyncio.sleep(0.01)
+
+
+class TestRunManager:
+    def test_max_parallel_runs_read_from_environment_on_creation(self, run_manager, monkeypatch):
+        # Setup
+        monkeypatch.setenv("CSM_ORC_GUI_MAX_RUNS", "5")
+
+        # Execute
+        manager = run_manager()
+
+        # Verify
+        assert manager.max_parallel_runs == 5
+
+    def test_cancelled_run_stays_running_until_process_exits(self, run_manager, slow_csm_orc):
+        # Setup
+        manager = run_manager(max_parallel_runs=1, cancel_grace_period=5)
+
+        async def _scenario():
+            run = manager.start(pathlib.Path("project/run.json"), slow_csm_orc)
+            queued = manager.start(pathlib.Path("project/run.json"), slow_csm_orc)
+            await asyncio.wait_for(_wait_for_status(run, RunStatus.RUNNING), timeout=5)
+            # Let the script install its signal handler
+            await asyncio.sleep(0.2)
+            cancel = asyncio.create_task(manager.cancel(run))
+            await asyncio.sleep(0.2)
+            draining = (run.status, run.finished, run.cancel_requested, queued.status)
+            await manager.cancel(queued)
+            await cancel
+            await asyncio.gather(run.task, queued.task)
+            return run, queued, draining
+
+        # Execute
+        run, queued, draining = asyncio.run(_scenario())
+
+        # Verify
+        assert draining == (RunStatus.RUNNING, False, True, RunStatus.QUEUED)
+        assert run.status == RunStatus.CANCELLED
+        assert run.return_code == 143
+        assert queued.status == RunStatus.CANCELLED
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from cosmotech.orchestrator.api.analyze import analyze_template
+from cosmotech.orchestrator.api.analyze import predict_template
+from cosmotech.orchestrator.api.analyze import simulate_schedule
+from cosmotech.orchestrator.core.command_template import CommandTemplate
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.history import StepHistory
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.core.step import StepStatus
+from cosmotech.orchestrator.templates.library import Library
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = tmp_path / "run.json"
+    path.write_text(
+        json.dumps(
+            {
+                "steps": [
+                    {"id": "a", "command": "true", "expectedDuration": 4},
+                    {"id": "b", "command": "true", "expectedDuration": 2},
+                    {"id": "c", "command": "true", "precedents": ["a", "b"]},
+                ]
+            }
+        )
+    )
+    return str(path)
+
+
+def _graph(*step_ids, edges=()):
+    graph = StepGraph(name="test")
+    for step_id in step_ids:
+        graph.add_step(Step(id=step_id, command="false"))
+    for precedent, index in edges:
+        graph.add_edge(precedent, index)
+    return graph
+
+
+class TestAnalyzeTemplate:
+    def test_steps_without_history_use_their_template_history(self, tmp_path):
+        # Setup
+        Library().add_template(CommandTemplate(id="analyze-timed-template", command="true"), override=True)
+        stats_db = str(tmp_path / "history.db")
+        history = StepHistory(stats_db)
+        for duration in (40.0, 42.0, 50.0):
+            event = {"stepId": "other", "commandId": "analyze-timed-template", "status": "SUCCESS", "time": 0}
+            history.record("run", "other/run.json", {**event, "type": STEP_FINISHED, "duration": duration})
+        history.close()
+        path = tmp_path / "run.json"
+        path.write_text(
+            json.dumps({"steps": [{"id": "a", "commandId": "analyze-timed-template"}, {"id": "b", "command": "true"}]})
+        )
+
+        # Execute
+        analysis = analyze_template(str(path), stats_db=stats_db)
+
+        # Verify
+        assert analysis["durations"] == {
+            "a": {"duration": 42.0, "source": "history"},
+            "b": {"duration": 1.0, "source": "default"},
+        }
+
+
+class TestSimulateSchedule:
+    def test_starts_steps_when_ready_within_max_parallel(self):
+        # Setup
+        graph = _graph("a", "b", "c", "d", edges=[(0, 3), (1, 3)])
+
+        # Execute
+        schedule = simulate_schedule(graph, {"a": 4.0, "b": 2.0, "c": 3.0, "d": 1.0}, max_parallel=2)
+
+        # Verify
+        assert schedule == {"a": (0.0, 4.0), "b": (0.0, 2.0), "c": (2.0, 5.0), "d": (4.0, 5.0)}
+        assert all(step.status == StepStatus.INITIALIZED for step in graph.steps)
+
+    def test_skipped_steps_are_not_simulated(self):
+        # Setup
+        graph = _graph("a", "b", edges=[(0, 1)])
+        graph.steps[0].skipped = True
+
+        # Execute
+        schedule = simulate_schedule(graph, {"a": 4.0, "b": 2.0}, max_parallel=1)
+
+        # Verify
+        assert schedule == {"a": (0.0, 0.0), "b": (0.0, 2.0)}
+
+    def test_steps_waiting_for_each_other_never_start(self):
+        # Setup
+        graph = _graph("a", "b", "c", edges=[(1, 2), (2, 1)])
+
+        # Execute
+        schedule = simulate_schedule(graph, {"a": 4.0, "b": 2.0, "c": 3.0}, max_parallel=2)
+
+        # Verify
+        assert schedule == {"a": (0.0, 4.0), "b": None, "c": None}
+
+
+class TestPredictTemplate:
+    def test_predicts_schedule_from_expected_durations(self, template):
+        # Execute
+        prediction = predict_template(template, max_parallel=2)
+
+        # Verify
+        steps = {s["stepId"]: s for s in prediction["steps"]}
+        assert (steps["a"]["start"], steps["a"]["finish"], steps["a"]["source"]) == (0.0, 4.0, "expected")
+        assert (steps["c"]["start"], steps["c"]["finish"], steps["c"]["source"]) == (4.0, 5.0, "default")
+        assert prediction["makespan"] == 5.0
+        assert prediction["neverStarted"] == []
+        assert prediction["utilization"] == pytest.approx(7.0 / 10.0)
+
+    def test_skipped_steps_take_no_time(self, template):
+        # Execute
+        prediction = predict_template(template, max_parallel=1, skipped_steps=["a"])
+
+        # Verify
+        steps = {s["stepId"]: s for s in prediction["steps"]}
+        assert steps["a"]["source"] == "skipped"
+        assert prediction["makespan"] == 3.0
+
+    def test_cyclic_template_is_rejected(self, tmp_path):
+        # Setup
+        path = tmp_path / "cycle.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "steps": [
+                        {"id": "a", "command": "true", "precedents": ["b"]},
+                        {"id": "b", "command": "true", "precedents": ["a"]},
+                    ]
+                }
+            )
+        )
+
+        # Execute / Verify
+        with pytest.raises(ValueError, match="a, b"):
+            predict_template(str(path))
@@ -1,3 +1,5 @@
+import json
+import os
 from unittest.mock import MagicMock
 from unittest.mock import mock_open
 from unittest.mock import patch
@@ -8,6 +10,14 @@ from cosmotech.orchestrator.api.run import display_environment
 from cosmotech.orchestrator.api.run import generate_env_file
 from cosmotech.orchestrator.api.run import run_template
 from cosmotech.orchestrator.api.run import validate_template
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.events import STEP_QUEUED
+from cosmotech.orchestrator.core.executors import PROCESS_EXECUTOR
+from cosmotech.orchestrator.core.history import GROUP_BY_TEMPLATE
+from cosmotech.orchestrator.core.history import StepHistory
+from cosmotech.orchestrator.core.selection import StepSelection
+from cosmotech.orchestrator.core.step import Step
 from cosmotech.orchestrator.core.step import StepStatus
 
 
@@ -100,6 +110,24 @@ class TestGenerateEnvFile:
         mock_file().writelines.assert_called_once()
         assert result is True
 
+    @patch.dict(os.environ, {}, clear=True)
+    @patch("cosmotech.orchestrator.api.run.Orchestrator")
+    def test_generates_env_file_from_step_snapshots(self, mock_orchestrator_class, tmp_path):
+        # Setup
+        step = Step(
+            id="step1",
+            command="echo",
+            environment={"SET_VAR": {"value": "value1"}, "UNSET_VAR": {"description": "Unset description"}},
+        )
+        mock_orchestrator_class.return_value.load_json_file.return_value = ({"step1": (step, 0)}, None)
+
+        # Execute
+        result = generate_env_file("valid_template.json", str(tmp_path / "output.env"))
+
+        # Verify
+        assert result is True
+        assert (tmp_path / "output.env").read_text() == "SET_VAR=value1\nUNSET_VAR=Unset description\n"
+
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_returns_false_for_invalid_template(self, mock_orchestrator_class):
         # Setup
@@ -128,7 +156,9 @@ class TestRunTemplate:
         # Verify
         assert success is False
         assert results is None
-        mock_orchestrator.load_json_file.assert_called_once_with("invalid_template.json", False, False, [])
+        mock_orchestrator.load_json_file.assert_called_once_with(
+            "invalid_template.json", False, False, [], selection=StepSelection()
+        )
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_returns_true_when_graph_is_none(self, mock_orchestrator_class):
@@ -176,7 +206,49 @@ class TestRunTemplate:
         assert "step2" in results
         assert results["step1"] == mock_step1
         assert results["step2"] == mock_step2
-        mock_graph.evaluate.assert_called_once_with(mode="threading")
+        mock_graph.evaluate.assert_called_once_with(max_workers=None)
+
+    @patch("cosmotech.orchestrator.api.run.Orchestrator")
+    def test_run_writes_events_to_event_file(self, mock_orchestrator_class, tmp_path):
+        # Setup
+        mock_orchestrator = MagicMock()
+        mock_orchestrator_class.return_value = mock_orchestrator
+        mock_step = MagicMock()
+        mock_step.status = StepStatus.SUCCESS
+        mock_orchestrator.load_json_file.return_value = ({"step1": (mock_step, None)}, MagicMock())
+        event_file = tmp_path / "events.jsonl"
+
+        # Execute
+        success, _ = run_template("valid_template.json", exit_handlers=False, event_file=str(event_file))
+
+        # Verify
+        assert success is True
+        events = [json.loads(line) for line in event_file.read_text().splitlines()]
+        assert events[0]["type"] == STEP_QUEUED
+        assert events[0]["stepId"] == "step1"
+
+    @patch("cosmotech.orchestrator.api.run.Orchestrator")
+    def test_run_records_steps_in_stats_db(self, mock_orchestrator_class, tmp_path):
+        # Setup
+        mock_orchestrator = MagicMock()
+        mock_orchestrator_class.return_value = mock_orchestrator
+        mock_step = MagicMock()
+        mock_step.status = StepStatus.SUCCESS
+        mock_graph = MagicMock()
+        mock_graph.evaluate.side_effect = lambda **kwargs: EVENT_BUS.emit(
+            STEP_FINISHED, stepId="step1", commandId="t1", exitHandler=False, status="SUCCESS", duration=2.0
+        )
+        mock_orchestrator.load_json_file.return_value = ({"step1": (mock_step, None)}, mock_graph)
+        stats_db = tmp_path / "history.db"
+
+        # Execute
+        success, _ = run_template("valid_template.json", exit_handlers=False, stats_db=str(stats_db))
+
+        # Verify
+        assert success is True
+        history = StepHistory(str(stats_db))
+        assert history.durations(GROUP_BY_TEMPLATE) == {("t1",): [2.0]}
+        history.close()
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_run_with_error_step(self, mock_orchestrator_class):
@@ -210,7 +282,44 @@ class TestRunTemplate:
         assert "step2" in results
         assert results["step1"] == mock_step1
         assert results["step2"] == mock_step2
-        mock_graph.evaluate.assert_called_once_with(mode="threading")
+        mock_graph.evaluate.assert_called_once_with(max_workers=None)
+
+    def test_run_fails_on_cyclic_template(self, tmp_path):
+        # Setup
+        template = tmp_path / "run.json"
+        template.write_text(
+            json.dumps(
+                {
+                    "steps": [
+                        {"id": "a", "command": "true", "precedents": ["b"]},
+                        {"id": "b", "command": "true", "precedents": ["a"]},
+                    ]
+                }
+            )
+        )
+
+        # Execute
+        success, results = run_template(str(template), exit_handlers=False)
+
+        # Verify
+        assert success is False
+        assert results is None
+
+    @patch("cosmotech.orchestrator.api.run.Orchestrator")
+    def test_run_fails_with_steps_never_ready(self, mock_orchestrator_class):
+        # Setup
+        mock_orchestrator = MagicMock()
+        mock_orchestrator_class.return_value = mock_orchestrator
+        mock_step = MagicMock()
+        mock_step.status = StepStatus.INITIALIZED
+        mock_orchestrator.load_json_file.return_value = ({"step1": (mock_step, None)}, MagicMock())
+
+        # Execute
+        success, results = run_template("valid_template.json", exit_handlers=False)
+
+        # Verify
+        assert success is False
+        assert results["step1"].status == StepStatus.ERROR
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     @patch("cosmotech.orchestrator.templates.library.Library")
@@ -234,11 +343,15 @@ class TestRunTemplate:
         mock_library = MagicMock()
         mock_library_class.return_value = mock_library
         mock_library.list_exit_commands.return_value = ["exit_handler1", "exit_handler2"]
-        mock_step_exit1 = MagicMock()
-        mock_step_exit2 = MagicMock()
+        mock_library.find_template_by_name.side_effect = lambda name: MagicMock(
+            runAfter=["exit_handler2"] if name == "exit_handler1" else []
+        )
+        calls = list()
+        mock_step_exit1 = MagicMock(id="exit_handler1", duration=0.5)
+        mock_step_exit2 = MagicMock(id="exit_handler2", duration=1.0)
         mock_step_class.side_effect = [mock_step_exit1, mock_step_exit2]
-        mock_step_exit1.run.return_value = True
-        mock_step_exit2.run.return_value = True
+        mock_step_exit1.run.side_effect = lambda **kwargs: calls.append(("exit_handler1", kwargs))
+        mock_step_exit2.run.side_effect = lambda **kwargs: calls.append(("exit_handler2", kwargs))
 
         # Execute
         success, results = run_template("valid_template.json", exit_handlers=True)
@@ -254,6 +367,11 @@ class TestRunTemplate:
         mock_step_class.assert_any_call(
             id="exit_handler2", commandId="exit_handler2", environment={"CSM_ORC_IS_SUCCESS": {"value": "True"}}
         )
+        assert calls == [
+            ("exit_handler2", {"dry": False, "as_exit": True, "executor": PROCESS_EXECUTOR}),
+            ("exit_handler1", {"dry": False, "as_exit": True, "executor": PROCESS_EXECUTOR}),
+        ]
+        assert results["exit_handler1"] == mock_step_exit1
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_run_with_dry_run_flag(self, mock_orchestrator_class):
@@ -278,7 +396,9 @@ class TestRunTemplate:
         assert success is True
         assert "step1" in results
         assert results["step1"] == mock_step1
-        mock_orchestrator.load_json_file.assert_called_once_with("valid_template.json", True, False, [])
+        mock_orchestrator.load_json_file.assert_called_once_with(
+            "valid_template.json", True, False, [], selection=StepSelection()
+        )
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_run_with_display_env_flag(self, mock_orchestrator_class):
@@ -303,7 +423,9 @@ class TestRunTemplate:
         assert success is True
         assert "step1" in results
         assert results["step1"] == mock_step1
-        mock_orchestrator.load_json_file.assert_called_once_with("valid_template.json", False, True, [])
+        mock_orchestrator.load_json_file.assert_called_once_with(
+            "valid_template.json", False, True, [], selection=StepSelection()
+        )
 
     @patch("cosmotech.orchestrator.api.run.Orchestrator")
     def test_run_with_skipped_steps(self, mock_orchestrator_class):
@@ -337,4 +459,6 @@ class TestRunTemplate:
         assert "step2" in results
         assert results["step1"] == mock_step1
         assert results["step2"] == mock_step2
-        mock_orchestrator.load_json_file.assert_called_once_with("valid_template.json", False, False, ["step2"])
+        mock_orchestrator.load_json_file.assert_called_once_with(
+            "valid_template.json", False, False, ["step2"], selection=StepSelection()
+        )
@@ -0,0 +1,34 @@
+import pytest
+
+from cosmotech.orchestrator.api.stats import get_step_stats
+from cosmotech.orchestrator.core.history import StepHistory
+
+
+class TestGetStepStats:
+    def test_returns_stats_per_template(self, tmp_path):
+        # Setup
+        stats_db = str(tmp_path / "history.db")
+        history = StepHistory(stats_db)
+        for i, duration in enumerate([1.0, 3.0]):
+            history.record(
+                "run",
+                "project",
+                {"stepId": f"step{i}", "commandId": "t1", "status": "SUCCESS", "time": i, "duration": duration},
+            )
+        history.close()
+
+        # Execute
+        stats = get_step_stats(stats_db, group_by="template")
+
+        # Verify
+        assert len(stats) == 1
+        assert stats[0]["commandId"] == "t1"
+        assert stats[0]["count"] == 2
+        assert stats[0]["p50"] == 2.0
+
+    def test_raises_on_missing_db_or_invalid_group(self, tmp_path):
+        # Execute & Verify
+        with pytest.raises(ValueError):
+            get_step_stats(str(tmp_path / "missing.db"))
+        with pytest.raises(ValueError):
+            get_step_stats(str(tmp_path / "missing.db"), group_by="plugin")
@@ -0,0 +1,68 @@
+import pytest
+
+from cosmotech.orchestrator.core.analysis import analyze
+from cosmotech.orchestrator.core.analysis import critical_path
+from cosmotech.orchestrator.core.analysis import simulate_makespan
+from cosmotech.orchestrator.core.analysis import step_data_predecessors
+from cosmotech.orchestrator.core.analysis import step_predecessors
+from cosmotech.orchestrator.core.analysis import topological_order
+from cosmotech.orchestrator.core.step import Step
+
+
+class TestAnalysis:
+    def test_topological_order_keeps_file_order_and_detects_cycles(self):
+        # Verify
+        assert topological_order({"b": [], "a": [], "c": ["a", "b"]}) == ["b", "a", "c"]
+        with pytest.raises(ValueError):
+            topological_order({"a": ["b"], "b": ["a"], "c": []})
+
+    def test_critical_path_follows_durations(self):
+        # Setup
+        predecessors = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}
+        order = topological_order(predecessors)
+
+        # Execute
+        length, path = critical_path(predecessors, order, {"a": 1.0, "b": 5.0, "c": 2.0, "d": 1.0})
+
+        # Verify
+        assert length == 7.0
+        assert path == ["a", "b", "d"]
+
+    def test_simulate_makespan_with_limited_parallelism(self):
+        # Setup
+        predecessors = {"a": [], "b": [], "c": [], "d": []}
+        durations = {"a": 3.0, "b": 1.0, "c": 1.0, "d": 1.0}
+        order = topological_order(predecessors)
+
+        # Verify
+        assert simulate_makespan(predecessors, order, durations) == 3.0
+        assert simulate_makespan(predecessors, order, durations, max_parallel=2) == 3.0
+        assert simulate_makespan(predecessors, order, durations, max_parallel=1) == 6.0
+
+    def test_analyze_reports_levels_and_serialization(self):
+        # Setup
+        predecessors = {"a": [], "b": ["a"], "c": ["a", "b"], "d": []}
+        durations = {"a": 2.0, "b": 2.0, "c": 1.0, "d": 1.0}
+
+        # Execute
+        result = analyze(predecessors, durations, data_predecessors={"c": {"a"}}, max_parallel=2)
+
+        # Verify
+        assert [level["width"] for level in result["levels"]] == [2, 1, 1]
+        assert result["maxWidth"] == 2
+        assert result["criticalPath"] == {"duration": 5.0, "steps": ["a", "b", "c"]}
+        assert result["makespan"] == 5.0
+        assert {"kind": "redundant", "stepId": "c", "precedent": "a", "saving": 0.0} in result["serialization"]
+        assert {"kind": "orderOnly", "stepId": "b", "precedent": "a", "saving": 2.0} in result["serialization"]
+        assert {"kind": "orderOnly", "stepId": "c", "precedent": "b", "saving": 1.0} in result["serialization"]
+
+    def test_step_predecessors_from_steps(self):
+        # Setup
+        steps = {
+            "a": Step(id="a", command="echo"),
+            "b": Step(id="b", command="echo", precedents=["a"], inputs={"x": {"stepId": "a", "output": "out"}}),
+        }
+
+        # Verify
+        assert step_predecessors(steps) == {"a": [], "b": ["a"]}
+        assert step_data_predecessors(steps) == {"a": set(), "b": {"a"}}
@@ -0,0 +1,153 @@
+import os
+import stat
+import time
+from unittest.mock import patch
+
+import pytest
+
+from cosmotech.orchestrator.core.artifacts import ArtifactStore
+from cosmotech.orchestrator.core.artifacts import file_digest
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.core.step import StepStatus
+
+
+@pytest.fixture
+def store(tmp_path):
+    _store = ArtifactStore()
+    _store.open(str(tmp_path / "store"))
+    yield _store
+    _store.close()
+
+
+class TestArtifactStore:
+    def test_ingest_stores_content_once(self, tmp_path, store):
+        # Setup
+        (tmp_path / "a.txt").write_text("same")
+        (tmp_path / "b.txt").write_text("same")
+        paths = [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+
+        # Execute
+        hashes = store.ingest(paths)
+
+        # Verify
+        digest = file_digest(paths[0])
+        assert hashes == {paths[0]: digest, paths[1]: digest}
+        assert [p.name for p in (tmp_path / "store" / "objects").rglob("*") if p.is_file()] == [digest[2:]]
+        assert (tmp_path / "b.txt").read_text() == "same"
+
+    def test_ingest_keeps_output_mode(self, tmp_path, store):
+        # Setup
+        path = tmp_path / "out.txt"
+        path.write_text("stored")
+        path.chmod(0o640)
+
+        # Execute
+        digest = store.ingest([str(path)])[str(path)]
+
+        # Verify
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+        if not os.path.samefile(path, store.object_path(digest)):
+            # Reflink or copy: the stored object is a file of its own
+            assert stat.S_IMODE(store.object_path(digest).stat().st_mode) == 0o444
+
+    def test_unlink_shared_removes_only_linked_files(self, tmp_path, store):
+        # Setup
+        linked, private = tmp_path / "linked.txt", tmp_path / "private.txt"
+        linked.write_text("stored")
+        private.write_text("private")
+        digest = store.ingest([str(linked)])[str(linked)]
+        store.restore({str(linked): digest})
+        os.link(store.object_path(digest), tmp_path / "hardlinked.txt")
+
+        # Execute
+        store.unlink_shared([str(linked), str(private), str(tmp_path / "missing.txt")])
+
+        # Verify
+        assert not linked.exists() or linked.stat().st_nlink == 1
+        assert private.read_text() == "private"
+        assert store.object_path(digest).read_text() == "stored"
+
+    def test_restore_links_stored_object(self, tmp_path, store):
+        # Setup
+        path = tmp_path / "out.txt"
+        path.write_text("stored")
+        hashes = store.ingest([str(path)])
+        path.unlink()
+
+        # Execute and verify
+        assert store.restore(hashes) is True
+        assert path.read_text() == "stored"
+
+    def test_restore_fails_without_object(self, tmp_path, store):
+        # Execute and verify
+        assert store.restore({str(tmp_path / "out.txt"): "ab" * 32}) is False
+
+    def test_gc_evicts_by_age_then_size(self, tmp_path, store):
+        # Setup
+        hashes = dict()
+        for name, content in (("old", "1"), ("middle", "22"), ("new", "333")):
+            (tmp_path / name).write_text(content)
+            hashes.update(store.ingest([str(tmp_path / name)]))
+        old, middle, new = (hashes[str(tmp_path / n)] for n in ("old", "middle", "new"))
+        with store._connection:
+            store._connection.execute("UPDATE objects SET last_used = ? WHERE digest = ?", (time.time() - 7200, old))
+            store._connection.execute("UPDATE objects SET last_used = ? WHERE digest = ?", (time.time() - 60, middle))
+
+        # Execute
+        result = store.gc(max_age=3600, max_size=3)
+
+        # Verify
+        assert result == {"evicted": 2, "evictedSize": 3, "remaining": 1, "remainingSize": 3}
+        assert not store.object_path(old).exists()
+        assert not store.object_path(middle).exists()
+        assert store.object_path(new).exists()
+        assert (tmp_path / "old").read_text() == "1"
+
+    def test_gc_dry_run_keeps_objects(self, tmp_path, store):
+        # Setup
+        (tmp_path / "out.txt").write_text("stored")
+        digest = store.ingest([str(tmp_path / "out.txt")])[str(tmp_path / "out.txt")]
+
+        # Execute
+        result = store.gc(max_size=0, dry_run=True)
+
+        # Verify
+        assert result["evicted"] == 1
+        assert store.object_path(digest).exists()
+
+
+class TestStepFiles:
+    def test_step_rewriting_linked_output_keeps_stored_object(self, tmp_path, store):
+        # Setup
+        path = tmp_path / "data.txt"
+        path.write_text("stored\n")
+        digest = store.ingest([str(path)])[str(path)]
+        os.link(store.object_path(digest), tmp_path / "other.txt")
+        store.restore({str(path): digest})
+        step = Step(id="write", command=f"echo written >> {path}", fileOutputs=[str(path)])
+
+        # Execute
+        with patch("cosmotech.orchestrator.core.step.ARTIFACT_STORE", store):
+            status = step.run()
+
+        # Verify
+        assert status == StepStatus.SUCCESS
+        assert path.read_text() == "written\n"
+        assert store.object_path(digest).read_text() == "stored\n"
+
+    def test_step_inputs_stay_linked(self, tmp_path, store):
+        # Setup
+        path = tmp_path / "data.txt"
+        path.write_text("stored\n")
+        digest = store.ingest([str(path)])[str(path)]
+        store.restore({str(path): digest})
+        inode = path.stat().st_ino
+        step = Step(id="read", command=f"cat {path}", fileInputs=[str(path)])
+
+        # Execute
+        with patch("cosmotech.orchestrator.core.step.ARTIFACT_STORE", store):
+            status = step.run()
+
+        # Verify
+        assert status == StepStatus.SUCCESS
+        assert path.stat().st_ino == inode
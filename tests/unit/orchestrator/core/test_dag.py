@@ -0,0 +1,157 @@
+import time
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.core.step import StepStatus
+
+
+def _mock_step(step_id, calls, expand=None, inputs=None, captured_output=None):
+    step = MagicMock(Step)
+    step.id = step_id
+    step.expand = expand or {}
+    step.inputs = inputs or {}
+    step.captured_output = captured_output or {}
+    step.check_env.return_value = {}
+    step.status = StepStatus.INITIALIZED
+
+    def _run(**kwargs):
+        calls.append((step_id, sorted(kwargs["previous"]), kwargs["input_data"]))
+        step.status = StepStatus.SUCCESS
+        return step.status
+
+    step.run.side_effect = _run
+    return step
+
+
+def _graph(*steps, edges=()):
+    graph = StepGraph(name="test")
+    for step in steps:
+        graph.add_step(step)
+    for precedent, index in edges:
+        graph.add_edge(precedent, index)
+    return graph
+
+
+class TestStepGraph:
+    def test_add_edge_updates_adjacency_and_in_degree(self):
+        # Setup
+        calls = list()
+        graph = _graph(_mock_step("a", calls), _mock_step("b", calls), _mock_step("c", calls), edges=[(0, 2), (1, 2)])
+
+        # Verify
+        assert len(graph) == 3
+        assert graph.predecessors == [[], [], [0, 1]]
+        assert graph.successors == [[2], [2], []]
+        assert graph.in_degree == [0, 0, 2]
+        assert graph.nodes["c"][1] == 2
+
+    def test_add_step_rejects_existing_id(self):
+        # Setup
+        calls = list()
+        graph = _graph(_mock_step("a", calls))
+
+        # Execute and verify
+        with pytest.raises(ValueError):
+            graph.add_step(_mock_step("a", calls))
+        assert len(graph) == 1
+
+    def test_evaluate_runs_steps_after_their_precedents(self):
+        # Setup
+        calls = list()
+        graph = _graph(_mock_step("a", calls), _mock_step("b", calls), _mock_step("c", calls), edges=[(0, 1), (1, 2)])
+
+        # Execute
+        graph.evaluate(max_workers=2)
+
+        # Verify
+        assert [c[0] for c in calls] == ["a", "b", "c"]
+        assert calls[2][1] == ["b"]
+
+    def test_evaluate_passes_outputs_of_precedents_as_inputs(self):
+        # Setup
+        calls = list()
+        producer = _mock_step("producer", calls, captured_output={"out": "value"})
+        consumer = _mock_step("consumer", calls, inputs={"in": {"stepId": "producer", "output": "out", "as": "IN"}})
+        graph = _graph(producer, consumer, edges=[(0, 1)])
+
+        # Execute
+        graph.evaluate()
+
+        # Verify
+        assert calls[1] == ("consumer", ["producer"], {"in": "value"})
+
+    def test_evaluate_runs_instances_before_dependents(self):
+        # Setup
+        calls = list()
+        discover = _mock_step("discover", calls, expand={"output": "items", "commandId": "process"})
+        graph = _graph(discover, _mock_step("report", calls), edges=[(0, 1)])
+        instances = [_mock_step("discover.0", calls), _mock_step("discover.1", calls)]
+
+        # Execute
+        with patch("cosmotech.orchestrator.core.dag.instance_steps", return_value=instances):
+            graph.evaluate(max_workers=2)
+
+        # Verify
+        assert calls[0][0] == "discover"
+        assert sorted(c[:2] for c in calls[1:3]) == [("discover.0", ["discover"]), ("discover.1", ["discover"])]
+        assert calls[3][:2] == ("report", ["discover", "discover.0", "discover.1"])
+        assert list(graph.nodes) == ["discover", "report", "discover.0", "discover.1"]
+
+    def test_cycle_lists_the_steps_waiting_for_each_other(self):
+        # Setup
+        calls = list()
+        steps = [_mock_step(step_id, calls) for step_id in ("start", "a", "b", "c", "end", "other")]
+        acyclic = _graph(*steps[:2], edges=[(0, 1)])
+        cyclic = _graph(*steps, edges=[(0, 1), (1, 2), (2, 3), (3, 1), (3, 4), (4, 5), (5, 4)])
+
+        # Execute and verify
+        assert acyclic.cycle() == []
+        assert cyclic.cycle() == ["a", "b", "c", "end", "other"]
+
+    def test_to_flowpipe_exports_the_graph(self):
+        # Setup
+        flowpipe = pytest.importorskip("flowpipe")
+        calls = list()
+        graph = _graph(_mock_step("a", calls), _mock_step("b", calls), edges=[(0, 1)])
+
+        # Execute
+        result = graph.to_flowpipe()
+
+        # Verify
+        assert isinstance(result, flowpipe.Graph)
+        nodes = {node.name: node for node in result.nodes}
+        assert nodes["a"] in nodes["b"].upstream_nodes
+
+    def test_evaluate_as_exit_ignores_precedent_status(self):
+        # Setup
+        calls = list()
+        failing, handler = _mock_step("failing", calls), MagicMock(Step, id="handler", expand={})
+        failing.run.side_effect = lambda **kwargs: setattr(failing, "status", StepStatus.ERROR)
+        graph = StepGraph(name="exit handlers", as_exit=True)
+        graph.add_step(failing)
+        graph.add_step(handler)
+        graph.add_edge(0, 1)
+
+        # Execute
+        graph.evaluate(max_workers=2)
+
+        # Verify
+        handler.run.assert_called_once_with(dry=False, as_exit=True, executor=graph.executor)
+
+    def test_evaluate_cancels_steps_not_started_before_timeout(self):
+        # Setup
+        calls = list()
+        slow, late = _mock_step("slow", calls), _mock_step("late", calls)
+        slow.run.side_effect = lambda **kwargs: time.sleep(0.3)
+        graph = _graph(slow, late, edges=[(0, 1)])
+
+        # Execute
+        graph.evaluate(timeout=0.1)
+
+        # Verify
+        late.run.assert_not_called()
+        assert late.status == StepStatus.CANCELLED
@@ -3,6 +3,8 @@ from unittest.mock import MagicMock, patch
 import os
 
 from cosmotech.orchestrator.core.environment import EnvironmentVariable
+from cosmotech.orchestrator.core.environment import layered_environment
+from cosmotech.orchestrator.core.environment import snapshot_environment
 
 
 class TestEnvironmentVariable:
@@ -91,13 +93,14 @@ class TestEnvironmentVariable:
         )
 
         # Execute
-        env_var1.join(env_var2)
+        result = env_var1.join(env_var2)
 
         # Verify
-        assert env_var1.value == "test_value"
-        assert env_var1.defaultValue == "default_value"
-        assert env_var1.description == "Original description"  # Original description is preserved
-        assert env_var1.optional is True
+        assert result.value == "test_value"
+        assert result.defaultValue == "default_value"
+        assert result.description == "Original description"  # Original description is preserved
+        assert result.optional is True
+        assert env_var1.value is None  # Joined variables are left untouched
 
     def test_join_preserves_original_values_when_other_has_none(self):
         # Setup
@@ -112,13 +115,13 @@ class TestEnvironmentVariable:
         env_var2 = EnvironmentVariable(name="TEST_VAR")
 
         # Execute
-        env_var1.join(env_var2)
+        result = env_var1.join(env_var2)
 
         # Verify
-        assert env_var1.value == "original_value"
-        assert env_var1.defaultValue == "original_default"
-        assert env_var1.description == "Original description"
-        assert env_var1.optional is False
+        assert result.value == "original_value"
+        assert result.defaultValue == "original_default"
+        assert result.description == "Original description"
+        assert result.optional is False
 
     def test_serialize_with_all_fields(self):
         # Setup
@@ -161,3 +164,60 @@ class TestEnvironmentVariable:
         assert "defaultValue" not in result
         assert result["description"] == "Test description"
         assert result["optional"] is True
+
+
+class TestLayeredEnvironment:
+    def test_layered_environment_shares_template_variables(self):
+        # Setup
+        shared = {
+            "SHARED_VAR": EnvironmentVariable(name="SHARED_VAR", defaultValue="shared"),
+            "COMMON_VAR": EnvironmentVariable(name="COMMON_VAR", defaultValue="template_default"),
+        }
+
+        # Execute
+        env = layered_environment({"COMMON_VAR": EnvironmentVariable(name="COMMON_VAR", value="step_value")}, shared)
+
+        # Verify
+        assert env["SHARED_VAR"] is shared["SHARED_VAR"]
+        assert env["COMMON_VAR"].value == "step_value"
+        assert env["COMMON_VAR"].defaultValue == "template_default"
+        assert shared["COMMON_VAR"].value is None
+
+    def test_layered_environment_writes_to_step_layer(self):
+        # Setup
+        shared = {"SHARED_VAR": EnvironmentVariable(name="SHARED_VAR", defaultValue="shared")}
+        env = layered_environment({}, shared)
+
+        # Execute
+        env["SHARED_VAR"] = EnvironmentVariable(name="SHARED_VAR", value="step_value")
+
+        # Verify
+        assert env["SHARED_VAR"].value == "step_value"
+        assert shared["SHARED_VAR"].value is None
+
+
+class TestSnapshotEnvironment:
+    @patch.dict(os.environ, {"PATH": "/usr/bin"}, clear=True)
+    def test_snapshot_environment_resolves_values(self):
+        # Setup
+        environment = {
+            "SET_VAR": EnvironmentVariable(name="SET_VAR", value="value"),
+            "OPTIONAL_VAR": EnvironmentVariable(name="OPTIONAL_VAR", optional=True),
+            "REQUIRED_VAR": EnvironmentVariable(name="REQUIRED_VAR", description="Required"),
+        }
+
+        # Execute
+        snapshot = snapshot_environment(environment)
+
+        # Verify
+        assert dict(snapshot.values) == {"SET_VAR": "value", "REQUIRED_VAR": "", "PATH": "/usr/bin"}
+        assert snapshot.unset == {"OPTIONAL_VAR", "REQUIRED_VAR"}
+        assert dict(snapshot.missing) == {"REQUIRED_VAR": "Required"}
+
+    def test_snapshot_environment_is_immutable(self):
+        # Setup
+        snapshot = snapshot_environment({"SET_VAR": EnvironmentVariable(name="SET_VAR", value="value")})
+
+        # Execute and verify
+        with pytest.raises(TypeError):
+            snapshot.values["SET_VAR"] = "other"
@@ -0,0 +1,68 @@
+import json
+from unittest.mock import MagicMock
+
+from cosmotech.orchestrator.core.events import EventBus
+from cosmotech.orchestrator.core.events import EventFileWriter
+from cosmotech.orchestrator.core.events import STEP_STARTED
+
+
+class TestEventBus:
+    def test_emit_calls_subscribers(self):
+        # Setup
+        bus = EventBus()
+        handler = MagicMock()
+        bus.subscribe(handler)
+
+        # Execute
+        event = bus.emit(STEP_STARTED, stepId="step1")
+
+        # Verify
+        handler.assert_called_once_with(event)
+        assert event["type"] == STEP_STARTED
+        assert event["stepId"] == "step1"
+        assert "time" in event
+
+    def test_unsubscribe_stops_delivery(self):
+        # Setup
+        bus = EventBus()
+        handler = MagicMock()
+        bus.subscribe(handler)
+
+        # Execute
+        bus.unsubscribe(handler)
+        bus.unsubscribe(handler)
+        bus.emit(STEP_STARTED, stepId="step1")
+
+        # Verify
+        handler.assert_not_called()
+
+    def test_failing_handler_does_not_stop_others(self):
+        # Setup
+        bus = EventBus()
+        failing = MagicMock(side_effect=RuntimeError("boom"))
+        handler = MagicMock()
+        bus.subscribe(failing)
+        bus.subscribe(handler)
+
+        # Execute
+        bus.emit(STEP_STARTED, stepId="step1")
+
+        # Verify
+        failing.assert_called_once()
+        handler.assert_called_once()
+
+
+class TestEventFileWriter:
+    def test_writes_json_lines(self, tmp_path):
+        # Setup
+        target = tmp_path / "events.jsonl"
+        writer = EventFileWriter(str(target))
+
+        # Execute
+        writer({"type": STEP_STARTED, "stepId": "step1"})
+        writer({"type": STEP_STARTED, "stepId": "step2"})
+        writer.close()
+
+        # Verify
+        lines = target.read_text().splitlines()
+        assert [json.loads(line)["stepId"] for line in lines] == ["step1", "step2"]
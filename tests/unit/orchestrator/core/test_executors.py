@@ -0,0 +1,167 @@
+import pytest
+
+from cosmotech.orchestrator.core.dag import StepGraph
+from cosmotech.orchestrator.core.events import EVENT_BUS
+from cosmotech.orchestrator.core.events import STEP_STARTED
+from cosmotech.orchestrator.core.executors import SimulatedExecutor
+from cosmotech.orchestrator.core.executors import StepExecutor
+from cosmotech.orchestrator.core.step import Step
+from cosmotech.orchestrator.core.step import StepStatus
+
+
+def _graph(executor, *steps, edges=()):
+    graph = StepGraph(name="test", executor=executor)
+    for step in steps:
+        graph.add_step(step)
+    for precedent, index in edges:
+        graph.add_edge(precedent, index)
+    return graph
+
+
+@pytest.fixture
+def starts():
+    """Simulated start time of each step"""
+    result = dict()
+    executors = list()
+
+    def _on_event(event):
+        if event["type"] == STEP_STARTED:
+            result[event["stepId"]] = executors[0].clock()
+
+    EVENT_BUS.subscribe(_on_event)
+    yield result, executors
+    EVENT_BUS.unsubscribe(_on_event)
+
+
+class TestStepExecutor:
+    def test_backends_have_to_implement_every_method(self):
+        # Setup
+        class PartialExecutor(StepExecutor):
+            def clock(self) -> float:
+                return 0.0
+
+        # Execute and verify
+        with pytest.raises(TypeError):
+            PartialExecutor()
+
+
+class TestSimulatedExecutor:
+    def test_evaluate_schedules_on_virtual_clock(self, starts):
+        # Setup
+        result, executors = starts
+        executor = SimulatedExecutor(
+            {"default": {"duration": 1}, "steps": {"a": {"duration": 4}, "b": {"duration": 2}}}
+        )
+        executors.append(executor)
+        graph = _graph(
+            executor,
+            Step(id="a", command="sleep 100"),
+            Step(id="b", command="sleep 100"),
+            Step(id="c", command="sleep 100"),
+            Step(id="d", command="sleep 100"),
+            edges=[(0, 3), (1, 3)],
+        )
+
+        # Execute
+        graph.evaluate(max_workers=2)
+
+        # Verify
+        assert result == {"a": 0.0, "b": 0.0, "c": 2.0, "d": 4.0}
+        assert executor.clock() == 5.0
+        assert graph.nodes["a"][0].duration == 4.0
+        assert all(step.status == StepStatus.SUCCESS for step in graph.steps)
+
+    def test_failures_skip_dependents(self):
+        # Setup
+        executor = SimulatedExecutor({"steps": {"a": {"returnCode": 3}, "b": {"failureRate": 1}}})
+        graph = _graph(
+            executor,
+            Step(id="a", command="true"),
+            Step(id="b", command="true"),
+            Step(id="c", command="true"),
+            edges=[(0, 2)],
+        )
+
+        # Execute
+        graph.evaluate()
+
+        # Verify
+        assert [step.status for step in graph.steps] == [
+            StepStatus.ERROR,
+            StepStatus.ERROR,
+            StepStatus.SKIPPED_AFTER_FAILURE,
+        ]
+
+    def test_outputs_and_resources_are_given_to_steps(self):
+        # Setup
+        executor = SimulatedExecutor(
+            {"steps": {"a": {"outputs": {"count": 3, "name": "x"}, "resources": {"maxMemory": 1024}}}}
+        )
+        graph = _graph(
+            executor,
+            Step(id="a", command="true", outputs={"count": {}, "name": {}}),
+            Step(id="b", command="true", inputs={"count": {"stepId": "a", "output": "count", "as": "COUNT"}}),
+            edges=[(0, 1)],
+        )
+
+        # Execute
+        graph.evaluate()
+
+        # Verify
+        a, b = graph.steps
+        assert a.captured_output == {"count": "3", "name": "x"}
+        assert a.resources == {"maxMemory": 1024}
+        assert b.status == StepStatus.SUCCESS
+
+    def test_step_timeout_cancels_long_steps(self):
+        # Setup
+        executor = SimulatedExecutor({"steps": {"slow": {"duration": 60}, "fast": {"duration": 1}}})
+        graph = _graph(executor, Step(id="slow", command="true"), Step(id="fast", command="true"))
+
+        # Execute
+        graph.evaluate(step_timeout=10)
+
+        # Verify
+        slow, fast = graph.steps
+        assert (slow.status, slow.duration) == (StepStatus.CANCELLED, 10.0)
+        assert fast.status == StepStatus.SUCCESS
+        assert executor.clock() == 10.0
+
+    def test_timeout_cancels_steps_not_started(self):
+        # Setup
+        executor = SimulatedExecutor({"default": {"duration": 3}})
+        graph = _graph(
+            executor,
+            Step(id="a", command="true"),
+            Step(id="b", command="true"),
+            Step(id="c", command="true"),
+            edges=[(0, 1), (1, 2)],
+        )
+
+        # Execute
+        graph.evaluate(timeout=5)
+
+        # Verify
+        assert [step.status for step in graph.steps] == [
+            StepStatus.SUCCESS,
+            StepStatus.CANCELLED,
+            StepStatus.CANCELLED,
+        ]
+        assert graph.steps[1].duration == 2.0
+
+    def test_random_draws_only_depend_on_seed_and_step(self):
+        # Setup
+        spec = {"seed": 7, "default": {"duration": [1, 10], "failureRate": 0.5}}
+
+        # Execute
+        runs = list()
+        for order in (["a", "b", "c"], ["c", "b", "a"]):
+            graph = _graph(SimulatedExecutor(spec), *(Step(id=i, command="true") for i in order))
+            graph.evaluate(max_workers=1)
+            runs.append({step.id: (step.status, step.duration) for step in graph.steps})
+
+        # Verify
+        assert {k: status for k, (status, _) in runs[0].items()} == {k: status for k, (status, _) in runs[1].items()}
+        assert {k: duration for k, (_, duration) in runs[0].items()} == pytest.approx(
+            {k: duration for k, (_, duration) in runs[1].items()}
+        )
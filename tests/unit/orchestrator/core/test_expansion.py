@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import pytest
+
+from cosmotech.orchestrator.core.command_template import CommandTemplate
+from cosmotech.orchestrator.core.environment import EnvironmentVariable
+from cosmotech.orchestrator.core.expansion import check_instance_ids
+from cosmotech.orchestrator.core.expansion import instance_steps
+from cosmotech.orchestrator.core.step import Step
+
+
+@pytest.fixture
+def process_template():
+    template = CommandTemplate(id="process", command="echo", environment={"name": {"optional": True}})
+    with patch("cosmotech.orchestrator.templates.library.Library.find_template_by_name", return_value=template):
+        yield template
+
+
+class TestInstanceSteps:
+    def test_instance_steps_sets_item_environment(self, process_template):
+        # Setup
+        step = Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"})
+        step.expansion_items = ["a", {"name": "b", "size": 2, "PATH": "/tmp"}]
+
+        # Execute
+        instances = instance_steps(step)
+
+        # Verify
+        assert [i.id for i in instances] == ["discover.0", "discover.1"]
+        assert all(i.precedents == ["discover"] for i in instances)
+        assert instances[0].environment["CSM_ORC_EXPAND_ITEM"].value == "a"
+        assert instances[1].environment["CSM_ORC_EXPAND_INDEX"].value == "1"
+        assert instances[1].environment["name"].value == "b"
+        assert "size" not in instances[1].environment
+        assert "PATH" not in instances[1].environment
+        assert instances[1].environment["CSM_ORC_EXPAND_ITEM"].value == '{"name": "b", "size": 2, "PATH": "/tmp"}'
+
+    def test_item_keys_can_not_replace_expansion_variables(self, process_template):
+        # Setup
+        process_template.environment["CSM_ORC_EXPAND_INDEX"] = EnvironmentVariable("CSM_ORC_EXPAND_INDEX")
+        step = Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"})
+        step.expansion_items = [{"CSM_ORC_EXPAND_INDEX": "7"}]
+
+        # Execute
+        instances = instance_steps(step)
+
+        # Verify
+        assert instances[0].environment["CSM_ORC_EXPAND_INDEX"].value == "0"
+
+    def test_check_instance_ids_rejects_reserved_ids(self, process_template):
+        # Setup
+        steps = [
+            Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"}),
+            Step(id="discover.1", command="echo"),
+        ]
+
+        # Execute and verify
+        with pytest.raises(ValueError, match="discover.1"):
+            check_instance_ids(steps)
+
+    def test_check_instance_ids_accepts_other_ids(self, process_template):
+        # Setup
+        steps = [
+            Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"}),
+            Step(id="discover.final", command="echo"),
+            Step(id="discover.01", command="echo"),
+            Step(id="other.1", command="echo"),
+        ]
+
+        # Execute and verify
+        check_instance_ids(steps)
+
+    def test_step_reads_expansion_items(self, process_template):
+        # Setup
+        step = Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"})
+        step.captured_output = {"items": '["a", "b"]'}
+
+        # Execute and verify
+        assert step._read_expansion_items() is True
+        assert step.expansion_items == ["a", "b"]
+
+    def test_step_rejects_invalid_expansion_items(self, process_template):
+        # Setup
+        step = Step(id="discover", command="echo", expand={"output": "items", "commandId": "process"})
+        step.captured_output = {"items": '{"a": 1}'}
+
+        # Execute and verify
+        assert step._read_expansion_items() is False
+
+    def test_step_requires_expansion_template(self):
+        # Execute and verify
+        with patch("cosmotech.orchestrator.templates.library.Library.find_template_by_name", return_value=None):
+            with pytest.raises(ValueError):
+                Step(id="discover", command="echo", expand={"output": "items", "commandId": "missing"})
@@ -0,0 +1,71 @@
+import pytest
+
+from cosmotech.orchestrator.core.events import EventBus
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.events import STEP_STARTED
+from cosmotech.orchestrator.core.history import GROUP_BY_TEMPLATE
+from cosmotech.orchestrator.core.history import StepHistory
+from cosmotech.orchestrator.core.history import percentile
+
+
+def _finished(step_id, duration, status="SUCCESS", command_id="template", time=0.0):
+    return {
+        "type": STEP_FINISHED,
+        "time": time,
+        "stepId": step_id,
+        "commandId": command_id,
+        "exitHandler": False,
+        "status": status,
+        "duration": duration,
+        "resources": {"userTime": 0.1, "systemTime": 0.01, "maxMemory": 1024},
+    }
+
+
+class TestPercentile:
+    def test_percentile_interpolates(self):
+        # Verify
+        assert percentile([], 50) is None
+        assert percentile([4.0], 99) == 4.0
+        assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+        assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+
+
+class TestStepHistory:
+    def test_recorder_stores_finished_steps(self, tmp_path):
+        # Setup
+        history = StepHistory(str(tmp_path / "stats" / "history.db"))
+        bus = EventBus()
+        bus.subscribe(history.recorder("project"))
+
+        # Execute
+        bus.emit(STEP_STARTED, stepId="step1")
+        bus.emit(STEP_FINISHED, stepId="step1", commandId="t1", exitHandler=False, status="SUCCESS", duration=1.5)
+        bus.emit(STEP_FINISHED, stepId="step2", commandId="t1", exitHandler=False, status="ERROR", duration=0.5)
+
+        # Verify
+        assert history.durations() == {("project", "step1"): [1.5]}
+        assert history.durations(GROUP_BY_TEMPLATE) == {("t1",): [1.5]}
+        history.close()
+
+    def test_statistics_flag_regressions(self, tmp_path):
+        # Setup
+        history = StepHistory(str(tmp_path / "history.db"))
+        for i in range(10):
+            history.record("run", "project", _finished("stable", 1.0, time=i))
+            history.record("run", "project", _finished("slower", 1.0 if i < 5 else 2.0, time=i))
+        history.record("run", "project", _finished("young", 3.0, time=0))
+
+        # Execute
+        stats = {s["stepId"]: s for s in history.statistics(recent=5, threshold=0.2)}
+
+        # Verify
+        assert stats["stable"]["count"] == 10
+        assert stats["stable"]["p50"] == 1.0
+        assert not stats["stable"]["regression"]
+        assert stats["slower"]["baselineP50"] == 1.0
+        assert stats["slower"]["recentP50"] == 2.0
+        assert stats["slower"]["p95"] == pytest.approx(2.0)
+        assert stats["slower"]["regression"]
+        assert stats["young"]["baselineP50"] is None
+        assert not stats["young"]["regression"]
+        history.close()
@@ -1,9 +1,11 @@
+import json
 from unittest.mock import MagicMock
 from unittest.mock import mock_open
 from unittest.mock import patch
 
 import pytest
 
+from cosmotech.orchestrator.core.dag import StepGraph
 from cosmotech.orchestrator.core.orchestrator import FileLoader
 from cosmotech.orchestrator.core.orchestrator import Orchestrator
 from cosmotech.orchestrator.core.step import Step
@@ -124,6 +126,82 @@ class TestFileLoader:
         assert mock_step1.skipped is True
         assert mock_step2.skipped is False
 
+    @staticmethod
+    def _write(path, steps):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"steps": steps}))
+        return str(path)
+
+    def test_call_flattens_included_steps(self, tmp_path):
+        # Setup
+        self._write(
+            tmp_path / "shared" / "etl.json",
+            [
+                {"id": "fetch", "command": "echo", "outputs": {"f": {}}, "environment": {"TARGET": {"value": "x"}}},
+                {
+                    "id": "load",
+                    "command": "echo",
+                    "precedents": ["fetch"],
+                    "inputs": {"f": {"stepId": "fetch", "output": "f", "as": "F"}},
+                },
+                {"id": "other", "command": "echo"},
+            ],
+        )
+        run_path = self._write(
+            tmp_path / "run.json",
+            [
+                {"id": "start", "command": "echo"},
+                {
+                    "id": "etl",
+                    "include": "shared/etl.json",
+                    "precedents": ["start"],
+                    "environment": {"TARGET": {"value": "adx"}},
+                },
+                {"id": "report", "command": "echo", "precedents": ["etl"]},
+            ],
+        )
+
+        # Execute
+        steps = FileLoader(run_path)()
+
+        # Verify
+        assert list(steps) == ["start", "etl.fetch", "etl.load", "etl.other", "report"]
+        assert steps["etl.fetch"].precedents == ["start"]
+        assert steps["etl.other"].precedents == ["start"]
+        assert steps["etl.load"].precedents == ["etl.fetch"]
+        assert steps["etl.load"].inputs["f"]["stepId"] == "etl.fetch"
+        assert steps["report"].precedents == ["etl.load", "etl.other"]
+        assert steps["etl.fetch"].environment["TARGET"].value == "adx"
+
+    def test_call_skips_every_included_step(self, tmp_path):
+        # Setup
+        self._write(tmp_path / "sub.json", [{"id": "a", "command": "echo"}, {"id": "b", "command": "echo"}])
+        run_path = self._write(tmp_path / "run.json", [{"id": "sub", "include": "sub.json"}])
+
+        # Execute
+        steps = FileLoader(run_path)(skipped_steps=["sub"])
+
+        # Verify
+        assert all(s.skipped for s in steps.values())
+
+    def test_call_raises_error_on_include_cycle(self, tmp_path):
+        # Setup
+        self._write(tmp_path / "sub.json", [{"id": "back", "include": "run.json"}])
+        run_path = self._write(tmp_path / "run.json", [{"id": "sub", "include": "sub.json"}])
+
+        # Execute and verify
+        with pytest.raises(ValueError):
+            FileLoader(run_path)()
+
+    def test_call_raises_error_on_invalid_include_keys(self, tmp_path):
+        # Setup
+        self._write(tmp_path / "sub.json", [{"id": "a", "command": "echo"}])
+        run_path = self._write(tmp_path / "run.json", [{"id": "sub", "include": "sub.json", "outputs": {"o": {}}}])
+
+        # Execute and verify
+        with pytest.raises(ValueError):
+            FileLoader(run_path)()
+
 
 class TestOrchestrator:
     @patch("cosmotech.orchestrator.core.orchestrator.FileLoader")
@@ -244,12 +322,8 @@ class TestOrchestrator:
         assert steps["step1"][0] == mock_step1
         assert graph is not None
 
-    @patch("flowpipe.Graph")
-    def test_load_from_json_content(self, mock_graph_class):
+    def test_load_from_json_content(self):
         # Setup
-        mock_graph = MagicMock()
-        mock_graph_class.return_value = mock_graph
-
         # Create mock steps
         mock_step1 = MagicMock()
         mock_step1.id = "step1"
@@ -270,14 +344,12 @@ class TestOrchestrator:
         # Verify
         assert "step1" in result_steps
         assert "step2" in result_steps
-        assert result_graph == mock_graph
+        assert isinstance(result_graph, StepGraph)
+        assert result_graph.predecessors == [[], [0]]
+        assert result_graph.in_degree == [0, 1]
 
-    @patch("flowpipe.Graph")
-    def test_load_from_json_content_with_data_flow(self, mock_graph_class):
+    def test_load_from_json_content_with_data_flow(self):
         # Setup
-        mock_graph = MagicMock()
-        mock_graph_class.return_value = mock_graph
-
         # Create mock steps
         mock_step1 = MagicMock()
         mock_step1.id = "step1"
@@ -299,14 +371,10 @@ class TestOrchestrator:
         # Verify
         assert "step1" in result_steps
         assert "step2" in result_steps
-        assert result_graph == mock_graph
+        assert result_graph.successors == [[1], []]
 
-    @patch("flowpipe.Graph")
-    def test_load_from_json_content_with_missing_precedent(self, mock_graph_class):
+    def test_load_from_json_content_with_missing_precedent(self):
         # Setup
-        mock_graph = MagicMock()
-        mock_graph_class.return_value = mock_graph
-
         # Create mock steps
         mock_step1 = MagicMock()
         mock_step1.id = "step1"
@@ -318,3 +386,18 @@ class TestOrchestrator:
         # Execute and verify
         with pytest.raises(ValueError):
             Orchestrator._load_from_json_content("test_file.json", steps)
+
+    def test_load_from_json_content_with_cycle(self):
+        # Setup
+        steps = dict()
+        for step_id, precedents in (("start", []), ("a", ["start", "b"]), ("b", ["a"]), ("end", ["b"])):
+            step = MagicMock()
+            step.id = step_id
+            step.precedents = precedents
+            step.inputs = {}
+            step.check_env.return_value = {}
+            steps[step_id] = step
+
+        # Execute and verify
+        with pytest.raises(ValueError, match="Steps a, b depend on each other"):
+            Orchestrator._load_from_json_content("test_file.json", steps)
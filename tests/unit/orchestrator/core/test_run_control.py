@@ -0,0 +1,111 @@
+import signal
+import subprocess
+import time
+
+from cosmotech.orchestrator.core.events import STEP_FINISHED
+from cosmotech.orchestrator.core.run_control import RunControl
+
+
+def _sleeping_process():
+    return subprocess.Popen(["sleep", "30"], start_new_session=True)
+
+
+class TestRunControl:
+    def test_cancel_signals_registered_processes(self):
+        # Setup
+        control = RunControl()
+        process = _sleeping_process()
+        control.register("step1", process)
+
+        # Execute
+        signalled = control.cancel(reason="test")
+
+        # Verify
+        assert signalled == ["step1"]
+        assert process.wait(timeout=5) == -signal.SIGTERM
+        assert control.cancelled
+        assert control.reason == "test"
+        assert control.was_signalled("step1")
+        assert not control.was_signalled("step2")
+
+    def test_register_after_cancel_signals_immediately(self):
+        # Setup
+        control = RunControl()
+        control.cancel(reason="test")
+        process = _sleeping_process()
+
+        # Execute
+        control.register("step1", process)
+
+        # Verify
+        assert process.wait(timeout=5) == -signal.SIGTERM
+        control.reset()
+        assert not control.cancelled
+        assert not control.was_signalled("step1")
+
+    def test_fail_fast_handler_cancels_on_step_error(self):
+        # Setup
+        control = RunControl()
+        handler = control.fail_fast_handler()
+
+        # Execute
+        handler({"type": STEP_FINISHED, "stepId": "exit", "status": "ERROR", "exitHandler": True})
+        handler({"type": STEP_FINISHED, "stepId": "ok", "status": "SUCCESS", "exitHandler": False})
+        assert not control.cancelled
+        handler({"type": STEP_FINISHED, "stepId": "failed", "status": "ERROR", "exitHandler": False})
+
+        # Verify
+        assert control.cancelled
+        assert control.reason == "failed"
+
+    def test_terminate_kills_steps_after_drain_timeout(self):
+        # Setup
+        control = RunControl()
+        stubborn = subprocess.Popen(["bash", "-c", "trap '' TERM; sleep 30 & wait"], start_new_session=True)
+        time.sleep(0.2)
+        control.register("stubborn", stubborn)
+
+        # Execute
+        control.terminate("SIGTERM", drain_timeout=0.2, grace_period=10)
+
+        # Verify
+        assert stubborn.wait(timeout=5) == -signal.SIGKILL
+        assert control.cancelled
+        assert 0 < control.remaining() <= 10
+        control.reset()
+        assert control.remaining() is None
+
+    def test_time_box_kills_exit_handlers(self):
+        # Setup
+        control = RunControl()
+        control.cancel(reason="test")
+        process = _sleeping_process()
+
+        # Execute
+        with control.time_box(0.1):
+            control.register("exit", process, cancellable=False)
+            assert process.poll() is None
+            return_code = process.wait(timeout=5)
+
+        # Verify
+        assert return_code == -signal.SIGKILL
+
+    def test_time_box_of_steps_kills_only_these_steps(self):
+        # Setup
+        control = RunControl()
+        boxed = _sleeping_process()
+        other = _sleeping_process()
+        control.register("other", other, cancellable=False)
+
+        # Execute
+        with control.time_box(0.1, ["boxed"]):
+            time.sleep(0.3)
+            # Registered once its time box ended
+            control.register("boxed", boxed, cancellable=False)
+            return_code = boxed.wait(timeout=5)
+
+        # Verify
+        assert return_code == -signal.SIGKILL
+        assert other.poll() is None
+        control.kill(cancellable_only=False)
+        other.wait(timeout=5)
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock, patch
-import flowpipe
+
+flowpipe = pytest.importorskip("flowpipe")
 
 from cosmotech.orchestrator.core.runner import Runner
 from cosmotech.orchestrator.core.step import Step
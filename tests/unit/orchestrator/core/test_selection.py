@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from cosmotech.orchestrator.core.selection import StepSelection
+from cosmotech.orchestrator.core.selection import read_step_outputs
+from cosmotech.orchestrator.core.step import Step
+
+
+def _steps():
+    return {
+        "a": Step(id="a", command="echo", outputs={"x": {}}),
+        "b": Step(id="b", command="echo", precedents=["a"], inputs={"i": {"stepId": "a", "output": "x", "as": "I"}}),
+        "c": Step(id="c", command="echo", precedents=["b"]),
+        "d": Step(id="d", command="echo"),
+    }
+
+
+class TestStepSelection:
+    def test_selected_closures(self):
+        # Setup
+        predecessors = {"a": [], "b": ["a"], "c": ["b"], "d": []}
+
+        # Verify
+        assert StepSelection(from_steps=["b"]).selected(predecessors) == {"b", "c"}
+        assert StepSelection(until_steps=["b"]).selected(predecessors) == {"a", "b"}
+        assert StepSelection(from_steps=["b"], until_steps=["b"]).selected(predecessors) == {"b"}
+        assert StepSelection(only=["d"], from_steps=["c"]).selected(predecessors) == {"c", "d"}
+        assert not StepSelection()
+        with pytest.raises(ValueError):
+            StepSelection(only=["unknown"]).selected(predecessors)
+
+    def test_apply_reuses_previous_outputs(self):
+        # Setup
+        steps = _steps()
+        selection = StepSelection(from_steps=["b"], previous_outputs={"a": {"x": "hello"}})
+
+        # Execute
+        selected = selection.apply(steps)
+
+        # Verify
+        assert selected == {"b", "c"}
+        assert steps["a"].skipped and steps["d"].skipped
+        assert not steps["b"].skipped
+        assert steps["a"].captured_output == {"x": "hello"}
+
+    def test_apply_fails_on_missing_outputs(self):
+        # Execute & Verify
+        with pytest.raises(ValueError):
+            StepSelection(only=["b"]).apply(_steps())
+
+
+class TestReadStepOutputs:
+    def test_keeps_last_successful_execution(self, tmp_path):
+        # Setup
+        events = [
+            {"type": "step_started", "stepId": "a"},
+            {"type": "step_output", "stepId": "a", "output": "x", "value": "1"},
+            {"type": "step_output", "stepId": "a", "output": "secret", "hidden": True},
+            {"type": "step_finished", "stepId": "a", "status": "SUCCESS"},
+            {"type": "step_started", "stepId": "b"},
+            {"type": "step_output", "stepId": "b", "output": "y", "value": "2"},
+            {"type": "step_finished", "stepId": "b", "status": "ERROR"},
+        ]
+        event_file = tmp_path / "events.jsonl"
+        event_file.write_text("\n".join(json.dumps(e) for e in events) + "\nnot json\n")
+
+        # Execute
+        outputs = read_step_outputs(str(event_file))
+
+        # Verify
+        assert outputs == {"a": {"x": "1"}}
@@ -8,7 +8,10 @@ import queue
 import sys
 from pathlib import Path
 
+from cosmotech.orchestrator.core.events import EVENT_BUS, STEP_FINISHED, STEP_OUTPUT, STEP_STARTED
+from cosmotech.orchestrator.core.run_control import RUN_CONTROL
 from cosmotech.orchestrator.core.step import Step, StepStatus
+from cosmotech.orchestrator.core.command_template import CommandTemplate
 from cosmotech.orchestrator.core.environment import EnvironmentVariable
 from cosmotech.orchestrator.templates.library import Library
 
@@ -116,6 +119,21 @@ class TestStep:
         assert step.environment["COMMON_VAR"].value == "step_value"
         assert step.description == "Step description"
 
+    @patch("cosmotech.orchestrator.core.step.Library")
+    def test_load_command_from_library_keeps_template_environment(self, mock_library_class):
+        # Setup
+        template = CommandTemplate(id="test-template", command="echo", environment={"COMMON_VAR": {}})
+        mock_library_class.return_value.find_template_by_name.return_value = template
+
+        # Execute
+        first = Step(id="first", commandId="test-template", environment={"COMMON_VAR": {"value": "first"}})
+        second = Step(id="second", commandId="test-template")
+
+        # Verify
+        assert first.environment["COMMON_VAR"].value == "first"
+        assert second.environment["COMMON_VAR"].value is None
+        assert template.environment["COMMON_VAR"].value is None
+
     def test_serialize(self):
         # Setup
         step = Step(
@@ -239,6 +257,93 @@ class TestStep:
         mock_popen.assert_called_once()
         mock_remove.assert_called_once_with("/tmp/test_file")
 
+    @patch("tempfile.NamedTemporaryFile")
+    @patch("subprocess.Popen")
+    @patch("os.remove")
+    def test_run_emits_step_events(self, mock_remove, mock_popen, mock_temp_file):
+        # Setup
+        mock_temp_file.return_value.name = "/tmp/test_file"
+        mock_process = MagicMock()
+        mock_process.stdout.readline.side_effect = ["CSM-OUTPUT-DATA:output1:value1\n", ""]
+        mock_process.stderr.readline.side_effect = [""]
+        mock_process.poll.side_effect = [None, 0]
+        mock_process.wait.return_value = 0
+        mock_popen.return_value = mock_process
+
+        step = Step(id="test-step", command="echo")
+        events = []
+        EVENT_BUS.subscribe(events.append)
+
+        # Execute
+        try:
+            step.run()
+        finally:
+            EVENT_BUS.unsubscribe(events.append)
+
+        # Verify
+        assert [e["type"] for e in events] == [STEP_STARTED, STEP_OUTPUT, STEP_FINISHED]
+        assert events[1]["output"] == "output1"
+        assert events[1]["value"] == "value1"
+        assert events[2]["status"] == "SUCCESS"
+        assert events[2]["duration"] >= 0
+
+    def test_steps_not_launched_emit_no_start_event(self):
+        # Setup
+        skipped = Step(id="skipped-step", command="echo")
+        skipped.skipped = True
+        dry = Step(id="dry-step", command="echo")
+        events = []
+        EVENT_BUS.subscribe(events.append)
+
+        # Execute
+        try:
+            skipped.run()
+            dry.run(dry=True)
+        finally:
+            EVENT_BUS.unsubscribe(events.append)
+
+        # Verify
+        assert [(e["type"], e["stepId"]) for e in events] == [
+            (STEP_FINISHED, "skipped-step"),
+            (STEP_FINISHED, "dry-step"),
+        ]
+        assert [e["status"] for e in events] == ["SKIPPED_BY_USER", "DRY_RUN"]
+
+    def test_run_cancelled_does_not_start_process(self):
+        # Setup
+        step = Step(id="test-step", command="echo")
+        RUN_CONTROL.cancel(reason="test")
+
+        # Execute
+        try:
+            with patch("subprocess.Popen") as mock_popen:
+                status = step.run()
+            exit_status = Step(id="exit-step", command="true").run(as_exit=True)
+        finally:
+            RUN_CONTROL.reset()
+
+        # Verify
+        mock_popen.assert_not_called()
+        assert status == StepStatus.CANCELLED
+        assert exit_status == StepStatus.SUCCESS
+
+    def test_poll_process_records_resources(self):
+        # Setup
+        step = Step(id="test-step", command="echo")
+        process = subprocess.Popen(["true"])
+        process.wait = MagicMock()
+
+        # Execute
+        return_code = None
+        while return_code is None:
+            return_code = step._poll_process(process)
+
+        # Verify
+        assert return_code == 0
+        assert process.returncode == 0
+        assert set(step.resources) == {"userTime", "systemTime", "maxMemory"}
+        assert step._poll_process(process) == 0
+
     def test_run_with_dry_run(self):
         # Setup
         step = Step(id="test-step", command="echo", arguments=["Hello", "World"])
@@ -379,6 +484,25 @@ class TestStep:
         assert result["ENV_VAR1"] == "Required var 1"
         assert "ENV_VAR2" not in result
 
+    def test_check_env_and_effective_env_share_snapshot(self):
+        # Setup
+        env_var = MagicMock()
+        env_var.is_required.return_value = False
+        env_var.effective_value.return_value = "value"
+
+        step = Step(id="test-step", command="echo")
+        step.environment = {"ENV_VAR": env_var}
+
+        # Execute
+        step.check_env()
+        result = step._effective_env()
+        result["INPUT_VAR"] = "input"
+
+        # Verify
+        env_var.effective_value.assert_called_once()
+        assert step._effective_env()["ENV_VAR"] == "value"
+        assert "INPUT_VAR" not in step.snapshot_env().values
+
     def test_check_env_returns_empty_dict_for_skipped_step(self):
         # Setup
         env_var1 = MagicMock()
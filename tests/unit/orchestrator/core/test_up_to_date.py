@@ -0,0 +1,150 @@
+import os
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from cosmotech.orchestrator.core.artifacts import ArtifactStore
+from cosmotech.orchestrator.core.up_to_date import UpToDateState
+from cosmotech.orchestrator.core.up_to_date import expand_patterns
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "in.txt").write_text("input")
+    (tmp_path / "out.txt").write_text("output")
+    os.utime(tmp_path / "in.txt", (1000, 1000))
+    os.utime(tmp_path / "out.txt", (2000, 2000))
+    return tmp_path
+
+
+@pytest.fixture
+def state(files):
+    _state = UpToDateState()
+    _state.open(str(files / "state.json"))
+    yield _state
+    _state.close()
+
+
+def _step(command="build"):
+    step = MagicMock()
+    step.id = "build"
+    step.command = command
+    step.arguments = []
+    step.fileInputs = ["$DIR/*.txt"]
+    step.fileOutputs = ["$DIR/out.txt"]
+    step.outputs = {"count": {}}
+    step.captured_output = {"count": "1"}
+    return step
+
+
+class TestExpandPatterns:
+    def test_expand_patterns_replaces_environment_variables(self, files):
+        # Execute
+        result = expand_patterns(["$DIR/*.txt", "${DIR}/missing.txt"], {"DIR": str(files)})
+
+        # Verify
+        assert result == [str(files / "in.txt"), str(files / "out.txt")]
+
+
+class TestUpToDateState:
+    def test_is_up_to_date_after_record(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+        step = _step()
+        step.captured_output = {}
+
+        # Execute and verify
+        assert state.is_up_to_date(step, env) is True
+        assert step.captured_output == {"count": "1"}
+
+    def test_is_not_up_to_date_without_record(self, files, state):
+        # Execute and verify
+        assert state.is_up_to_date(_step(), {"DIR": str(files)}) is False
+
+    def test_is_not_up_to_date_when_command_changed(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+
+        # Execute and verify
+        assert state.is_up_to_date(_step(command="build --all"), env) is False
+
+    def test_is_up_to_date_when_touched_input_is_unchanged(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+        os.utime(files / "in.txt", (3000, 3000))
+
+        # Execute and verify
+        assert state.is_up_to_date(_step(), env) is True
+
+    def test_is_not_up_to_date_when_input_changed(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+        (files / "in.txt").write_text("new input")
+        os.utime(files / "in.txt", (3000, 3000))
+
+        # Execute and verify
+        assert state.is_up_to_date(_step(), env) is False
+
+    def test_is_not_up_to_date_when_new_input_is_older_than_outputs(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+        (files / "other.txt").write_text("older input")
+        os.utime(files / "other.txt", (500, 500))
+
+        # Execute and verify
+        assert state.is_up_to_date(_step(), env) is False
+
+    def test_is_not_up_to_date_when_output_missing(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+        (files / "out.txt").unlink()
+
+        # Execute and verify
+        assert state.is_up_to_date(_step(), env) is False
+
+    def test_record_skips_steps_with_hidden_outputs(self, files, state):
+        # Setup
+        step = _step()
+        step.outputs = {"count": {"hidden": True}}
+
+        # Execute
+        state.record(step, {"DIR": str(files)})
+
+        # Verify
+        assert state.records == {}
+
+    def test_close_writes_records(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        state.record(_step(), env)
+
+        # Execute
+        state.close()
+        state.open(str(files / "state.json"))
+
+        # Verify
+        assert state.is_up_to_date(_step(), env) is True
+
+    def test_is_up_to_date_restores_missing_output_from_artifact_store(self, files, state):
+        # Setup
+        env = {"DIR": str(files)}
+        store = ArtifactStore()
+        store.open(str(files / "store"))
+        state.record(_step(), env, store.ingest([str(files / "out.txt")]))
+        (files / "out.txt").unlink()
+
+        # Execute
+        with patch("cosmotech.orchestrator.core.up_to_date.ARTIFACT_STORE", store):
+            result = state.is_up_to_date(_step(), env)
+        store.close()
+
+        # Verify
+        assert result is True
+        assert (files / "out.txt").read_text() == "output"
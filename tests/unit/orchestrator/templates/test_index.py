@@ -0,0 +1,62 @@
+from cosmotech.orchestrator.core.command_template import CommandTemplate
+from cosmotech.orchestrator.templates.index import TemplateIndex
+from cosmotech.orchestrator.templates.index import sort_key
+
+
+def make_templates():
+    return [
+        CommandTemplate(id="load-data", command="echo", description="Load the dataset", sourcePlugin="plugin2"),
+        CommandTemplate(
+            id="run-simulation",
+            command="echo",
+            description="Run the simulator",
+            environment={"CSM_SIMULATION_ID": {}},
+            sourcePlugin="plugin1",
+        ),
+        CommandTemplate(id="apply-data", command="echo", description="Send results", sourcePlugin="plugin1"),
+        CommandTemplate(id="no-plugin", command="echo"),
+    ]
+
+
+class TestTemplateIndex:
+    def test_templates_sorted_by_plugin_then_id(self):
+        # Execute
+        index = TemplateIndex(make_templates())
+
+        # Verify
+        assert [t.id for t in index.templates] == ["no-plugin", "apply-data", "run-simulation", "load-data"]
+        assert len(index) == 4
+
+    def test_search_by_prefix_in_id_description_and_environment(self):
+        # Setup
+        index = TemplateIndex(make_templates())
+
+        # Execute and verify
+        assert [t.id for t in index.search("dat")[0]] == ["apply-data", "load-data"]
+        assert [t.id for t in index.search("simulator")[0]] == ["run-simulation"]
+        assert [t.id for t in index.search("csm_simulation")[0]] == ["run-simulation"]
+        assert [t.id for t in index.search("data load")[0]] == ["load-data"]
+        assert index.search("unknown") == ([], False)
+
+    def test_search_by_source_plugin(self):
+        # Setup
+        index = TemplateIndex(make_templates())
+
+        # Execute and verify
+        assert [t.id for t in index.search(source_plugin="plugin1")[0]] == ["apply-data", "run-simulation"]
+        assert [t.id for t in index.search("data", source_plugin="plugin2")[0]] == ["load-data"]
+        assert index.search(source_plugin="missing") == ([], False)
+
+    def test_search_pagination(self):
+        # Setup
+        index = TemplateIndex(make_templates())
+
+        # Execute
+        first_page, more = index.search(limit=3)
+        second_page, last_more = index.search(after=sort_key(first_page[-1]), limit=3)
+
+        # Verify
+        assert more is True
+        assert [t.id for t in first_page] == ["no-plugin", "apply-data", "run-simulation"]
+        assert last_more is False
+        assert [t.id for t in second_page] == ["load-data"]
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
@@ -85,6 +86,51 @@ class TestLibrary:
         assert template1 in result
         assert template2 in result
 
+    def test_templates_index_follows_library_changes(self):
+        # Setup
+        library = Library()
+        library._Library__templates = {}
+        library.add_template(CommandTemplate(id="template1", command="echo", sourcePlugin="plugin1"))
+        first_index = library.index
+
+        # Execute
+        library.add_template(CommandTemplate(id="template2", command="ls", sourcePlugin="plugin0"))
+
+        # Verify
+        assert library.index is not first_index
+        assert library.index is library.index
+        assert [t.id for t in library.templates] == ["template2", "template1"]
+
+    def test_refresh_reads_changed_template_files(self, tmp_path):
+        # Setup
+        templates_dir = tmp_path / "templates"
+        templates_dir.mkdir()
+        (templates_dir / "first.json").write_text(json.dumps({"id": "template1", "command": "echo"}))
+        (templates_dir / "second.json").write_text(json.dumps({"id": "template2", "command": "ls"}))
+        plugin = Plugin(str(tmp_path / "__init__.py"))
+        library = Library()
+        library._Library__templates = {}
+        library._Library__plugins = {}
+        library._Library__exit_templates = []
+        library.load_plugin(plugin, plugin_module=MagicMock(__path__=[str(tmp_path)]))
+        extra = CommandTemplate(id="extra", command="echo")
+        library.add_template(extra)
+        previous_templates = library._Library__templates
+
+        # Execute
+        (templates_dir / "first.json").write_text(json.dumps({"id": "template1", "command": "cat"}))
+        (templates_dir / "second.json").unlink()
+        changed = library.refresh()
+
+        # Verify
+        assert changed is True
+        assert library._Library__templates is not previous_templates
+        assert library._Library__templates["template1"].command == "cat"
+        assert "template2" not in library._Library__templates
+        assert library._Library__templates["extra"] is extra
+        assert library.refresh() is False
+        assert library.refresh(min_interval=60) is False
+
     def test_find_template_by_name(self):
         # Setup
         library = Library()
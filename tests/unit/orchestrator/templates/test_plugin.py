@@ -222,3 +222,37 @@ class TestPlugin:
         # Verify
         assert "exit_template" in plugin.templates
         assert "exit_template" in plugin.exit_commands
+
+    def test_changed_files_and_forget_file(self, tmp_path):
+        # Setup
+        templates_dir = tmp_path / "templates"
+        (templates_dir / "on_exit").mkdir(parents=True)
+        first = templates_dir / "first.json"
+        first.write_text(json.dumps({"id": "template1", "command": "echo"}))
+        exit_file = templates_dir / "on_exit" / "exit.json"
+        exit_file.write_text(json.dumps({"id": "exit_handler", "command": "cleanup"}))
+        plugin = Plugin(str(tmp_path / "__init__.py"))
+        plugin.load_folder(tmp_path)
+
+        # Execute
+        first.write_text(json.dumps({"id": "template1", "command": "echo", "description": "changed"}))
+        second = templates_dir / "second.json"
+        second.write_text("not json")
+        exit_file.unlink()
+        changed, removed = plugin.changed_files()
+
+        # Verify
+        assert sorted(changed) == [first, second]
+        assert removed == [exit_file]
+
+        # Execute
+        plugin.forget_file(exit_file)
+
+        # Verify
+        assert "exit_handler" not in plugin.templates
+        assert plugin.exit_commands == []
+        assert plugin.changed_files() == ([first, second], [])
+
+    def test_changed_files_without_folder(self):
+        # Execute and verify
+        assert Plugin("/path/to/plugin.py").changed_files() == ([], [])